@@ -2,94 +2,30 @@
 # -*- coding: utf-8 -*-
 """
 Excel到CSV转换工具
-使用zipfile直接读取Excel内部结构
+使用zipfile直接读取Excel内部结构（workbook_cache 按部件CRC缓存解析结果）
 """
 
-import zipfile
-import xml.etree.ElementTree as ET
 import csv
 import os
+import sys
 
-def extract_excel_data(excel_path):
-    """从Excel文件中提取数据"""
-    data = []
-    
+# 公共函数（输出、工作簿缓存）在数据脚本目录中
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "..", "Resources", "MineralData", "Data", "scripts")
+sys.path.insert(0, os.path.normpath(SCRIPTS_DIR))
+
+from atomic_output import atomic_write
+from instrumentation import count, run_main, stage
+from workbook_cache import SHARED_STRINGS_MEMBER, open_workbook
+
+def extract_excel_data(excel_path, cache=None):
+    """从Excel文件中提取数据（解析结果按部件缓存，工作簿未变化时不重新解析XML；cache 默认为脚本目录下的缓存）"""
     try:
-        with zipfile.ZipFile(excel_path, 'r') as zip_file:
-            # 读取共享字符串
-            shared_strings = []
-            try:
-                with zip_file.open('xl/sharedStrings.xml') as f:
-                    tree = ET.parse(f)
-                    root = tree.getroot()
-                    
-                    # 定义命名空间
-                    ns = {'': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
-                    
-                    for si in root.findall('.//si', ns):
-                        t = si.find('.//t', ns)
-                        if t is not None:
-                            shared_strings.append(t.text or "")
-                        else:
-                            shared_strings.append("")
-            except KeyError:
+        with stage("read_excel"), open_workbook(excel_path, cache) as book:
+            if SHARED_STRINGS_MEMBER not in book.members:
                 print("没有找到共享字符串文件")
-            
-            # 读取工作表数据
-            with zip_file.open('xl/worksheets/sheet1.xml') as f:
-                tree = ET.parse(f)
-                root = tree.getroot()
-                
-                # 定义命名空间
-                ns = {'': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
-                
-                # 获取所有行
-                rows = root.findall('.//row', ns)
-                
-                for row in rows:
-                    row_data = []
-                    cells = row.findall('.//c', ns)
-                    
-                    # 当前列索引
-                    col_index = 0
-                    
-                    for cell in cells:
-                        # 获取单元格引用 (如 A1, B1)
-                        cell_ref = cell.get('r')
-                        if cell_ref:
-                            # 计算列位置
-                            col_letter = ''.join([c for c in cell_ref if c.isalpha()])
-                            target_col = 0
-                            for char in col_letter:
-                                target_col = target_col * 26 + (ord(char) - ord('A') + 1)
-                            target_col -= 1  # 转为0-based索引
-                            
-                            # 填充空列
-                            while col_index < target_col:
-                                row_data.append("")
-                                col_index += 1
-                        
-                        # 获取单元格值
-                        cell_type = cell.get('t')
-                        v = cell.find('.//v', ns)
-                        
-                        if v is not None:
-                            if cell_type == 's':  # 共享字符串
-                                idx = int(v.text)
-                                if idx < len(shared_strings):
-                                    row_data.append(shared_strings[idx])
-                                else:
-                                    row_data.append("")
-                            else:  # 数值或其他
-                                row_data.append(v.text or "")
-                        else:
-                            row_data.append("")
-                        
-                        col_index += 1
-                    
-                    if row_data:  # 只添加非空行
-                        data.append(row_data)
-    
+            data = book.sheet_rows('xl/worksheets/sheet1.xml')
+        count("rows_parsed", len(data))
     except Exception as e:
         print(f"读取Excel时发生错误: {e}")
         return []
@@ -103,7 +39,7 @@ def save_to_csv(data, csv_path):
         return
     
     try:
-        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        with stage("write_csv"), atomic_write(csv_path, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
             
             # 确定最大列数
@@ -157,4 +93,4 @@ def main():
         print("没有读取到数据")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run_main(main)
\ No newline at end of file
@@ -9,6 +9,20 @@ import json
 import csv
 import os
 
+from collections import Counter
+
+from atomic_output import write_json_if_changed
+from instrumentation import count, run_main, stage
+from mineral_assets import (
+    BASE_DATABASE_PATH,
+    DATABASE_OVERRIDES_PATH,
+    DATABASE_PATH,
+    FOSSIL_CSV_PATH,
+    AssetNames,
+    check_database_replacement,
+)
+from records import Database, DatabaseOverrides, Fossil
+
 def generate_fossil_id(fossil_name):
     """生成化石ID"""
     name_map = {
@@ -109,8 +123,9 @@ def get_layer_name_mapping():
         "亀岡層": "sendai_kameoka"
     }
 
-def read_fossils_data(csv_file):
-    """读取化石数据"""
+def read_fossils_data(csv_file, asset_names=None):
+    """读取化石数据（图片/模型文件名按 asset_names，默认索引 MineralData 下的资源）"""
+    asset_names = asset_names or AssetNames()
     fossils_by_layer = {}
     
     with open(csv_file, 'r', encoding='utf-8-sig') as file:
@@ -118,6 +133,7 @@ def read_fossils_data(csv_file):
         headers = next(reader)  # 跳过标题行
         
         for row in reader:
+            count("rows_parsed")
             if len(row) >= 2:
                 layer_name = row[0].strip()
                 fossil_name = row[1].strip()
@@ -127,28 +143,36 @@ def read_fossils_data(csv_file):
                         fossils_by_layer[layer_name] = []
                     
                     rarity, probability = determine_fossil_rarity(fossil_name)
+                    fossil_id = generate_fossil_id(fossil_name)
                     
-                    fossil_data = {
-                        "fossilId": generate_fossil_id(fossil_name),
-                        "fossilName": fossil_name,
-                        "fossilNameEN": translate_fossil_name_en(fossil_name),
-                        "fossilNameJA": translate_fossil_name_ja(fossil_name),
-                        "rarity": rarity,
-                        "discoveryProbability": probability,
-                        "properties": {
-                            "type": "fossil",
-                            "imageFile": f"{generate_fossil_id(fossil_name)}_001.jpg",
-                            "modelFile": f"{generate_fossil_id(fossil_name)}_001.fbx",
-                            "description": f"在{layer_name}中发现的{fossil_name}"
-                        }
-                    }
-                    
-                    fossils_by_layer[layer_name].append(fossil_data)
+                    fossils_by_layer[layer_name].append(Fossil(
+                        fossil_id, fossil_name,
+                        translate_fossil_name_en(fossil_name), translate_fossil_name_ja(fossil_name),
+                        rarity, probability,
+                        asset_names.image_file("fossil", fossil_id), asset_names.model_file("fossil", fossil_id),
+                        f"在{layer_name}中发现的{fossil_name}"))
     
     return fossils_by_layer
 
-def add_fossils_to_database(database_file, fossils_csv, output_file):
-    """将化石数据添加到数据库中"""
+def layer_fossils(layer, fossils_by_layer, layer_mapping, overrides=None):
+    """
+    地层对应的化石列表，没有时返回 None
+    有手工修订时使用修订，否则为 CSV 中地层名经 layer_mapping 映射到该地层ID的行
+    """
+    if overrides is not None:
+        fossils = overrides.layer_fossils(layer.layer_id)
+        if fossils is not None:
+            return fossils
+    for csv_layer_name, fossil_list in fossils_by_layer.items():
+        if layer_mapping.get(csv_layer_name) == layer.layer_id:
+            return fossil_list
+    return None
+
+def add_fossils_to_database(database_file, fossils_csv, output_file, overrides_path=DATABASE_OVERRIDES_PATH):
+    """
+    将化石数据添加到数据库中
+    database_overrides.json 中有修订的地层使用修订的化石列表；会丢失能加载的资源引用时不覆盖 output_file
+    """
     
     print("=" * 80)
     print("向矿物数据库添加化石数据")
@@ -160,11 +184,13 @@ def add_fossils_to_database(database_file, fossils_csv, output_file):
         return
     
     with open(database_file, 'r', encoding='utf-8') as f:
-        database = json.load(f)
+        database = Database.from_dict(json.load(f))
     
     # 读取化石数据
-    fossils_by_layer = read_fossils_data(fossils_csv)
+    with stage("read_fossils"):
+        fossils_by_layer = read_fossils_data(fossils_csv)
     layer_mapping = get_layer_name_mapping()
+    overrides = DatabaseOverrides.load(overrides_path)
     
     print(f"读取到化石数据，涵盖 {len(fossils_by_layer)} 个地层")
     
@@ -172,38 +198,36 @@ def add_fossils_to_database(database_file, fossils_csv, output_file):
     updated_layers = 0
     total_fossils = 0
     
-    for layer in database["stratigraphicLayers"]:
-        layer_id = layer["layerId"]
-        layer_name = layer["layerName"]
+    for layer in database.layers:
+        layer_name = layer.name
         
         # 查找对应的化石数据
-        fossils = None
-        for csv_layer_name, fossil_list in fossils_by_layer.items():
-            if layer_mapping.get(csv_layer_name) == layer_id:
-                fossils = fossil_list
-                break
+        fossils = layer_fossils(layer, fossils_by_layer, layer_mapping, overrides)
         
         if fossils:
-            layer["fossils"] = fossils
+            layer.fossils = fossils
             updated_layers += 1
             total_fossils += len(fossils)
-            print(f"✓ {layer_name}: 添加 {len(fossils)} 个化石")
+            count("fossils_added", len(fossils))
             
-            # 显示化石详情
-            for fossil in fossils:
-                print(f"  - {fossil['fossilName']} ({fossil['rarity']}, {fossil['discoveryProbability']*100:.1f}%)")
+            # 每个地层一行，按稀有度汇总（不逐个列出化石）
+            rarities = Counter(fossil.rarity for fossil in fossils)
+            detail = ", ".join(f"{rarity} {n}" for rarity, n in rarities.items())
+            print(f"✓ {layer_name}: 添加 {len(fossils)} 个化石 ({detail})")
         else:
-            layer["fossils"] = []
+            layer.fossils = []
             print(f"○ {layer_name}: 无化石数据")
     
     # 更新数据库版本信息
-    database["version"] = "1.1"
-    database["lastUpdated"] = "2025-01-27"
-    database["description"] = "仙台地区地质样本矿物数据库 (包含化石数据)"
+    database.version = "1.1"
+    database.last_updated = "2025-01-27"
+    database.description = "仙台地区地质样本矿物数据库 (包含化石数据)"
     
     # 保存更新后的数据库
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(database, f, ensure_ascii=False, indent=2)
+    with stage("write_json"):
+        result = database.to_dict()
+        check_database_replacement(output_file, result)
+        write_json_if_changed(output_file, result)
     
     print(f"\\n=== 更新完成 ===")
     print(f"更新的地层数: {updated_layers}")
@@ -214,7 +238,7 @@ def add_fossils_to_database(database_file, fossils_csv, output_file):
     rarity_stats = {"common": 0, "uncommon": 0, "rare": 0}
     for fossil_list in fossils_by_layer.values():
         for fossil in fossil_list:
-            rarity_stats[fossil["rarity"]] += 1
+            rarity_stats[fossil.rarity] += 1
     
     print(f"\\n=== 化石稀有度统计 ===")
     print(f"常见 (common): {rarity_stats['common']} 种 (5%概率)")
@@ -222,13 +246,13 @@ def add_fossils_to_database(database_file, fossils_csv, output_file):
     print(f"稀有 (rare): {rarity_stats['rare']} 种 (1%概率)")
 
 def main():
-    """主函数"""
-    database_file = "SendaiMineralDatabase.json"
-    fossils_csv = "../../MineralRelated/sendai_fossils_expanded.csv"
-    output_file = "SendaiMineralDatabase_WithFossils.json"
+    """主函数（读取 generate_mineral_database.py 生成的基础数据库，合并化石后写入正式数据库）"""
+    database_file = BASE_DATABASE_PATH
+    fossils_csv = FOSSIL_CSV_PATH
+    output_file = DATABASE_PATH
     
     if not os.path.exists(database_file):
-        print(f"数据库文件不存在: {database_file}")
+        print(f"基础数据库不存在: {database_file}（先运行 generate_mineral_database.py）")
         return
         
     if not os.path.exists(fossils_csv):
@@ -244,4 +268,4 @@ def main():
     print("=" * 80)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run_main(main)
\ No newline at end of file
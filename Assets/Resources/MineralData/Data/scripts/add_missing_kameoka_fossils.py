@@ -6,6 +6,11 @@
 
 import json
 import os
+from collections import Counter
+
+from atomic_output import write_json_if_changed
+from instrumentation import run_main
+from mineral_assets import AssetNames, check_database_replacement
 
 def generate_fossil_id(fossil_name):
     """生成化石ID"""
@@ -85,7 +90,8 @@ def add_kameoka_fossils():
     
     print(f"找到地层: {kameoka_layer['layerName']}")
     
-    # 生成化石数据
+    # 生成化石数据（资源文件名取磁盘上实际存在的文件）
+    asset_names = AssetNames()
     fossils = []
     for fossil_name in kameoka_fossils_data:
         rarity, probability = determine_fossil_rarity(fossil_name)
@@ -99,8 +105,8 @@ def add_kameoka_fossils():
             "discoveryProbability": probability,
             "properties": {
                 "type": "fossil",
-                "imageFile": f"{generate_fossil_id(fossil_name)}_001.jpg",
-                "modelFile": f"{generate_fossil_id(fossil_name)}_001.fbx",
+                "imageFile": asset_names.image_file("fossil", generate_fossil_id(fossil_name)),
+                "modelFile": asset_names.model_file("fossil", generate_fossil_id(fossil_name)),
                 "description": f"在{kameoka_layer['layerName']}中发现的{fossil_name}"
             }
         }
@@ -110,13 +116,14 @@ def add_kameoka_fossils():
     # 添加化石数据到亀岡層
     kameoka_layer["fossils"] = fossils
     
-    print(f"\\n添加的化石 ({len(fossils)} 种):")
-    for fossil in fossils:
-        print(f"  - {fossil['fossilName']} ({fossil['rarity']}, {fossil['discoveryProbability']*100:.1f}%)")
+    # 按稀有度汇总（不逐个列出化石）
+    rarities = Counter(fossil["rarity"] for fossil in fossils)
+    detail = ", ".join(f"{rarity} {n}" for rarity, n in rarities.items())
+    print(f"\\n添加的化石: {len(fossils)} 种 ({detail})")
     
-    # 保存更新后的数据库
-    with open(database_file, 'w', encoding='utf-8') as f:
-        json.dump(database, f, ensure_ascii=False, indent=2)
+    # 保存更新后的数据库（会丢失能加载的资源引用时不覆盖）
+    check_database_replacement(database_file, database)
+    write_json_if_changed(database_file, database)
     
     print(f"\\n✅ 亀岡層化石数据添加完成!")
     print(f"数据库已更新: {database_file}")
@@ -130,4 +137,4 @@ def main():
     print("=" * 60)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run_main(main)
\ No newline at end of file
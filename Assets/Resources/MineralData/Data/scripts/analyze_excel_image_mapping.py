@@ -5,82 +5,51 @@
 通过解析Excel的绘图关系文件来确定每张图片对应哪一行
 """
 
-import zipfile
-import xml.etree.ElementTree as ET
 import os
-import shutil
 import csv
 
-def parse_drawing_relationships(zip_ref):
+from instrumentation import run_main
+from workbook_cache import open_workbook
+
+def parse_drawing_relationships(book):
     """解析绘图关系文件"""
     drawing_rels = {}
     
     try:
-        # 读取绘图关系文件
-        rels_content = zip_ref.read('xl/drawings/_rels/drawing1.xml.rels')
-        root = ET.fromstring(rels_content)
+        # 读取绘图关系文件（解析结果按部件缓存）
+        relationships = book.relationships('xl/drawings/_rels/drawing1.xml.rels')
         
         print("=== 绘图关系文件分析 ===")
         
-        for relationship in root.iter():
-            if relationship.tag.endswith('Relationship'):
-                rel_id = relationship.get('Id')
-                target = relationship.get('Target')
-                rel_type = relationship.get('Type')
-                
-                if target and target.startswith('../media/'):
-                    media_file = target.replace('../media/', 'xl/media/')
-                    drawing_rels[rel_id] = media_file
-                    print(f"关系 {rel_id}: {media_file}")
+        for rel_id, (rel_type, target) in relationships.items():
+            if target and target.startswith('../media/'):
+                media_file = target.replace('../media/', 'xl/media/')
+                drawing_rels[rel_id] = media_file
+                print(f"关系 {rel_id}: {media_file}")
                     
     except Exception as e:
         print(f"解析绘图关系失败: {e}")
     
     return drawing_rels
 
-def parse_drawing_positions(zip_ref, drawing_rels):
+def parse_drawing_positions(book, drawing_rels):
     """解析绘图位置信息"""
     image_positions = {}
     
     try:
-        # 读取绘图文件
-        drawing_content = zip_ref.read('xl/drawings/drawing1.xml')
-        
-        # 注册命名空间
-        namespaces = {
-            'xdr': 'http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing',
-            'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
-            'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
-        }
-        
-        root = ET.fromstring(drawing_content)
+        # 读取绘图文件中的图片锚点（解析结果按部件缓存）
+        anchors = book.drawing_anchors('xl/drawings/drawing1.xml')
         
         print("\n=== 图片位置分析 ===")
         
-        for anchor in root.findall('.//xdr:twoCellAnchor', namespaces):
-            # 获取起始位置
-            from_cell = anchor.find('xdr:from', namespaces)
-            if from_cell is not None:
-                col = from_cell.find('xdr:col', namespaces)
-                row = from_cell.find('xdr:row', namespaces)
-                
-                if col is not None and row is not None:
-                    start_col = int(col.text)
-                    start_row = int(row.text) + 1  # Excel行号从1开始
-                    
-                    # 查找图片引用
-                    pic = anchor.find('.//xdr:pic', namespaces)
-                    if pic is not None:
-                        blip_fill = pic.find('.//a:blipFill', namespaces)
-                        if blip_fill is not None:
-                            blip = blip_fill.find('a:blip', namespaces)
-                            if blip is not None:
-                                embed_id = blip.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed')
-                                
-                                if embed_id in drawing_rels:
-                                    media_file = drawing_rels[embed_id]
-                                    image_positions[media_file] = (start_row, start_col)
-                                    print(f"图片 {media_file} 位置: 行{start_row}, 列{start_col}")
+        for row, col, embed_id in anchors:
+            start_col = col
+            start_row = row + 1  # Excel行号从1开始
+            
+            if embed_id in drawing_rels:
+                media_file = drawing_rels[embed_id]
+                image_positions[media_file] = (start_row, start_col)
+                print(f"图片 {media_file} 位置: 行{start_row}, 列{start_col}")
                                     
     except Exception as e:
         print(f"解析绘图位置失败: {e}")
@@ -116,13 +85,10 @@ def map_images_to_minerals(excel_file, csv_file):
     print(f"CSV数据: {len(minerals_data)} 个矿物记录")
     
     # 分析Excel图片位置
-    temp_zip = excel_file + '.temp.zip'
-    shutil.copy2(excel_file, temp_zip)
-    
     try:
-        with zipfile.ZipFile(temp_zip, 'r') as zip_ref:
-            drawing_rels = parse_drawing_relationships(zip_ref)
-            image_positions = parse_drawing_positions(zip_ref, drawing_rels)
+        with open_workbook(excel_file) as book:
+            drawing_rels = parse_drawing_relationships(book)
+            image_positions = parse_drawing_positions(book, drawing_rels)
             
             print(f"\n发现 {len(image_positions)} 个图片位置")
             
@@ -166,9 +132,6 @@ def map_images_to_minerals(excel_file, csv_file):
                 
     except Exception as e:
         print(f"分析失败: {e}")
-    finally:
-        if os.path.exists(temp_zip):
-            os.remove(temp_zip)
 
 def main():
     """主函数"""
@@ -186,4 +149,4 @@ def main():
     map_images_to_minerals(excel_file, csv_file)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run_main(main)
\ No newline at end of file
@@ -9,6 +9,8 @@ import csv
 import os
 from collections import Counter
 
+from instrumentation import run_main
+
 def generate_mineral_id(mineral_name):
     """生成矿物ID"""
     name_map = {
@@ -60,10 +62,8 @@ def generate_mineral_id(mineral_name):
     
     return english_id
 
-def analyze_csv_minerals():
+def analyze_csv_minerals(csv_file="../../MineralRelated/仙台地层岩石矿物分析-完整.csv"):
     """分析CSV中的所有矿物"""
-    csv_file = "../../MineralRelated/仙台地层岩石矿物分析-完整.csv"
-    
     if not os.path.exists(csv_file):
         print(f"CSV文件不存在: {csv_file}")
         return [], []
@@ -88,10 +88,8 @@ def analyze_csv_minerals():
     
     return all_minerals, list(unique_minerals)
 
-def analyze_extracted_images():
+def analyze_extracted_images(images_dir="../Images/Minerals"):
     """分析已提取的图片"""
-    images_dir = "../Images/Minerals"
-    
     if not os.path.exists(images_dir):
         print(f"图片目录不存在: {images_dir}")
         return []
@@ -108,14 +106,14 @@ def analyze_extracted_images():
     
     return list(extracted_minerals)
 
-def main():
-    """主分析函数"""
+def report_missing_images(csv_file, images_dir):
+    """对比CSV中的矿物和图片目录，列出缺失图片的矿物"""
     print("=" * 80)
     print("矿物图片缺失分析")
     print("=" * 80)
     
     # 分析CSV中的矿物
-    all_minerals, unique_csv_minerals = analyze_csv_minerals()
+    all_minerals, unique_csv_minerals = analyze_csv_minerals(csv_file)
     
     print(f"\nCSV分析结果:")
     print(f"  总矿物记录: {len(all_minerals)} 条")
@@ -124,13 +122,18 @@ def main():
     # 统计矿物出现次数
     mineral_counts = Counter([mineral_id for _, _, mineral_id in all_minerals])
     
+    # 矿物ID -> 首次出现的中文名称
+    mineral_names = {}
+    for _, name, mid in all_minerals:
+        mineral_names.setdefault(mid, name)
+    
     print(f"\n矿物出现频次统计 (前10个):")
     for mineral_id, count in mineral_counts.most_common(10):
-        mineral_name = next(name for _, name, mid in all_minerals if mid == mineral_id)
+        mineral_name = mineral_names[mineral_id]
         print(f"  {mineral_id:25} : {count:2d} 次 ({mineral_name})")
     
     # 分析已提取的图片
-    extracted_minerals = analyze_extracted_images()
+    extracted_minerals = analyze_extracted_images(images_dir)
     
     print(f"\n图片提取结果:")
     print(f"  已提取图片的矿物: {len(extracted_minerals)} 种")
@@ -144,7 +147,7 @@ def main():
     missing_list = []
     for mineral_id in sorted(missing_minerals):
         # 找到对应的中文名称
-        mineral_name = next((name for _, name, mid in all_minerals if mid == mineral_id), mineral_id)
+        mineral_name = mineral_names.get(mineral_id, mineral_id)
         count = mineral_counts[mineral_id]
         missing_list.append((mineral_id, mineral_name, count))
         print(f"  {mineral_id:25} : {mineral_name} ({count} 次出现)")
@@ -166,11 +169,15 @@ def main():
     print(f"\n已有图片的矿物 ({len(extracted_minerals)} 种):")
     print("-" * 60)
     for mineral_id in sorted(extracted_minerals):
-        mineral_name = next((name for _, name, mid in all_minerals if mid == mineral_id), mineral_id)
+        mineral_name = mineral_names.get(mineral_id, mineral_id)
         count = mineral_counts[mineral_id]
         print(f"  {mineral_id:25} : {mineral_name} ({count} 次出现)")
     
     print("\n" + "=" * 80)
 
+def main():
+    """主分析函数"""
+    report_missing_images("../../MineralRelated/仙台地层岩石矿物分析-完整.csv", "../Images/Minerals")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run_main(main)
\ No newline at end of file
@@ -6,9 +6,11 @@
 """
 
 import os
-import shutil
 from collections import defaultdict
 
+from atomic_output import copy_if_changed
+from instrumentation import Progress, run_main, stage
+
 def apply_resource_sharing_logic(source_dir, target_dir):
     """应用资源共享逻辑"""
     print(f"从 {source_dir} 应用资源共享到 {target_dir}")
@@ -42,9 +44,8 @@ def apply_resource_sharing_logic(source_dir, target_dir):
     # 为每种矿物选择最佳图片（优先选择_001，然后按质量选择）
     selected_files = {}
     
+    largest_selected = 0
     for mineral_id, files in mineral_groups.items():
-        print(f"\n处理矿物: {mineral_id} ({len(files)} 个文件)")
-        
         # 优先级策略
         best_file = None
         
@@ -52,7 +53,6 @@ def apply_resource_sharing_logic(source_dir, target_dir):
         for file in files:
             if '_001.' in file:
                 best_file = file
-                print(f"  选择 _001 版本: {file}")
                 break
         
         # 2. 如果没有_001，选择文件大小最大的（通常质量更好）
@@ -66,7 +66,7 @@ def apply_resource_sharing_logic(source_dir, target_dir):
             # 按文件大小排序，选择最大的
             files_with_size.sort(key=lambda x: x[1], reverse=True)
             best_file = files_with_size[0][0]
-            print(f"  选择最大文件: {best_file} ({files_with_size[0][1]/1024:.1f} KB)")
+            largest_selected += 1
         
         # 生成标准文件名
         _, ext = os.path.splitext(best_file)
@@ -76,23 +76,25 @@ def apply_resource_sharing_logic(source_dir, target_dir):
             'source_file': best_file,
             'target_file': standard_filename
         }
-        
-        print(f"  标准文件名: {standard_filename}")
+    
+    if largest_selected:
+        print(f"没有 _001 版本、按文件大小选择: {largest_selected} 种矿物")
     
     # 复制选定的文件到目标目录
     print(f"\n=== 复制文件到目标目录 ===")
     copied_count = 0
     
-    for mineral_id, file_info in selected_files.items():
-        source_path = os.path.join(source_dir, file_info['source_file'])
-        target_path = os.path.join(target_dir, file_info['target_file'])
-        
-        try:
-            shutil.copy2(source_path, target_path)
-            print(f"✓ {file_info['source_file']:30} -> {file_info['target_file']}")
-            copied_count += 1
-        except Exception as e:
-            print(f"✗ 复制失败 {file_info['source_file']}: {e}")
+    with stage("copy_images"), Progress("复制图片", total=len(selected_files), counter="images_shared") as progress:
+        for mineral_id, file_info in selected_files.items():
+            source_path = os.path.join(source_dir, file_info['source_file'])
+            target_path = os.path.join(target_dir, file_info['target_file'])
+            
+            try:
+                copy_if_changed(source_path, target_path)
+                copied_count += 1
+            except Exception as e:
+                print(f"✗ 复制失败 {file_info['source_file']}: {e}")
+            progress.update(detail=f"{file_info['source_file']} -> {file_info['target_file']}")
     
     print(f"\n=== 资源共享完成 ===")
     print(f"总矿物种类: {len(mineral_groups)}")
@@ -101,14 +103,10 @@ def apply_resource_sharing_logic(source_dir, target_dir):
     
     # 显示最终结果
     final_files = [f for f in os.listdir(target_dir) if f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp'))]
-    print(f"\n最终图片文件 ({len(final_files)} 个):")
-    for file in sorted(final_files):
-        print(f"  - {file}")
+    print(f"最终图片文件: {len(final_files)} 个")
 
-def create_resource_mapping_summary():
+def create_resource_mapping_summary(target_dir="../Images/Minerals"):
     """创建资源映射汇总"""
-    target_dir = "../Images/Minerals"
-    
     if not os.path.exists(target_dir):
         print(f"目标目录不存在: {target_dir}")
         return
@@ -161,4 +159,4 @@ def main():
     print("=" * 80)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run_main(main)
\ No newline at end of file
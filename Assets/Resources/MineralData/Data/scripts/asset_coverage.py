@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+资源覆盖率检查
+一次遍历数据库的 imageFile/modelFile 引用和 Images/、Models/ 下的文件，
+报告缺失、孤立和扩展名不一致的资源，可输出JSON供CI使用
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from atomic_output import write_json_if_changed
+from instrumentation import run_main
+from mineral_assets import (
+    ASSET_DIRS,
+    DATABASE_PATH,
+    MINERAL_DATA_DIR,
+    index_asset_files,
+    iter_asset_references,
+    load_database,
+    split_stem,
+)
+
+
+def index_references(database):
+    """按 (目录, 主名) 索引数据库引用"""
+    references = {}
+
+    for kind, record_id, name, field, filename in iter_asset_references(database):
+        asset_dir = ASSET_DIRS[(kind, field)]
+        stem, _ = split_stem(filename)
+        key = (asset_dir, stem)
+
+        ref = references.get(key)
+        if ref is None:
+            ref = references[key] = {
+                "directory": asset_dir,
+                "field": field,
+                "files": set(),
+                "referencedBy": {},
+            }
+        ref["files"].add(filename)
+        ref["referencedBy"].setdefault(record_id, name)
+
+    return references
+
+
+def analyze_coverage(database, base_dir=MINERAL_DATA_DIR):
+    """对比引用与磁盘文件，生成覆盖率报告"""
+    references = index_references(database)
+    disk_files = index_asset_files(base_dir)
+
+    missing = []
+    mismatched = []
+    resolved = 0
+
+    for (asset_dir, stem), ref in sorted(references.items()):
+        found = disk_files.get((asset_dir, stem))
+        referenced_by = [
+            {"id": record_id, "name": name}
+            for record_id, name in ref["referencedBy"].items()
+        ]
+
+        if not found:
+            missing.append({
+                "directory": asset_dir,
+                "field": ref["field"],
+                "expected": sorted(ref["files"]),
+                "referencedBy": referenced_by,
+            })
+        elif ref["files"].isdisjoint(found):
+            mismatched.append({
+                "directory": asset_dir,
+                "field": ref["field"],
+                "expected": sorted(ref["files"]),
+                "found": sorted(found),
+                "referencedBy": referenced_by,
+            })
+        else:
+            resolved += 1
+
+    orphaned = []
+    for (asset_dir, stem), found in sorted(disk_files.items()):
+        if (asset_dir, stem) not in references:
+            for filename in sorted(found):
+                orphaned.append(f"{asset_dir}/{filename}")
+
+    return {
+        "summary": {
+            "references": len(references),
+            "resolved": resolved,
+            "missing": len(missing),
+            "extensionMismatch": len(mismatched),
+            "orphaned": len(orphaned),
+            "filesOnDisk": sum(len(found) for found in disk_files.values()),
+        },
+        "missing": missing,
+        "extensionMismatch": mismatched,
+        "orphaned": orphaned,
+    }
+
+
+def print_report(report):
+    """打印可读的覆盖率报告"""
+    summary = report["summary"]
+
+    print("=" * 80)
+    print("矿物/化石资源覆盖率检查")
+    print("=" * 80)
+    print(f"数据库引用资源: {summary['references']} 个")
+    print(f"磁盘资源文件: {summary['filesOnDisk']} 个")
+    print(f"正常解析: {summary['resolved']} 个")
+
+    print(f"\n缺失资源 ({summary['missing']} 个):")
+    for item in report["missing"]:
+        ids = ", ".join(ref["id"] for ref in item["referencedBy"])
+        print(f"  ✗ {item['directory']}/{item['expected'][0]:30} <- {ids}")
+
+    print(f"\n扩展名不一致 ({summary['extensionMismatch']} 个):")
+    for item in report["extensionMismatch"]:
+        print(f"  ⚠️  {item['directory']}: {', '.join(item['expected'])} -> {', '.join(item['found'])}")
+
+    print(f"\n孤立资源 ({summary['orphaned']} 个):")
+    for path in report["orphaned"]:
+        print(f"  - {path}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="检查数据库引用与磁盘资源的一致性")
+    parser.add_argument("--database", default=DATABASE_PATH, help="数据库JSON路径")
+    parser.add_argument("--root", default=MINERAL_DATA_DIR, help="MineralData 目录")
+    parser.add_argument("--json", action="store_true", help="向标准输出打印JSON报告")
+    parser.add_argument("--output", help="将JSON报告写入文件")
+    parser.add_argument("--strict", action="store_true", help="存在缺失或扩展名不一致时返回非零退出码")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        print(f"数据库文件不存在: {args.database}", file=sys.stderr)
+        return 2
+
+    report = analyze_coverage(load_database(args.database), args.root)
+
+    if args.output:
+        write_json_if_changed(args.output, report)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+    summary = report["summary"]
+    if args.strict and (summary["missing"] or summary["extensionMismatch"]):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+输出文件公共函数
+内容与现有文件相同时不写入（不改变修改时间，Unity 编辑器不会重新导入），
+不同时先写同目录下的临时文件（以 . 开头，Unity 不会导入）再原子替换，中断时不会留下半个文件。
+所有函数返回是否真正写入了文件；写入/跳过的文件数和字节数计入 instrumentation 计数器。
+"""
+
+import json
+import os
+import shutil
+
+from instrumentation import count
+
+COMPARE_CHUNK = 1024 * 1024
+
+
+def _temp_path(path):
+    directory, filename = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, f".{filename}.{os.getpid()}.tmp")
+
+
+def _same_file_content(path_a, path_b):
+    """两个文件内容是否相同（先比大小，再分块比较）"""
+    if os.path.getsize(path_a) != os.path.getsize(path_b):
+        return False
+    with open(path_a, 'rb') as a, open(path_b, 'rb') as b:
+        while True:
+            chunk = a.read(COMPARE_CHUNK)
+            if chunk != b.read(COMPARE_CHUNK):
+                return False
+            if not chunk:
+                return True
+
+
+def _record(changed, size):
+    if changed:
+        count("files_written")
+        count("bytes_written", size)
+    else:
+        count("files_unchanged")
+
+
+def _replace_if_changed(temp_path, path):
+    """临时文件与目标相同时丢弃，否则替换目标"""
+    size = os.path.getsize(temp_path)
+    if os.path.isfile(path) and _same_file_content(temp_path, path):
+        os.remove(temp_path)
+        _record(False, size)
+        return False
+    os.replace(temp_path, path)
+    _record(True, size)
+    return True
+
+
+def write_bytes_if_changed(path, data):
+    """写入字节内容"""
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, 'rb') as f:
+                if f.read() == data:
+                    _record(False, len(data))
+                    return False
+    except OSError:
+        pass
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = _temp_path(path)
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    _record(True, len(data))
+    return True
+
+
+def write_text_if_changed(path, text, encoding='utf-8'):
+    """写入文本（不做换行符转换，输出与平台无关）"""
+    return write_bytes_if_changed(path, text.encode(encoding))
+
+
+def dump_json(data, indent=2):
+    """项目统一的 JSON 格式：UTF-8 原文、缩进2格、末尾换行"""
+    return json.dumps(data, ensure_ascii=False, indent=indent) + "\n"
+
+
+def write_json_if_changed(path, data, indent=2):
+    """按 dump_json 格式写入 JSON"""
+    return write_text_if_changed(path, dump_json(data, indent))
+
+
+def copy_if_changed(source, target):
+    """复制文件（保留修改时间等元数据，与 shutil.copy2 相同），内容相同时跳过"""
+    if os.path.isdir(target):
+        target = os.path.join(target, os.path.basename(source))
+    if os.path.isfile(target) and _same_file_content(source, target):
+        _record(False, os.path.getsize(source))
+        return False
+
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    temp_path = _temp_path(target)
+    try:
+        shutil.copy2(source, temp_path)
+        os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    _record(True, os.path.getsize(target))
+    return True
+
+
+class atomic_write:
+    """
+    流式写入（csv.writer 等）的上下文管理器
+    with atomic_write(path, 'w', newline='') as f: ...
+    退出时比较内容，changed 属性记录是否替换了目标文件；出现异常时目标文件保持不变
+    """
+
+    def __init__(self, path, mode='w', encoding='utf-8', newline=None):
+        if 'b' in mode:
+            encoding = None
+        self.path = path
+        self.mode = mode
+        self.encoding = encoding
+        self.newline = newline
+        self.temp_path = _temp_path(path)
+        self.file = None
+        self.changed = False
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.file = open(self.temp_path, self.mode, encoding=self.encoding, newline=self.newline)
+        return self.file
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.file.close()
+        if exc_type is not None:
+            os.remove(self.temp_path)
+            return False
+        self.changed = _replace_if_changed(self.temp_path, self.path)
+        return False
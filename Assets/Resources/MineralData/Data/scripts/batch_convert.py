@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多地区工作簿批量转换
+每个地区一个与仙台工作簿结构相同的 Excel（地层/岩石/矿物 12 列）和一个化石 CSV，
+各地区在进程池的工作进程中独立完成 Excel -> CSV -> 数据库 -> 合并化石，总耗时随核心数缩短。
+输出（默认 Data/Regions/）：
+- <地区>/minerals.csv、<地区>/database.json：地区数据库，地层、岩石、矿物ID加上 "<地区>." 前缀，
+  各地区的ID互不冲突；矿物的 catalogId 为不带前缀的原ID，对应全局矿物目录
+- mineral_catalog.json：所有地区的矿物合并为一份目录（属性取第一个出现的地区），记录出现的地区和次数
+- index.json：地区列表，包含数据库路径、来源文件和各类数量
+输入为工作簿文件或目录（目录中所有 .xlsx），地区名默认取文件名，也可写成 地区=路径。
+化石 CSV 为工作簿旁的 <文件名>_fossils.csv 或 <地区>_fossils.csv，不存在时该地区没有化石。
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from atomic_output import write_json_if_changed
+from instrumentation import memory_tracing_enabled, merge_report, reset_metrics, run_main, stage
+from mineral_assets import MINERAL_RELATED_DIR, PROJECT_DIR, REGIONS_DIR
+from profiling import worker_initializer
+
+INDEX_NAME = "index.json"
+CATALOG_NAME = "mineral_catalog.json"
+FOSSILS_SUFFIX = "_fossils.csv"
+REGION_SEPARATOR = "."
+
+
+def region_slug(name):
+    """文件名 -> 地区名（ID前缀），不能包含ID分隔符"""
+    return name.strip().lower().replace(" ", "_").replace(REGION_SEPARATOR, "_")
+
+
+def find_fossils_csv(excel_path, region):
+    directory = os.path.dirname(excel_path)
+    stem = os.path.splitext(os.path.basename(excel_path))[0]
+    for name in (stem + FOSSILS_SUFFIX, region + FOSSILS_SUFFIX):
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def collect_regions(inputs):
+    """命令行输入 -> [(地区, Excel路径, 化石CSV或None)]，保持输入顺序；地区名重复时报错"""
+    regions = []
+    for item in inputs:
+        region, separator, path = item.partition("=")
+        if not separator:
+            region, path = None, item
+        path = os.path.abspath(path)
+        if os.path.isdir(path):
+            if region:
+                sys.exit(f"目录输入不能指定地区名: {item}")
+            paths = sorted(candidate for candidate in glob.glob(os.path.join(glob.escape(path), "*.xlsx"))
+                           if not os.path.basename(candidate).startswith("~$"))
+        elif os.path.exists(path):
+            paths = [path]
+        else:
+            sys.exit(f"工作簿不存在: {path}")
+        for excel_path in paths:
+            name = region_slug(region or os.path.splitext(os.path.basename(excel_path))[0])
+            regions.append((name, excel_path, find_fossils_csv(excel_path, name)))
+
+    seen = set()
+    for name, excel_path, _ in regions:
+        if name in seen:
+            sys.exit(f"地区名重复: {name}（{excel_path}），请用 地区=路径 指定")
+        seen.add(name)
+    return regions
+
+
+def namespace_database(database, region):
+    """
+    地层、岩石、矿物ID加上地区前缀；矿物原ID记为 catalogId
+    返回该地区的矿物目录条目 {原ID: [矿物, 出现次数]}（按首次出现顺序）
+    """
+    catalog = {}
+    for layer in database.layers:
+        layer.layer_id = f"{region}{REGION_SEPARATOR}{layer.layer_id}"
+        for rock in layer.rock_types:
+            rock.rock_id = f"{region}{REGION_SEPARATOR}{rock.rock_id}"
+            for mineral in rock.minerals:
+                catalog_id = mineral.mineral_id
+                entry = catalog.get(catalog_id)
+                if entry is None:
+                    catalog[catalog_id] = [mineral, 1]
+                else:
+                    entry[1] += 1
+                mineral.mineral_id = f"{region}{REGION_SEPARATOR}{catalog_id}"
+                mineral.extra = dict(mineral.extra or {}, catalogId=catalog_id)
+    return catalog
+
+
+def catalog_entry(mineral):
+    """地区数据库中的矿物 -> 全局目录条目（不含百分比和地区相关字段）"""
+    data = mineral.to_dict()
+    return {
+        "mineralId": data["catalogId"],
+        "mineralName": data["mineralName"],
+        "mineralNameEN": data["mineralNameEN"],
+        "mineralNameJA": data["mineralNameJA"],
+        "properties": data["properties"],
+    }
+
+
+def convert_region(region, excel_path, fossils_csv, region_dir, trace_memory=False):
+    """
+    在工作进程中转换一个地区，捕获输出
+    返回 {region, success, log, seconds, summary, catalog, metrics}
+    """
+    if MINERAL_RELATED_DIR not in sys.path:
+        sys.path.insert(0, MINERAL_RELATED_DIR)
+    from add_fossils_to_database import get_layer_name_mapping, layer_fossils, read_fossils_data
+    from convert_excel_to_csv import extract_excel_data, save_to_csv
+    from generate_mineral_database import build_database
+
+    started = time.perf_counter()
+    metrics = reset_metrics(trace_memory)
+    buffer = io.StringIO()
+    result = {"region": region, "success": False, "summary": None, "catalog": []}
+    with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+        try:
+            with stage(region):
+                data = extract_excel_data(excel_path)
+                if len(data) < 2:
+                    raise ValueError(f"没有读取到数据: {excel_path}")
+                os.makedirs(region_dir, exist_ok=True)
+                # save_to_csv 把各行补齐到相同列数，build_database 跳过不足 12 列的行
+                save_to_csv(data, os.path.join(region_dir, "minerals.csv"))
+                with stage("build_database"):
+                    database = build_database(data[1:])
+
+                fossil_count = 0
+                if fossils_csv:
+                    with stage("read_fossils"):
+                        fossils_by_layer = read_fossils_data(fossils_csv)
+                    layer_mapping = get_layer_name_mapping()
+                    for layer in database.layers:
+                        # 映射表只覆盖仙台的地层，其他地区按地层名直接匹配
+                        layer.fossils = (layer_fossils(layer, fossils_by_layer, layer_mapping)
+                                         or fossils_by_layer.get(layer.name, []))
+                        fossil_count += len(layer.fossils)
+                    database.version = "1.1"
+
+                catalog = namespace_database(database, region)
+                database.description = f"{region} 地区地质样本矿物数据库"
+                database.extra = {"region": region}
+                with stage("write_json"):
+                    write_json_if_changed(os.path.join(region_dir, "database.json"), database.to_dict())
+
+            result["summary"] = {
+                "layers": len(database.layers),
+                "rocks": sum(len(layer.rock_types) for layer in database.layers),
+                "minerals": sum(entry[1] for entry in catalog.values()),
+                "uniqueMinerals": len(catalog),
+                "fossils": fossil_count,
+            }
+            result["catalog"] = [(catalog_entry(mineral), occurrences) for mineral, occurrences in catalog.values()]
+            result["success"] = True
+        except Exception:
+            traceback.print_exc()
+    result["log"] = buffer.getvalue()
+    result["seconds"] = time.perf_counter() - started
+    result["metrics"] = metrics.report()
+    return result
+
+
+def merge_catalogs(results):
+    """按输入顺序合并各地区的矿物目录，结果与工作进程的完成顺序无关"""
+    catalog = {}
+    for result in results:
+        for entry, occurrences in result["catalog"]:
+            merged = catalog.get(entry["mineralId"])
+            if merged is None:
+                merged = catalog[entry["mineralId"]] = dict(entry, regions=[], occurrences=0)
+            merged["regions"].append(result["region"])
+            merged["occurrences"] += occurrences
+    return list(catalog.values())
+
+
+def project_path(path):
+    """索引中的路径：项目内的文件记为相对项目根目录的路径"""
+    relative = os.path.relpath(path, PROJECT_DIR)
+    return path if relative.startswith("..") else relative.replace(os.sep, "/")
+
+
+def batch_convert(inputs, output_dir=REGIONS_DIR, jobs=None):
+    """批量转换，返回退出码（有地区失败时为 1）"""
+    regions = collect_regions(inputs)
+    if not regions:
+        print("没有找到工作簿")
+        return 1
+
+    jobs = min(jobs or os.cpu_count() or 1, len(regions))
+    print("=" * 80)
+    print(f"批量转换 {len(regions)} 个地区（{jobs} 个进程）")
+    print("=" * 80)
+
+    trace_memory = memory_tracing_enabled()
+    results = {}
+    with stage("convert_regions"), ProcessPoolExecutor(max_workers=jobs, initializer=worker_initializer) as executor:
+        futures = {region: executor.submit(convert_region, region, excel_path, fossils_csv,
+                                           os.path.join(output_dir, region), trace_memory)
+                   for region, excel_path, fossils_csv in regions}
+        for region, future in futures.items():
+            result = results[region] = future.result()
+            merge_report(result["metrics"])
+            summary = result["summary"]
+            if result["success"]:
+                print(f"  ✓ {region}: 地层 {summary['layers']}，岩石 {summary['rocks']}，"
+                      f"矿物 {summary['minerals']}（{summary['uniqueMinerals']} 种），化石 {summary['fossils']}"
+                      f"  {result['seconds']:.2f}s")
+            else:
+                print(f"  ✗ {region}:")
+                print("    " + result["log"].rstrip().replace("\n", "\n    "))
+
+    succeeded = [results[region] for region, _, _ in regions if results[region]["success"]]
+    with stage("write_index"):
+        catalog = merge_catalogs(succeeded)
+        write_json_if_changed(os.path.join(output_dir, CATALOG_NAME), {
+            "version": "1.0",
+            "regions": [result["region"] for result in succeeded],
+            "minerals": catalog,
+        })
+
+        sources = {region: (excel_path, fossils_csv) for region, excel_path, fossils_csv in regions}
+        entries = []
+        for result in succeeded:
+            region = result["region"]
+            excel_path, fossils_csv = sources[region]
+            entries.append(dict({
+                "region": region,
+                "database": f"{region}/database.json",
+                "source": project_path(excel_path),
+                "fossilsSource": project_path(fossils_csv) if fossils_csv else None,
+            }, **result["summary"]))
+        write_json_if_changed(os.path.join(output_dir, INDEX_NAME), {
+            "version": "1.0",
+            "mineralCatalog": CATALOG_NAME,
+            "regions": entries,
+        })
+
+    failed = len(regions) - len(succeeded)
+    print(f"\n成功: {len(succeeded)} 个地区，失败: {failed} 个；全局矿物目录 {len(catalog)} 种")
+    print(f"输出目录: {output_dir}")
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多地区工作簿批量转换")
+    parser.add_argument("inputs", nargs="+", help="工作簿、包含工作簿的目录，或 地区=工作簿")
+    parser.add_argument("--output-dir", default=REGIONS_DIR, type=os.path.abspath,
+                        help=f"输出目录（默认 {os.path.relpath(REGIONS_DIR, PROJECT_DIR)}）")
+    parser.add_argument("--jobs", type=int, default=None, help="并行进程数（默认 CPU 核心数）")
+    args = parser.parse_args()
+    return batch_convert(args.inputs, args.output_dir, args.jobs)
+
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据流水线基准测试
+以现有矿物 CSV 和化石 CSV 为模板，生成 10×/100×/1000× 规模的合成数据：
+与真实 Excel 结构相同的工作簿（共享字符串、稀疏单元格、图片锚点、内嵌 JPEG）和对应的化石 CSV，
+对 Excel 转换、数据库生成、化石合并和图片提取计时。
+结果可保存为基准（Assets/MineralRelated/benchmark_baseline.json），
+之后的运行与基准比较，耗时超出容差时返回非零退出码。
+合成数据缓存在 .cache/benchmark/，模板或生成器变化时重新生成。
+"""
+
+import argparse
+import contextlib
+import csv
+import hashlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import time
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+from atomic_output import write_json_if_changed
+from instrumentation import run_main, stage
+from mineral_assets import CACHE_DIR, FOSSIL_CSV_PATH, MINERAL_CSV_PATH, MINERAL_RELATED_DIR, PROJECT_DIR
+
+BASELINE_PATH = os.path.join(PROJECT_DIR, "Assets", "MineralRelated", "benchmark_baseline.json")
+BENCHMARK_DIR = os.path.join(CACHE_DIR, "benchmark")
+DEFAULT_SCALES = (10, 100, 1000)
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.25
+# 毫秒级的用例受调度抖动影响大，差值小于该值（秒）时不算退化
+MIN_REGRESSION_SECONDS = 0.02
+
+# 生成的数据格式变化时递增，旧数据自动重新生成
+GENERATOR_VERSION = 1
+IMAGE_COLUMN = 11
+IMAGE_SIZE = (64, 48)
+IMAGE_VARIANTS = 32
+
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PACKAGE_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+NS_XDR = "http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing"
+NS_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+REL_WORKSHEET = NS_R + "/worksheet"
+REL_SHARED_STRINGS = NS_R + "/sharedStrings"
+REL_DRAWING = NS_R + "/drawing"
+REL_IMAGE = NS_R + "/image"
+
+
+class BenchmarkError(RuntimeError):
+    """被测函数的输出与合成数据不符"""
+
+
+def read_csv_rows(path, encoding='utf-8'):
+    with open(path, 'r', encoding=encoding, newline='') as f:
+        return list(csv.reader(f))
+
+
+def scaled_name(name, copy):
+    """第 copy 份副本中的名称（第一份保持原名）"""
+    return f"{name} {copy + 1}" if name and copy else name
+
+
+def scale_mineral_rows(template, scale):
+    """矿物表按副本重复；岩石类型和矿物名加副本序号，使岩石和唯一矿物数随规模增长，地层不变"""
+    header, body = template[0], template[1:]
+    rows = [header]
+    for copy in range(scale):
+        for row in body:
+            row = list(row)
+            if len(row) > 2:
+                row[1] = scaled_name(row[1].strip(), copy)
+                row[2] = scaled_name(row[2].strip(), copy)
+            rows.append(row)
+    return rows
+
+
+def scale_fossil_rows(template, scale):
+    header, body = template[0], template[1:]
+    rows = [header]
+    for copy in range(scale):
+        for row in body:
+            rows.append([row[0], scaled_name(row[1].strip(), copy)] + row[2:])
+    return rows
+
+
+def first_rows_of_minerals(rows):
+    """每种矿物首次出现的行号（0 起，含标题行），按出现顺序"""
+    first_rows = {}
+    for index, row in enumerate(rows[1:], start=1):
+        if len(row) > 2 and row[2].strip() and row[2].strip() not in first_rows:
+            first_rows[row[2].strip()] = index
+    return list(first_rows.values())
+
+
+def column_letter(index):
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def is_number(value):
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+def sheet_xml(rows, has_drawing):
+    """工作表 XML 和共享字符串表；空单元格不写出（与 Excel 一样稀疏）"""
+    strings = []
+    string_index = {}
+    parts = [f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+             f'<worksheet xmlns="{NS_MAIN}" xmlns:r="{NS_R}"><sheetData>']
+    for row_number, row in enumerate(rows, start=1):
+        cells = []
+        for column, value in enumerate(row):
+            if value == "":
+                continue
+            ref = f"{column_letter(column)}{row_number}"
+            if is_number(value):
+                cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+                continue
+            if value not in string_index:
+                string_index[value] = len(strings)
+                strings.append(value)
+            cells.append(f'<c r="{ref}" t="s"><v>{string_index[value]}</v></c>')
+        parts.append(f'<row r="{row_number}">{"".join(cells)}</row>')
+    parts.append('</sheetData>')
+    if has_drawing:
+        parts.append('<drawing r:id="rId1"/>')
+    parts.append('</worksheet>')
+    return "".join(parts), strings
+
+
+def shared_strings_xml(strings):
+    items = "".join(f'<si><t xml:space="preserve">{escape(value)}</t></si>' for value in strings)
+    return (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<sst xmlns="{NS_MAIN}" count="{len(strings)}" uniqueCount="{len(strings)}">{items}</sst>')
+
+
+def drawing_xml(anchor_rows):
+    """每张图片一个 twoCellAnchor，左上角在 (行, 图片列)"""
+    anchors = []
+    for number, row in enumerate(anchor_rows, start=1):
+        anchors.append(
+            f'<xdr:twoCellAnchor editAs="oneCell">'
+            f'<xdr:from><xdr:col>{IMAGE_COLUMN}</xdr:col><xdr:colOff>0</xdr:colOff>'
+            f'<xdr:row>{row}</xdr:row><xdr:rowOff>0</xdr:rowOff></xdr:from>'
+            f'<xdr:to><xdr:col>{IMAGE_COLUMN + 1}</xdr:col><xdr:colOff>0</xdr:colOff>'
+            f'<xdr:row>{row + 1}</xdr:row><xdr:rowOff>0</xdr:rowOff></xdr:to>'
+            f'<xdr:pic><xdr:nvPicPr><xdr:cNvPr id="{number + 1}" name="图片 {number}"/><xdr:cNvPicPr/></xdr:nvPicPr>'
+            f'<xdr:blipFill><a:blip r:embed="rId{number}"/><a:stretch><a:fillRect/></a:stretch></xdr:blipFill>'
+            f'<xdr:spPr><a:prstGeom prst="rect"><a:avLst/></a:prstGeom></xdr:spPr></xdr:pic>'
+            f'<xdr:clientData/></xdr:twoCellAnchor>')
+    return (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<xdr:wsDr xmlns:xdr="{NS_XDR}" xmlns:a="{NS_A}" xmlns:r="{NS_R}">{"".join(anchors)}</xdr:wsDr>')
+
+
+def relationships_xml(relationships):
+    items = "".join(f'<Relationship Id="{rel_id}" Type="{rel_type}" Target={quoteattr(target)}/>'
+                    for rel_id, rel_type, target in relationships)
+    return (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<Relationships xmlns="{NS_PACKAGE_REL}">{items}</Relationships>')
+
+
+def content_types_xml(has_drawing):
+    overrides = [
+        ("/xl/workbook.xml", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"),
+        ("/xl/worksheets/sheet1.xml", "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"),
+        ("/xl/sharedStrings.xml", "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"),
+    ]
+    if has_drawing:
+        overrides.append(("/xl/drawings/drawing1.xml", "application/vnd.openxmlformats-officedocument.drawing+xml"))
+    items = "".join(f'<Override PartName="{name}" ContentType="{content_type}"/>' for name, content_type in overrides)
+    return ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Default Extension="jpeg" ContentType="image/jpeg"/>'
+            f'{items}</Types>')
+
+
+def sample_images(count):
+    """count 张小尺寸 JPEG（IMAGE_VARIANTS 种渐变图循环使用）"""
+    from PIL import Image
+
+    variants = []
+    width, height = IMAGE_SIZE
+    for variant in range(min(count, IMAGE_VARIANTS)):
+        image = Image.new("RGB", IMAGE_SIZE)
+        image.putdata([((x * 255 // width + variant * 37) % 256,
+                        (y * 255 // height + variant * 61) % 256,
+                        (variant * 97) % 256) for y in range(height) for x in range(width)])
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=85)
+        variants.append(buffer.getvalue())
+    return [variants[index % len(variants)] for index in range(count)]
+
+
+def write_workbook(path, rows, anchor_rows):
+    """写出与 仙台地层岩石矿物分析-完整.xlsx 结构相同的工作簿；图片按 anchor_rows 顺序编号"""
+    has_drawing = bool(anchor_rows)
+    sheet, strings = sheet_xml(rows, has_drawing)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", content_types_xml(has_drawing))
+        archive.writestr("_rels/.rels", relationships_xml([("rId1", NS_R + "/officeDocument", "xl/workbook.xml")]))
+        archive.writestr("xl/workbook.xml",
+                         f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                         f'<workbook xmlns="{NS_MAIN}" xmlns:r="{NS_R}"><sheets>'
+                         f'<sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        archive.writestr("xl/_rels/workbook.xml.rels", relationships_xml([
+            ("rId1", REL_WORKSHEET, "worksheets/sheet1.xml"),
+            ("rId2", REL_SHARED_STRINGS, "sharedStrings.xml"),
+        ]))
+        archive.writestr("xl/sharedStrings.xml", shared_strings_xml(strings))
+        archive.writestr("xl/worksheets/sheet1.xml", sheet)
+        if not has_drawing:
+            return
+        archive.writestr("xl/worksheets/_rels/sheet1.xml.rels",
+                         relationships_xml([("rId1", REL_DRAWING, "../drawings/drawing1.xml")]))
+        archive.writestr("xl/drawings/drawing1.xml", drawing_xml(anchor_rows))
+        archive.writestr("xl/drawings/_rels/drawing1.xml.rels", relationships_xml(
+            [(f"rId{number}", REL_IMAGE, f"../media/image{number}.jpeg")
+             for number in range(1, len(anchor_rows) + 1)]))
+        # JPEG 已压缩，与 Excel 一样直接存储
+        for number, data in enumerate(sample_images(len(anchor_rows)), start=1):
+            archive.writestr(f"xl/media/image{number}.jpeg", data, compress_type=zipfile.ZIP_STORED)
+
+
+def write_csv_rows(path, rows, encoding='utf-8'):
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        csv.writer(f).writerows(rows)
+
+
+def template_digest():
+    digest = hashlib.sha256(str(GENERATOR_VERSION).encode())
+    for path in (MINERAL_CSV_PATH, FOSSIL_CSV_PATH):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def prepare_dataset(scale, regenerate=False):
+    """生成（或复用）指定规模的合成数据，返回路径和规模信息"""
+    data_dir = os.path.join(BENCHMARK_DIR, f"x{scale}")
+    info_path = os.path.join(data_dir, "dataset.json")
+    digest = template_digest()
+    if not regenerate and os.path.exists(info_path):
+        with open(info_path, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+        if info.get("templateDigest") == digest:
+            return info
+
+    print(f"生成 {scale}× 合成数据...")
+    started = time.perf_counter()
+    shutil.rmtree(data_dir, ignore_errors=True)
+    os.makedirs(data_dir)
+
+    mineral_rows = scale_mineral_rows(read_csv_rows(MINERAL_CSV_PATH), scale)
+    fossil_rows = scale_fossil_rows(read_csv_rows(FOSSIL_CSV_PATH, 'utf-8-sig'), scale)
+    anchor_rows = first_rows_of_minerals(mineral_rows)
+    info = {
+        "scale": scale,
+        "templateDigest": digest,
+        "excel": os.path.join(data_dir, "minerals.xlsx"),
+        "mineralsCsv": os.path.join(data_dir, "minerals.csv"),
+        "fossilsCsv": os.path.join(data_dir, "fossils.csv"),
+        "rows": len(mineral_rows) - 1,
+        "images": len(anchor_rows),
+        "fossils": len(fossil_rows) - 1,
+    }
+    write_workbook(info["excel"], mineral_rows, anchor_rows)
+    write_csv_rows(info["mineralsCsv"], mineral_rows)
+    write_csv_rows(info["fossilsCsv"], fossil_rows, 'utf-8-sig')
+    write_json_if_changed(info_path, info)
+    print(f"  {info['rows']} 行，{info['images']} 张图片，{info['fossils']} 个化石，"
+          f"工作簿 {os.path.getsize(info['excel']) / 1024 / 1024:.1f} MB，用时 {time.perf_counter() - started:.1f}s")
+    return info
+
+
+def import_converter():
+    """convert_excel_to_csv.py 放在源数据目录中"""
+    if MINERAL_RELATED_DIR not in sys.path:
+        sys.path.insert(0, MINERAL_RELATED_DIR)
+    from convert_excel_to_csv import extract_excel_data
+    return extract_excel_data
+
+
+def check_rows(data, info):
+    if len(data) != info["rows"] + 1:
+        raise BenchmarkError(f"读取 {len(data)} 行，应为 {info['rows'] + 1} 行")
+
+
+def count_images(directory):
+    return len([name for name in os.listdir(directory) if name.lower().endswith(('.jpg', '.jpeg', '.png'))])
+
+
+# 每个用例的准备函数 (合成数据, 工作目录) -> 被计时的无参函数；准备工作不计时
+
+def setup_convert_cold(info, work_dir):
+    """工作簿缓存为空：解压并解析全部 XML"""
+    from workbook_cache import WorkbookCache
+
+    extract_excel_data = import_converter()
+    cache_dir = os.path.join(work_dir, "workbook-cold")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    cache = WorkbookCache(cache_dir)
+    return lambda: check_rows(extract_excel_data(info["excel"], cache), info)
+
+
+def setup_convert_warm(info, work_dir):
+    """工作簿未变化：只读中央目录和缓存"""
+    from workbook_cache import WorkbookCache
+
+    extract_excel_data = import_converter()
+    cache_dir = os.path.join(work_dir, "workbook-warm")
+    if not os.path.isdir(cache_dir):
+        extract_excel_data(info["excel"], WorkbookCache(cache_dir))
+    cache = WorkbookCache(cache_dir)
+    return lambda: check_rows(extract_excel_data(info["excel"], cache), info)
+
+
+def setup_build_db(info, work_dir):
+    from generate_mineral_database import process_csv_to_json
+
+    output = os.path.join(work_dir, "database.json")
+    if os.path.exists(output):
+        os.remove(output)
+    # 合成数据不对应手工修订
+    return lambda: process_csv_to_json(info["mineralsCsv"], output, None)
+
+
+def setup_add_fossils(info, work_dir):
+    from add_fossils_to_database import add_fossils_to_database
+    from generate_mineral_database import process_csv_to_json
+
+    base = os.path.join(work_dir, "database.base.json")
+    if not os.path.exists(base):
+        process_csv_to_json(info["mineralsCsv"], base, None)
+    output = os.path.join(work_dir, "database.fossils.json")
+    if os.path.exists(output):
+        os.remove(output)
+    return lambda: add_fossils_to_database(base, info["fossilsCsv"], output, None)
+
+
+def setup_extract_images(info, work_dir):
+    """流水线使用的提取方式：唯一矿物按首次出现顺序对应图片"""
+    from extract_final_correct import extract_final_correct_mapping
+
+    output_dir = os.path.join(work_dir, "images")
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    def run():
+        extract_final_correct_mapping(info["excel"], info["mineralsCsv"], output_dir)
+        if count_images(output_dir) != info["images"]:
+            raise BenchmarkError(f"提取 {count_images(output_dir)} 张图片，应为 {info['images']} 张")
+    return run
+
+
+def setup_extract_by_row(info, work_dir):
+    """按 CSV 行顺序提取（每张图片都列一次输出目录）"""
+    from extract_correct_by_csv_order import extract_by_csv_order
+
+    output_dir = os.path.join(work_dir, "images-by-row")
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    def run():
+        if not extract_by_csv_order(info["excel"], info["mineralsCsv"], output_dir):
+            raise BenchmarkError("按行提取失败")
+    return run
+
+
+# (名称, 准备函数, 最大规模)；按行提取的耗时随图片数平方增长，1000× 需要数十分钟
+CASES = (
+    ("extract_excel_data/cold", setup_convert_cold, None),
+    ("extract_excel_data/warm", setup_convert_warm, None),
+    ("process_csv_to_json", setup_build_db, None),
+    ("add_fossils_to_database", setup_add_fossils, None),
+    ("extract_final_correct_mapping", setup_extract_images, None),
+    ("extract_by_csv_order", setup_extract_by_row, 100),
+)
+
+
+def result_key(name, scale):
+    return f"{name}@{scale}x"
+
+
+def time_case(setup, info, work_dir, repeat):
+    """执行 repeat 次，取最短耗时（准备和被测函数的输出被丢弃）"""
+    best = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            run = setup(info, work_dir)
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def machine_info():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(results, baseline, tolerance):
+    """与基准比较，返回 {键: (基准耗时, 比值, 是否退化)}；基准中没有的键不出现"""
+    comparison = {}
+    for key, seconds in results.items():
+        base = baseline["results"].get(key)
+        if not base:
+            continue
+        regressed = seconds > base * (1 + tolerance) and seconds - base > MIN_REGRESSION_SECONDS
+        comparison[key] = (base, seconds / base, regressed)
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据流水线基准测试（合成数据）")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES), help="数据规模（相对现有数据的倍数）")
+    parser.add_argument("--cases", nargs="+", choices=[name for name, _, _ in CASES], help="只运行这些用例")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="每个用例的执行次数（取最短耗时）")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基准文件")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果写入基准文件")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="允许的耗时增长比例")
+    parser.add_argument("--json", help="把本次结果写到 JSON 文件")
+    parser.add_argument("--regenerate", action="store_true", help="重新生成合成数据")
+    args = parser.parse_args()
+
+    baseline = None if args.save_baseline else load_baseline(args.baseline)
+    if baseline is not None and baseline.get("machine") != machine_info():
+        print("注意: 基准是在另一台机器/Python 版本上记录的，比较结果仅供参考")
+
+    results = {}
+    regressions = 0
+    print(f"{'用例':45} {'耗时':>10} {'基准':>10} {'变化':>8}")
+    for scale in args.scales:
+        info = prepare_dataset(scale, args.regenerate)
+        work_dir = os.path.join(BENCHMARK_DIR, f"x{scale}", "work")
+        os.makedirs(work_dir, exist_ok=True)
+        for name, setup, max_scale in CASES:
+            if args.cases and name not in args.cases:
+                continue
+            if max_scale is not None and scale > max_scale:
+                continue
+            key = result_key(name, scale)
+            with stage(key):
+                seconds = time_case(setup, info, work_dir, args.repeat)
+            results[key] = round(seconds, 6)
+
+            line = f"{key:45} {seconds * 1000:9.1f}ms"
+            if baseline is not None:
+                compared = compare({key: seconds}, baseline, args.tolerance).get(key)
+                if compared:
+                    base, ratio, regressed = compared
+                    regressions += regressed
+                    line += f" {base * 1000:9.1f}ms {(ratio - 1) * 100:+7.1f}%" + ("  ✗ 退化" if regressed else "")
+            print(line)
+
+    if args.json:
+        write_json_if_changed(args.json, {"machine": machine_info(), "repeat": args.repeat, "results": results})
+
+    if args.save_baseline:
+        # 只更新本次运行的用例，其余规模/用例的基准保留
+        saved = load_baseline(args.baseline) or {}
+        merged = dict(saved.get("results", {}))
+        merged.update(results)
+        write_json_if_changed(args.baseline, {
+            "machine": machine_info(),
+            "repeat": args.repeat,
+            "results": dict(sorted(merged.items())),
+        })
+        print(f"\n基准已保存: {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print(f"\n没有基准文件，使用 --save-baseline 记录: {args.baseline}")
+        return 0
+    print(f"\n容差 {args.tolerance * 100:.0f}%，退化 {regressions} 项")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
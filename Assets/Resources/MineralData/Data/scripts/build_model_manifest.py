@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型元数据清单生成脚本
+解析数据库 modelFile 引用的每个模型，记录包围盒、包围球半径、三角形数、
+文件大小、内容哈希和简化凸包（供凸包碰撞体使用），写入 SendaiModelManifest.json（与数据库放在同一目录），
+运行时不实例化模型即可按大小安排预加载、按尺寸摆放和缩放标本。
+坐标为 glTF 空间（右手系，Y 轴向上，单位米）；GLTFUtility 导入时会翻转 X 轴
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+from atomic_output import write_text_if_changed
+from convex_hull import HullError, convex_hull, outside_distance
+from glb_mesh import accessor_array, mesh_instances, transform_points
+from glb_utils import GlbError, GlbFile, primitive_triangle_count
+from instrumentation import run_main
+from mineral_assets import (
+    ASSET_DIRS,
+    DATABASE_PATH,
+    MINERAL_DATA_DIR,
+    MODEL_FALLBACK_DIRS,
+    MODEL_MANIFEST_PATH,
+    asset_size,
+    file_sha256,
+    iter_asset_references,
+    load_database,
+    scan_asset_tree,
+    split_stem,
+)
+
+MANIFEST_VERSION = 1
+# 坐标保留的小数位（0.1 微米）
+PRECISION = 7
+# Unity 凸包 MeshCollider 最多 255 个三角形，凸包三角形数为 2 * 顶点数 - 4
+DEFAULT_HULL_VERTICES = 64
+MAX_HULL_VERTICES = 129
+
+
+def index_models(base_dir):
+    """(目录, 主名) -> 相对路径列表，GLB 排在前面"""
+    models = {}
+    for rel_dir, filename, _ in scan_asset_tree(os.path.join(base_dir, "Models"), base_dir):
+        stem, _ = split_stem(filename)
+        models.setdefault((rel_dir, stem), []).append(f"{rel_dir}/{filename}")
+    for paths in models.values():
+        paths.sort(key=lambda path: (not path.lower().endswith(".glb"), path))
+    return models
+
+
+def resolve_model(kind, filename, models):
+    """按运行时加载规则（记录类型目录，然后 MicroscopeController 的回退目录）查找模型文件"""
+    stem, _ = split_stem(filename)
+    for directory in (ASSET_DIRS[(kind, "modelFile")],) + MODEL_FALLBACK_DIRS:
+        found = models.get((directory, stem))
+        if found:
+            return found[0]
+    return None
+
+
+# 只含数字的数组（坐标、凸包）
+NUMBER_ARRAY = re.compile(r'\[\s*(-?[\d.eE+-]+(?:,\s*-?[\d.eE+-]+)*)\s*\]')
+
+
+def dump_manifest(manifest):
+    """缩进2格输出，数字数组压缩到一行，避免凸包数据每个数占一行"""
+    text = json.dumps(manifest, ensure_ascii=False, indent=2)
+    return NUMBER_ARRAY.sub(lambda match: "[" + ", ".join(re.split(r',\s*', match.group(1))) + "]", text) + "\n"
+
+
+def _rounded(values):
+    return [round(float(value), PRECISION) for value in values]
+
+
+def hull_entry(points, max_vertices):
+    """简化凸包：顶点和三角形索引展平存储，便于 JsonUtility 读取为数组"""
+    try:
+        hull_points, hull_triangles = convex_hull(points, max_vertices)
+    except HullError:
+        return None
+    return {
+        "vertexCount": len(hull_points),
+        "vertices": _rounded(hull_points.reshape(-1)),
+        "triangles": hull_triangles.reshape(-1).tolist(),
+        "maxOutsideDistance": round(outside_distance(points, hull_points, hull_triangles), PRECISION),
+    }
+
+
+def glb_geometry(path, hull_vertices=DEFAULT_HULL_VERTICES):
+    """模型在场景空间的包围盒、包围球、三角形/顶点数和简化凸包"""
+    glb = GlbFile.load(path)
+    gltf = glb.gltf
+
+    points = []
+    triangles = 0
+    vertices = 0
+    for mesh_index, world in mesh_instances(gltf):
+        for primitive in gltf["meshes"][mesh_index]["primitives"]:
+            position = primitive.get("attributes", {}).get("POSITION")
+            if position is None:
+                continue
+            points.append(transform_points(world, accessor_array(glb, position)))
+            triangles += primitive_triangle_count(primitive, gltf)
+            vertices += gltf["accessors"][position]["count"]
+
+    if not points:
+        return None
+
+    points = np.concatenate(points)
+    low = points.min(axis=0)
+    high = points.max(axis=0)
+    center = (low + high) / 2
+    radius = float(np.linalg.norm(points - center, axis=1).max())
+
+    geometry = {
+        "triangles": triangles,
+        "vertices": vertices,
+        "bounds": {
+            "min": _rounded(low),
+            "max": _rounded(high),
+            "center": _rounded(center),
+            "size": _rounded(high - low),
+        },
+        "boundingSphere": {
+            "center": _rounded(center),
+            "radius": round(radius, PRECISION),
+        },
+    }
+    if hull_vertices:
+        hull = hull_entry(points, hull_vertices)
+        if hull:
+            geometry["convexHull"] = hull
+    return geometry
+
+
+def build_manifest(database, base_dir=MINERAL_DATA_DIR, hull_vertices=DEFAULT_HULL_VERTICES):
+    """生成清单，返回 (清单, 警告列表)"""
+    models = index_models(base_dir)
+    entries = {}
+    warnings = []
+
+    for kind, record_id, _, field, filename in iter_asset_references(database):
+        if field != "modelFile":
+            continue
+
+        rel_path = resolve_model(kind, filename, models)
+        if rel_path is None:
+            warnings.append(f"找不到模型: {filename} <- {record_id}")
+            continue
+
+        if filename in entries:
+            entry = entries[filename]
+            if entry["path"] != rel_path:
+                warnings.append(f"同名模型指向不同文件: {filename} ({entry['path']} / {rel_path})")
+            if record_id not in entry["records"]:
+                entry["records"].append(record_id)
+            continue
+
+        path = os.path.join(base_dir, rel_path)
+        entry = {
+            "path": rel_path,
+            "bytes": asset_size(path),
+            "sha256": file_sha256(path),
+            "records": [record_id],
+        }
+
+        if rel_path.lower().endswith(".glb"):
+            try:
+                geometry = glb_geometry(path, hull_vertices)
+            except (GlbError, OSError, ValueError, KeyError) as e:
+                warnings.append(f"解析失败: {rel_path} ({e})")
+                geometry = None
+            if geometry:
+                entry.update(geometry)
+        else:
+            warnings.append(f"非 GLB 模型只记录大小和哈希: {rel_path}")
+
+        entries[filename] = entry
+
+    for entry in entries.values():
+        entry["records"].sort()
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "coordinateSystem": "gltf",
+        "totalBytes": sum(entry["bytes"] for entry in entries.values()),
+        "models": dict(sorted(entries.items())),
+    }
+    return manifest, warnings
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="生成模型元数据清单 SendaiModelManifest.json")
+    parser.add_argument("--database", default=DATABASE_PATH, help="数据库JSON路径")
+    parser.add_argument("--root", default=MINERAL_DATA_DIR, help="MineralData 目录")
+    parser.add_argument("--output", default=MODEL_MANIFEST_PATH, help="清单输出路径")
+    parser.add_argument("--hull-vertices", type=int, default=DEFAULT_HULL_VERTICES,
+                        help=f"凸包顶点上限（4-{MAX_HULL_VERTICES}，0 表示不生成凸包）")
+    args = parser.parse_args()
+
+    if args.hull_vertices and not 4 <= args.hull_vertices <= MAX_HULL_VERTICES:
+        print(f"--hull-vertices 必须在 4 到 {MAX_HULL_VERTICES} 之间", file=sys.stderr)
+        return 2
+
+    if not os.path.exists(args.database):
+        print(f"数据库文件不存在: {args.database}", file=sys.stderr)
+        return 2
+
+    print("=" * 80)
+    print("生成模型元数据清单")
+    print("=" * 80)
+
+    manifest, warnings = build_manifest(load_database(args.database), args.root, args.hull_vertices)
+
+    written = write_text_if_changed(args.output, dump_manifest(manifest))
+
+    for model_file, entry in manifest["models"].items():
+        if "bounds" in entry:
+            size = " x ".join(f"{value:.3f}" for value in entry["bounds"]["size"])
+            hull = entry.get("convexHull")
+            hull_text = f"  凸包 {hull['vertexCount']} 顶点" if hull else ""
+            print(f"  ✓ {model_file:35} {entry['bytes'] / 1024:9.1f} KB  {entry['triangles']:6d} 三角形  "
+                  f"尺寸 {size}{hull_text}")
+        else:
+            print(f"  - {model_file:35} {entry['bytes'] / 1024:9.1f} KB")
+
+    for warning in warnings:
+        print(f"⚠️  {warning}")
+
+    print(f"\n模型数量: {len(manifest['models'])}，总大小: {manifest['totalBytes'] / 1024 / 1024:.1f} MB")
+    if written:
+        print(f"✅ 清单已保存: {args.output}")
+    else:
+        print(f"✅ 清单无变化，未写入: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
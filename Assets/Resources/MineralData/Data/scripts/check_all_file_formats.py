@@ -10,16 +10,18 @@ import os
 import shutil
 from collections import defaultdict
 
+from atomic_output import copy_if_changed
+from instrumentation import Progress, run_main, stage
+from workbook_cache import open_workbook
+
 def analyze_all_files_in_excel(excel_file):
     """分析Excel中的所有文件，不限制格式"""
     print(f"分析Excel文件中的所有内容: {excel_file}")
     
-    temp_zip = excel_file + '.temp.zip'
-    shutil.copy2(excel_file, temp_zip)
-    
     try:
-        with zipfile.ZipFile(temp_zip, 'r') as zip_ref:
-            all_files = zip_ref.namelist()
+        # 只需要中央目录中的部件信息，不解压
+        with open_workbook(excel_file) as book:
+            all_files = list(book.members)
             
             print(f"\n=== Excel文件完整内容 ({len(all_files)} 个文件) ===")
             
@@ -43,7 +45,7 @@ def analyze_all_files_in_excel(excel_file):
                 
                 for full_path, filename in sorted(files):
                     if filename:  # 排除目录本身
-                        file_info = zip_ref.getinfo(full_path)
+                        file_info = book.members[full_path]
                         size_kb = file_info.file_size / 1024
                         
                         # 获取文件扩展名
@@ -72,7 +74,7 @@ def analyze_all_files_in_excel(excel_file):
                 # 如果是可能的图片格式，显示文件列表
                 if ext in ['jpeg', 'jpg', 'png', 'gif', 'bmp', 'tiff', 'tif', 'webp', 'svg', 'ico', 'emf', 'wmf']:
                     for file_path in files:
-                        file_info = zip_ref.getinfo(file_path)
+                        file_info = book.members[file_path]
                         size_kb = file_info.file_size / 1024
                         print(f"    {file_path:35} ({size_kb:6.1f} KB)")
             
@@ -85,7 +87,7 @@ def analyze_all_files_in_excel(excel_file):
                 filename = os.path.basename(file_path)
                 if filename:
                     # 检查文件大小（图片通常比较大）
-                    file_info = zip_ref.getinfo(file_path)
+                    file_info = book.members[file_path]
                     size_kb = file_info.file_size / 1024
                     
                     # 可能的图片文件条件：
@@ -125,9 +127,6 @@ def analyze_all_files_in_excel(excel_file):
                 
     except Exception as e:
         print(f"分析失败: {e}")
-    finally:
-        if os.path.exists(temp_zip):
-            os.remove(temp_zip)
 
 def extract_all_possible_images(excel_file, output_dir):
     """提取所有可能的图片文件，不限制格式"""
@@ -140,7 +139,8 @@ def extract_all_possible_images(excel_file, output_dir):
     extracted_count = 0
     
     try:
-        with zipfile.ZipFile(temp_zip, 'r') as zip_ref:
+        with stage("extract_files"), zipfile.ZipFile(temp_zip, 'r') as zip_ref, \
+                Progress("提取文件", counter="images_extracted") as progress:
             for file_info in zip_ref.filelist:
                 file_path = file_info.filename
                 filename = os.path.basename(file_path)
@@ -187,10 +187,10 @@ def extract_all_possible_images(excel_file, output_dir):
                         
                         target_path = os.path.join(output_dir, f"all_{extracted_count+1:03d}_{target_filename}")
                         
-                        shutil.copy2(source_path, target_path)
+                        copy_if_changed(source_path, target_path)
                         extracted_count += 1
                         
-                        print(f"{extracted_count:2d}. {file_path:35} -> {target_filename:20} ({size_kb:6.1f} KB)")
+                        progress.update(detail=f"{file_path} -> {target_filename} ({size_kb:.1f} KB)")
                         
                     except Exception as e:
                         print(f"提取失败 {file_path}: {e}")
@@ -236,4 +236,4 @@ def main():
     print("=" * 80)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run_main(main)
\ No newline at end of file
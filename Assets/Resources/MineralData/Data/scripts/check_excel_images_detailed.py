@@ -6,10 +6,13 @@
 """
 
 import zipfile
-import xml.etree.ElementTree as ET
 import os
 import shutil
 
+from atomic_output import copy_if_changed
+from instrumentation import Progress, run_main, stage
+from workbook_cache import open_workbook, parse_drawing_references
+
 def analyze_excel_structure(excel_file):
     """详细分析Excel文件结构"""
     print(f"分析Excel文件: {excel_file}")
@@ -18,14 +21,10 @@ def analyze_excel_structure(excel_file):
         print(f"文件不存在: {excel_file}")
         return
     
-    # 复制为ZIP文件
-    temp_zip = excel_file + '.temp.zip'
-    shutil.copy2(excel_file, temp_zip)
-    
     try:
-        with zipfile.ZipFile(temp_zip, 'r') as zip_ref:
+        with open_workbook(excel_file) as book:
             print("\n=== Excel文件内容结构 ===")
-            all_files = zip_ref.namelist()
+            all_files = list(book.members)
             
             # 分类显示文件
             media_files = [f for f in all_files if f.startswith('xl/media/')]
@@ -41,7 +40,7 @@ def analyze_excel_structure(excel_file):
             if media_files:
                 print(f"\n=== 媒体文件列表 ({len(media_files)} 个) ===")
                 for i, media_file in enumerate(media_files, 1):
-                    file_info = zip_ref.getinfo(media_file)
+                    file_info = book.members[media_file]
                     size_kb = file_info.file_size / 1024
                     print(f"{i:2d}. {media_file:25} ({size_kb:6.1f} KB)")
                     
@@ -58,42 +57,36 @@ def analyze_excel_structure(excel_file):
             
             # 尝试分析工作表中的图片引用
             try:
-                analyze_worksheet_images(zip_ref, worksheet_files)
+                analyze_worksheet_images(book, worksheet_files)
             except Exception as e:
                 print(f"分析工作表图片引用失败: {e}")
+            
+            print(book.cache.summary())
                 
     except Exception as e:
         print(f"分析Excel文件失败: {e}")
-    finally:
-        # 清理临时文件
-        if os.path.exists(temp_zip):
-            os.remove(temp_zip)
 
-def analyze_worksheet_images(zip_ref, worksheet_files):
-    """分析工作表中的图片引用"""
+def analyze_worksheet_images(book, worksheet_files):
+    """分析工作表中的图片引用（解析结果按部件缓存）"""
     print(f"\n=== 工作表图片引用分析 ===")
     
     for worksheet_file in worksheet_files:
         try:
-            worksheet_content = zip_ref.read(worksheet_file).decode('utf-8')
+            has_reference, elements = book.parse(worksheet_file, parse_drawing_references)
             
             # 查找图片相关的XML标记
-            if '<drawing' in worksheet_content or 'image' in worksheet_content.lower():
+            if has_reference:
                 print(f"工作表 {worksheet_file} 包含图片引用")
                 
-                # 尝试解析XML
-                try:
-                    root = ET.fromstring(worksheet_content)
-                    
-                    # 查找绘图元素
-                    for elem in root.iter():
-                        if 'drawing' in elem.tag.lower():
-                            print(f"  找到绘图元素: {elem.tag}")
-                            if elem.attrib:
-                                print(f"  属性: {elem.attrib}")
-                                
-                except ET.ParseError:
+                if elements is None:
                     print(f"  XML解析失败")
+                    continue
+                
+                # 绘图元素
+                for tag, attrib in elements:
+                    print(f"  找到绘图元素: {tag}")
+                    if attrib:
+                        print(f"  属性: {attrib}")
                     
         except Exception as e:
             print(f"分析工作表 {worksheet_file} 失败: {e}")
@@ -109,7 +102,8 @@ def extract_all_images_force(excel_file, output_dir):
     extracted_count = 0
     
     try:
-        with zipfile.ZipFile(temp_zip, 'r') as zip_ref:
+        with stage("extract_images"), zipfile.ZipFile(temp_zip, 'r') as zip_ref, \
+                Progress("提取图片", counter="images_extracted") as progress:
             # 提取所有可能的图片文件
             for file_info in zip_ref.filelist:
                 filename = file_info.filename
@@ -148,12 +142,12 @@ def extract_all_images_force(excel_file, output_dir):
                         
                         target_path = os.path.join(output_dir, f"raw_{extracted_count + 1:03d}_{base_name}")
                         
-                        shutil.copy2(source_path, target_path)
+                        copy_if_changed(source_path, target_path)
                         extracted_count += 1
                         
                         # 显示文件信息
                         size_kb = file_info.file_size / 1024
-                        print(f"{extracted_count:2d}. {filename:35} -> {base_name:20} ({size_kb:6.1f} KB)")
+                        progress.update(detail=f"{filename} -> {base_name} ({size_kb:.1f} KB)")
                         
                     except Exception as e:
                         print(f"提取失败 {filename}: {e}")
@@ -198,4 +192,4 @@ def main():
     print("=" * 80)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run_main(main)
\ No newline at end of file
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+三维凸包计算（NumPy）
+增量式 Quickhull：每次加入离当前凸包最远的点，达到顶点上限时停止，
+得到的是原凸包的内接近似，用于生成简化的凸包碰撞体
+"""
+
+import numpy as np
+
+EPSILON_SCALE = 1e-9
+
+
+class HullError(ValueError):
+    """点集退化（共线或共面），无法构建凸包"""
+
+
+def _initial_simplex(points, epsilon):
+    """选四个不共面的极值点作为初始四面体"""
+    extremes = np.concatenate([points.argmin(axis=0), points.argmax(axis=0)])
+    pairs = [(i, j) for i in extremes for j in extremes if i < j]
+    a, b = max(pairs, key=lambda pair: np.linalg.norm(points[pair[0]] - points[pair[1]]))
+    if np.linalg.norm(points[b] - points[a]) <= epsilon:
+        raise HullError("点集退化为一个点")
+
+    direction = points[b] - points[a]
+    line_distances = np.linalg.norm(np.cross(points - points[a], direction), axis=1) / np.linalg.norm(direction)
+    c = int(line_distances.argmax())
+    if line_distances[c] <= epsilon:
+        raise HullError("点集共线")
+
+    normal = np.cross(points[b] - points[a], points[c] - points[a])
+    normal /= np.linalg.norm(normal)
+    plane_distances = (points - points[a]) @ normal
+    d = int(np.abs(plane_distances).argmax())
+    if abs(plane_distances[d]) <= epsilon:
+        raise HullError("点集共面")
+
+    return [int(a), int(b), c, d]
+
+
+class _Face:
+    __slots__ = ("vertices", "normal", "offset", "outside")
+
+    def __init__(self, points, vertices, interior):
+        a, b, c = vertices
+        normal = np.cross(points[b] - points[a], points[c] - points[a])
+        length = np.linalg.norm(normal)
+        normal = normal / length if length else normal
+        if (interior - points[a]) @ normal > 0:
+            vertices = (a, c, b)
+            normal = -normal
+        self.vertices = vertices
+        self.normal = normal
+        self.offset = float(normal @ points[vertices[0]])
+        self.outside = np.zeros(0, dtype=np.int64)
+
+    def edges(self):
+        a, b, c = self.vertices
+        return ((a, b), (b, c), (c, a))
+
+
+def _assign_outside(points, candidates, faces, epsilon):
+    """把候选点分配给距离最大的可见面"""
+    if not len(candidates) or not faces:
+        return
+    normals = np.array([face.normal for face in faces])
+    offsets = np.array([face.offset for face in faces])
+    distances = points[candidates] @ normals.T - offsets
+    best = distances.argmax(axis=1)
+    outside = distances[np.arange(len(candidates)), best] > epsilon
+    for index, face in enumerate(faces):
+        face.outside = candidates[outside & (best == index)]
+
+
+def convex_hull(points, max_vertices=None):
+    """
+    计算凸包，返回 (顶点数组 (n, 3), 三角形索引 (m, 3))
+    max_vertices: 顶点上限（不小于4），None 表示精确凸包
+    三角形为逆时针（从外侧看），法线朝外
+    """
+    points = np.unique(np.asarray(points, dtype=np.float64), axis=0)
+    if len(points) < 4:
+        raise HullError("点数少于4个")
+    if max_vertices is not None and max_vertices < 4:
+        raise ValueError("max_vertices 至少为 4")
+
+    extent = float(np.abs(points).max()) or 1.0
+    epsilon = extent * EPSILON_SCALE
+
+    simplex = _initial_simplex(points, epsilon)
+    interior = points[simplex].mean(axis=0)
+    faces = [_Face(points, tuple(simplex[i] for i in triangle), interior)
+             for triangle in ((0, 1, 2), (0, 1, 3), (0, 2, 3), (1, 2, 3))]
+    hull_vertices = set(simplex)
+
+    remaining = np.setdiff1d(np.arange(len(points)), simplex)
+    _assign_outside(points, remaining, faces, epsilon)
+
+    while max_vertices is None or len(hull_vertices) < max_vertices:
+        # 全局最远点优先，顶点数受限时近似误差最小
+        best_face = None
+        best_distance = epsilon
+        best_point = -1
+        for face in faces:
+            if len(face.outside):
+                distances = points[face.outside] @ face.normal - face.offset
+                index = int(distances.argmax())
+                if distances[index] > best_distance:
+                    best_face, best_distance, best_point = face, distances[index], int(face.outside[index])
+        if best_face is None:
+            break
+
+        eye = points[best_point]
+        visible = [face for face in faces if eye @ face.normal - face.offset > epsilon]
+        visible_edges = {edge for face in visible for edge in face.edges()}
+        horizon = [(a, b) for a, b in visible_edges if (b, a) not in visible_edges]
+
+        orphans = np.unique(np.concatenate([face.outside for face in visible]))
+        orphans = orphans[orphans != best_point]
+
+        visible_ids = {id(face) for face in visible}
+        faces = [face for face in faces if id(face) not in visible_ids]
+        new_faces = [_Face(points, (a, b, best_point), interior) for a, b in horizon]
+        faces.extend(new_faces)
+        hull_vertices.add(best_point)
+
+        _assign_outside(points, orphans, new_faces, epsilon)
+
+    used = sorted({vertex for face in faces for vertex in face.vertices})
+    remap = {old: new for new, old in enumerate(used)}
+    triangles = np.array([[remap[vertex] for vertex in face.vertices] for face in faces], dtype=np.int64)
+    return points[used], triangles
+
+
+def outside_distance(points, hull_points, hull_triangles):
+    """原始点到近似凸包外侧的最大距离（精确凸包时为 0）"""
+    a = hull_points[hull_triangles[:, 0]]
+    normals = np.cross(hull_points[hull_triangles[:, 1]] - a, hull_points[hull_triangles[:, 2]] - a)
+    lengths = np.linalg.norm(normals, axis=1)
+    valid = lengths > 0
+    normals = normals[valid] / lengths[valid, None]
+    offsets = (normals * a[valid]).sum(axis=1)
+    distances = np.asarray(points, dtype=np.float64) @ normals.T - offsets
+    return max(float(distances.max(axis=1).max()), 0.0)
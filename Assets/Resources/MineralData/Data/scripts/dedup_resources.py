@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Resources 资源内容去重工具
+并行计算 MineralData 下所有文件的哈希（按大小和修改时间缓存），
+找出内容完全相同的文件，并把数据库的 imageFile/modelFile 引用统一到同一份副本
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from atomic_output import write_json_if_changed
+from instrumentation import run_main
+from mineral_assets import (
+    ASSET_DIRS,
+    DATABASE_PATH,
+    MINERAL_DATA_DIR,
+    HashCache,
+    asset_size,
+    file_sha256,
+    iter_asset_references,
+    load_database,
+    scan_asset_tree,
+    split_stem,
+)
+
+
+def hash_tree(base_dir, cache, workers=None):
+    """并行计算目录下所有文件的哈希，返回 {相对路径: (sha256, 大小)}"""
+    results = {}
+    pending = []
+
+    for rel_dir, filename, entry in scan_asset_tree(base_dir, base_dir):
+        rel_path = filename if rel_dir == "." else f"{rel_dir}/{filename}"
+        stat_result = entry.stat()
+        size = asset_size(entry.path, stat_result.st_size)
+        sha256 = cache.lookup(entry.path, stat_result)
+        if sha256 is None:
+            pending.append((rel_path, entry.path, stat_result, size))
+        else:
+            results[rel_path] = (sha256, size)
+
+    # hashlib 计算时会释放 GIL，线程池即可并行
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        digests = executor.map(file_sha256, [path for _, path, _, _ in pending])
+        for (rel_path, path, stat_result, size), sha256 in zip(pending, digests):
+            cache.store(path, stat_result, sha256)
+            results[rel_path] = (sha256, size)
+
+    return results
+
+
+def group_duplicates(hashes):
+    """按内容哈希分组，只保留有重复的组"""
+    groups = defaultdict(list)
+    for rel_path, (sha256, size) in hashes.items():
+        groups[sha256].append((rel_path, size))
+
+    return {
+        sha256: sorted(files)
+        for sha256, files in groups.items()
+        if len(files) > 1
+    }
+
+
+def plan_reference_rewrites(database, hashes, duplicates):
+    """
+    为数据库引用选出规范副本
+    运行时按记录类型的固定目录加载，所以规范副本只能在引用所在目录内选择；
+    同组中被引用次数最多的文件优先，其次按文件名排序
+    """
+    # (目录, 主名) -> 实际文件
+    by_stem = {}
+    for rel_path in hashes:
+        rel_dir, _, filename = rel_path.rpartition("/")
+        stem, _ = split_stem(filename)
+        by_stem.setdefault((rel_dir, stem), []).append(rel_path)
+
+    references = []
+    ref_counts = defaultdict(int)
+    for kind, record_id, _, field, filename in iter_asset_references(database):
+        asset_dir = ASSET_DIRS[(kind, field)]
+        stem, _ = split_stem(filename)
+        matches = by_stem.get((asset_dir, stem), [])
+        if len(matches) != 1:
+            continue
+        references.append((kind, record_id, field, filename, asset_dir, matches[0]))
+        ref_counts[matches[0]] += 1
+
+    rewrites = {}
+    for kind, record_id, field, filename, asset_dir, resolved in references:
+        sha256, _ = hashes[resolved]
+        group = duplicates.get(sha256)
+        if not group:
+            continue
+
+        candidates = [path for path, _ in group if path.rpartition("/")[0] == asset_dir]
+        canonical = min(candidates, key=lambda path: (-ref_counts[path], path))
+        if canonical != resolved:
+            canonical_name = canonical.rpartition("/")[2]
+            rewrites[(kind, record_id, field)] = (filename, canonical_name)
+
+    return rewrites
+
+
+def apply_reference_rewrites(database, rewrites):
+    """把重写计划应用到数据库"""
+    changed = 0
+    for layer in database.get("stratigraphicLayers", []):
+        records = [("mineral", mineral["mineralId"], mineral)
+                   for rock in layer.get("rockTypes", [])
+                   for mineral in rock.get("minerals", [])]
+        records += [("fossil", fossil["fossilId"], fossil) for fossil in layer.get("fossils", [])]
+
+        for kind, record_id, record in records:
+            properties = record.get("properties", {})
+            for field in ("imageFile", "modelFile"):
+                rewrite = rewrites.get((kind, record_id, field))
+                if rewrite and properties.get(field) == rewrite[0]:
+                    properties[field] = rewrite[1]
+                    changed += 1
+    return changed
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="按内容哈希查找 MineralData 中的重复资源")
+    parser.add_argument("--database", default=DATABASE_PATH, help="数据库JSON路径")
+    parser.add_argument("--root", default=MINERAL_DATA_DIR, help="MineralData 目录")
+    parser.add_argument("--workers", type=int, default=None, help="哈希线程数")
+    parser.add_argument("--apply", action="store_true", help="把数据库引用改写为规范副本")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出重复分组")
+    args = parser.parse_args()
+    # --json 时标准输出只有 JSON，说明性输出写到标准错误
+    log = sys.stderr if args.json else sys.stdout
+
+    print("=" * 80, file=log)
+    print("MineralData 资源内容去重", file=log)
+    print("=" * 80, file=log)
+
+    cache = HashCache()
+    hashes = hash_tree(args.root, cache, args.workers)
+    cache.save()
+    print(f"文件总数: {len(hashes)} 个 (缓存命中 {cache.hits}，新计算 {cache.misses})", file=log)
+
+    duplicates = group_duplicates(hashes)
+    wasted = sum(files[0][1] * (len(files) - 1) for files in duplicates.values())
+
+    if args.json:
+        print(json.dumps({sha256: [path for path, _ in files] for sha256, files in duplicates.items()},
+                         ensure_ascii=False, indent=2))
+    else:
+        print(f"\n重复分组 ({len(duplicates)} 组):")
+        for sha256, files in sorted(duplicates.items(), key=lambda item: item[1]):
+            print(f"  {sha256[:12]} ({files[0][1] / 1024:.1f} KB × {len(files)})")
+            for path, _ in files:
+                print(f"    - {path}")
+
+    print(f"\n重复内容占用: {wasted / 1024 / 1024:.2f} MB", file=log)
+
+    if not os.path.exists(args.database):
+        print(f"数据库文件不存在: {args.database}", file=log)
+        return 0
+
+    database = load_database(args.database)
+    rewrites = plan_reference_rewrites(database, hashes, duplicates)
+
+    print(f"\n=== 数据库引用改写 ({len(rewrites)} 条) ===", file=log)
+    for (kind, record_id, field), (old_name, new_name) in sorted(rewrites.items()):
+        print(f"  {kind:8} {record_id:25} {field}: {old_name} -> {new_name}", file=log)
+
+    if args.apply and rewrites:
+        changed = apply_reference_rewrites(database, rewrites)
+        write_json_if_changed(args.database, database)
+        print(f"\n✅ 已改写 {changed} 处引用: {args.database}", file=log)
+        print("不再被引用的副本可用 prune_unreachable_assets.py 移出 Resources", file=log)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
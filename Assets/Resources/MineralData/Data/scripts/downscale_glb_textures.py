@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GLB 内嵌贴图缩小与重新编码工具
+- 把超过最大尺寸的内嵌图片按比例缩小后重新编码（JPEG 质量可配置，PNG 开启压缩优化）
+- 未缩小的图片只有重新编码后更小时才替换
+- --pack-orm: 材质的遮挡贴图和金属度/粗糙度贴图不是同一张时，合并为一张
+  （R=遮挡，G=粗糙度，B=金属度），两个槽位共用
+处理后删除不再使用的贴图和图片并重新打包BIN块，多个模型并行处理
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from glb_inspect import find_models
+from glb_utils import GlbError, GlbFile
+from instrumentation import run_main
+from mineral_assets import MINERAL_DATA_DIR
+from profiling import worker_initializer
+from quantize_glb import optimized_output_dir
+
+DECODABLE_TYPES = {"image/jpeg": "JPEG", "image/png": "PNG"}
+
+
+def encode_image(image, image_format, quality):
+    """按格式编码 PIL 图片，返回字节"""
+    buffer = io.BytesIO()
+    if image_format == "JPEG":
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=False)
+    else:
+        image.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def texture_references(gltf):
+    """遍历材质中所有 *Texture 槽位（包括扩展），返回 textureInfo 字典列表"""
+    references = []
+
+    def walk(value):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key.endswith("Texture") and isinstance(item, dict) and "index" in item:
+                    references.append(item)
+                walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+
+    walk(gltf.get("materials", []))
+    return references
+
+
+def remove_unused_textures(gltf):
+    """删除没有材质引用的贴图和没有贴图引用的图片"""
+    references = texture_references(gltf)
+    textures = gltf.get("textures", [])
+    used = sorted({reference["index"] for reference in references})
+    texture_remap = {old: new for new, old in enumerate(used)}
+    for reference in references:
+        reference["index"] = texture_remap[reference["index"]]
+    textures = [textures[index] for index in used]
+
+    images = gltf.get("images", [])
+    used_images = sorted({texture["source"] for texture in textures if "source" in texture})
+    image_remap = {old: new for new, old in enumerate(used_images)}
+    for texture in textures:
+        if "source" in texture:
+            texture["source"] = image_remap[texture["source"]]
+
+    removed = len(images) - len(used_images)
+    if textures:
+        gltf["textures"] = textures
+        gltf["images"] = [images[index] for index in used_images]
+    else:
+        gltf.pop("textures", None)
+        gltf.pop("images", None)
+    return removed
+
+
+def pack_orm(glb, quality):
+    """
+    合并遮挡与金属度/粗糙度贴图
+    两者 texCoord 必须相同；新图片尺寸取两者较大值，编码为 PNG（无损保留通道数据）
+    返回合并的材质数量
+    """
+    gltf = glb.gltf
+    packed = 0
+    for material in gltf.get("materials", []):
+        occlusion = material.get("occlusionTexture")
+        metallic_roughness = material.get("pbrMetallicRoughness", {}).get("metallicRoughnessTexture")
+        if not occlusion or not metallic_roughness:
+            continue
+        if occlusion.get("texCoord", 0) != metallic_roughness.get("texCoord", 0):
+            continue
+
+        textures = gltf["textures"]
+        occlusion_source = textures[occlusion["index"]].get("source")
+        mr_source = textures[metallic_roughness["index"]].get("source")
+        if occlusion_source is None or mr_source is None or occlusion_source == mr_source:
+            continue
+
+        occlusion_data = glb.image_bytes(occlusion_source)
+        mr_data = glb.image_bytes(mr_source)
+        if occlusion_data is None or mr_data is None:
+            continue
+
+        occlusion_image = Image.open(io.BytesIO(occlusion_data)).convert("RGB")
+        mr_image = Image.open(io.BytesIO(mr_data)).convert("RGB")
+        # 宽高分别取较大值（元组按字典序比较，会缩小较高的一张）
+        size = (max(occlusion_image.width, mr_image.width), max(occlusion_image.height, mr_image.height))
+        if occlusion_image.size != size:
+            occlusion_image = occlusion_image.resize(size, Image.LANCZOS)
+        if mr_image.size != size:
+            mr_image = mr_image.resize(size, Image.LANCZOS)
+
+        _, green, blue = mr_image.split()
+        orm = Image.merge("RGB", (occlusion_image.split()[0], green, blue))
+        view_index = glb.add_buffer_view(encode_image(orm, "PNG", quality))
+
+        gltf["images"].append({"name": f"{material.get('name', 'material')}_orm", "mimeType": "image/png",
+                               "bufferView": view_index})
+        texture = dict(textures[metallic_roughness["index"]])
+        texture["source"] = len(gltf["images"]) - 1
+        textures.append(texture)
+        occlusion["index"] = len(textures) - 1
+        metallic_roughness["index"] = len(textures) - 1
+        packed += 1
+
+    return packed
+
+
+def downscale_images(glb, max_dimension, quality):
+    """缩小并重新编码内嵌图片，返回每张图片的统计"""
+    results = []
+    for index, image_info in enumerate(glb.gltf.get("images", [])):
+        data = glb.image_bytes(index)
+        image_format = DECODABLE_TYPES.get(image_info.get("mimeType"))
+        if data is None or image_format is None:
+            continue
+
+        image = Image.open(io.BytesIO(data))
+        width, height = image.size
+        scale = min(1.0, max_dimension / max(width, height))
+        new_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+
+        resized = image.resize(new_size, Image.LANCZOS) if scale < 1.0 else image
+        encoded = encode_image(resized, image_format, quality)
+        if scale >= 1.0 and len(encoded) >= len(data):
+            encoded = data
+            new_size = (width, height)
+
+        if encoded is not data:
+            glb.replace_buffer_view(image_info["bufferView"], encoded)
+        results.append({
+            "name": image_info.get("name", ""),
+            "before": [width, height, len(data)],
+            "after": [new_size[0], new_size[1], len(encoded)],
+        })
+    return results
+
+
+def process_model(rel_path, path, target, max_dimension, quality, orm):
+    """处理单个模型（在子进程中运行），返回统计"""
+    try:
+        before = os.path.getsize(path)
+        glb = GlbFile.load(path)
+        packed = pack_orm(glb, quality) if orm else 0
+        removed = remove_unused_textures(glb.gltf) if packed else 0
+        images = downscale_images(glb, max_dimension, quality)
+        glb.repack()
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        glb.save(target)
+    except (GlbError, OSError, ValueError, KeyError) as e:
+        return {"error": str(e)}
+
+    return {
+        "output": target,
+        "bytesBefore": before,
+        "bytesAfter": os.path.getsize(target),
+        "packedMaterials": packed,
+        "removedImages": removed,
+        "images": images,
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="缩小并重新编码 GLB 内嵌贴图")
+    parser.add_argument("models", nargs="*", help="要处理的 GLB 文件（默认 MineralData/Models 下全部）")
+    parser.add_argument("--root", default=MINERAL_DATA_DIR, help="MineralData 目录")
+    parser.add_argument("--output-dir", default=optimized_output_dir("downscaled"),
+                        help="输出目录（保持相对 MineralData 的路径，默认 OptimizedModels/downscaled）")
+    parser.add_argument("--in-place", action="store_true", help="直接覆盖原文件")
+    parser.add_argument("--max-dimension", type=int, default=1024, help="贴图最大边长")
+    parser.add_argument("--quality", type=int, default=85, help="JPEG 质量")
+    parser.add_argument("--pack-orm", action="store_true", help="合并遮挡与金属度/粗糙度贴图")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出统计")
+    args = parser.parse_args()
+
+    if args.models:
+        models = [(os.path.relpath(path, args.root).replace(os.sep, "/"), path) for path in args.models]
+    else:
+        models = find_models(args.root)
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=worker_initializer) as executor:
+        futures = {}
+        for rel_path, path in models:
+            target = path if args.in_place else os.path.join(args.output_dir, rel_path)
+            futures[rel_path] = executor.submit(process_model, rel_path, path, target,
+                                                args.max_dimension, args.quality, args.pack_orm)
+        for rel_path, future in futures.items():
+            results[rel_path] = future.result()
+    failed = sum(1 for stats in results.values() if "error" in stats)
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 1 if failed else 0
+
+    print("=" * 90)
+    print(f"GLB 贴图缩小 (最大边长 {args.max_dimension}，JPEG 质量 {args.quality})")
+    print("=" * 90)
+    print(f"{'模型':45} {'原大小KB':>10} {'处理后KB':>10} {'减少':>7}  贴图")
+
+    total_before = total_after = 0
+    for rel_path, stats in results.items():
+        if "error" in stats:
+            print(f"{rel_path:45} ✗ 处理失败: {stats['error']}")
+            continue
+        before, after = stats["bytesBefore"], stats["bytesAfter"]
+        total_before += before
+        total_after += after
+        dims = ",".join(sorted({f"{image['after'][0]}x{image['after'][1]}" for image in stats["images"]}))
+        print(f"{rel_path:45} {before / 1024:10.1f} {after / 1024:10.1f} {(1 - after / before) * 100:6.1f}%  {dims}")
+        if stats["packedMaterials"]:
+            print(f"    合并 ORM 贴图: {stats['packedMaterials']} 个材质，删除图片 {stats['removedImages']} 张")
+
+    if total_before:
+        print(f"\n总计: {total_before / 1024 / 1024:.1f} MB -> {total_after / 1024 / 1024:.1f} MB "
+              f"(减少 {(1 - total_after / total_before) * 100:.1f}%)")
+    if not args.in_place:
+        print(f"输出目录: {args.output_dir}")
+    if failed:
+        print(f"处理失败: {failed} 个")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
@@ -10,6 +10,9 @@ import os
 import shutil
 import csv
 
+from atomic_output import copy_if_changed
+from instrumentation import Progress, run_main, stage
+
 def generate_mineral_id(mineral_name):
     """生成矿物ID"""
     name_map = {
@@ -92,11 +95,6 @@ def extract_and_rename_all_images(excel_file, csv_file, output_dir):
     all_minerals = read_all_minerals_from_csv(csv_file)
     print(f"\nCSV中总共 {len(all_minerals)} 个矿物记录")
     
-    # 显示前21个矿物
-    print(f"\n前21个矿物记录:")
-    for i, mineral in enumerate(all_minerals[:21]):
-        print(f"{i+1:2d}. 行{mineral['row']:2d}: {mineral['mineral']} -> {mineral['mineral_id']}")
-    
     os.makedirs(output_dir, exist_ok=True)
     
     # 提取Excel中的图片
@@ -114,9 +112,7 @@ def extract_and_rename_all_images(excel_file, csv_file, output_dir):
             # 按图片编号排序
             media_files.sort(key=lambda x: int(x.split('image')[1].split('.')[0]))
             
-            print(f"\nExcel中图片文件 ({len(media_files)} 个):")
-            for i, media_file in enumerate(media_files):
-                print(f"{i+1:2d}. {media_file}")
+            print(f"\nExcel中图片文件: {len(media_files)} 个")
             
             # 创建临时目录
             temp_dir = os.path.join(output_dir, 'temp')
@@ -134,29 +130,32 @@ def extract_and_rename_all_images(excel_file, csv_file, output_dir):
             renamed_count = 0
             mineral_counts = {}  # 记录每种矿物的计数
             
-            for i, extracted_path in enumerate(extracted_files):
-                if i < len(all_minerals):
-                    mineral_data = all_minerals[i]
-                    mineral_id = mineral_data['mineral_id']
-                    
-                    # 计算这种矿物是第几次出现
-                    if mineral_id not in mineral_counts:
-                        mineral_counts[mineral_id] = 0
-                    mineral_counts[mineral_id] += 1
-                    
-                    # 生成文件名
-                    _, ext = os.path.splitext(extracted_path)
-                    new_filename = f"{mineral_id}_{mineral_counts[mineral_id]:03d}{ext.lower()}"
-                    new_path = os.path.join(output_dir, new_filename)
-                    
-                    try:
-                        shutil.copy2(extracted_path, new_path)
-                        print(f"{i+1:2d}. {mineral_data['mineral']:25} -> {new_filename}")
-                        renamed_count += 1
-                    except Exception as e:
-                        print(f"重命名失败: {e}")
-                else:
-                    print(f"警告: 图片 {i+1} 没有对应的矿物数据")
+            with stage("rename_images"), \
+                    Progress("重命名图片", total=len(extracted_files), counter="images_renamed") as progress:
+                for i, extracted_path in enumerate(extracted_files):
+                    if i < len(all_minerals):
+                        mineral_data = all_minerals[i]
+                        mineral_id = mineral_data['mineral_id']
+                        
+                        # 计算这种矿物是第几次出现
+                        if mineral_id not in mineral_counts:
+                            mineral_counts[mineral_id] = 0
+                        mineral_counts[mineral_id] += 1
+                        
+                        # 生成文件名
+                        _, ext = os.path.splitext(extracted_path)
+                        new_filename = f"{mineral_id}_{mineral_counts[mineral_id]:03d}{ext.lower()}"
+                        new_path = os.path.join(output_dir, new_filename)
+                        
+                        try:
+                            copy_if_changed(extracted_path, new_path)
+                            renamed_count += 1
+                        except Exception as e:
+                            print(f"重命名失败: {e}")
+                        progress.update(detail=f"{mineral_data['mineral']} -> {new_filename}")
+                    else:
+                        print(f"警告: 图片 {i+1} 没有对应的矿物数据")
+                        progress.update()
             
             # 清理临时目录
             shutil.rmtree(temp_dir)
@@ -165,10 +164,13 @@ def extract_and_rename_all_images(excel_file, csv_file, output_dir):
             
             # 显示矿物统计
             print(f"\n=== 矿物图片统计 ===")
+            mineral_names = {}
+            for m in all_minerals:
+                mineral_names.setdefault(m['mineral_id'], m['mineral'])
             for mineral_id in sorted(mineral_counts.keys()):
                 count = mineral_counts[mineral_id]
                 # 找到对应的中文名
-                mineral_name = next((m['mineral'] for m in all_minerals if m['mineral_id'] == mineral_id), mineral_id)
+                mineral_name = mineral_names.get(mineral_id, mineral_id)
                 print(f"{mineral_id:25} : {count} 张 ({mineral_name})")
             
     except Exception as e:
@@ -225,4 +227,4 @@ def main():
     print("=" * 80)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run_main(main)
\ No newline at end of file
@@ -10,7 +10,9 @@ import zipfile
 import os
 import csv
 from collections import defaultdict
-import shutil
+
+from atomic_output import copy_if_changed, write_bytes_if_changed
+from instrumentation import Progress, run_main, stage
 
 def generate_mineral_id(mineral_name):
     """生成矿物ID"""
@@ -99,16 +101,15 @@ def extract_by_csv_order(excel_file, csv_file, temp_output_dir):
         print(f"读取Excel文件时出错: {e}")
         return
     
-    print(f"\\nExcel中图片文件 ({len(image_files)} 个):")
-    for i, img_file in enumerate(image_files, 1):
-        print(f"{i:2d}. {img_file}")
+    print(f"\\nExcel中图片文件: {len(image_files)} 个")
     
     # 按CSV行顺序映射
     print("\\n=== 按CSV行顺序映射图片 ===")
     mapping_count = min(len(image_files), len(mineral_rows))
     
     try:
-        with zipfile.ZipFile(excel_file, 'r') as zip_file:
+        with stage("extract_images"), zipfile.ZipFile(excel_file, 'r') as zip_file, \
+                Progress("提取图片", total=mapping_count, counter="images_extracted") as progress:
             for i in range(mapping_count):
                 mineral = mineral_rows[i]
                 image_file = image_files[i]
@@ -125,10 +126,9 @@ def extract_by_csv_order(excel_file, csv_file, temp_output_dir):
                 image_data = zip_file.read(image_file)
                 output_path = os.path.join(temp_output_dir, new_filename)
                 
-                with open(output_path, 'wb') as f:
-                    f.write(image_data)
+                write_bytes_if_changed(output_path, image_data)
                 
-                print(f"{i+1:2d}. {image_file:20} -> 行{mineral['row_num']:2d} {mineral['mineral_name']:15} -> {new_filename}")
+                progress.update(detail=f"{image_file} -> 行{mineral['row_num']} {mineral['mineral_name']} -> {new_filename}")
     
     except Exception as e:
         print(f"提取图片时出错: {e}")
@@ -159,35 +159,24 @@ def apply_resource_sharing(temp_dir, final_dir):
     print(f"发现 {len(mineral_groups)} 种不同矿物")
     
     # 为每种矿物选择最佳图片（优先选择_001）
-    for mineral_id, files in mineral_groups.items():
-        print(f"\\n处理矿物: {mineral_id} ({len(files)} 个文件)")
-        
-        # 优先选择 _001 版本
-        best_file = None
-        for file in files:
-            if '_001.' in file:
-                best_file = file
-                print(f"  选择 _001 版本: {file}")
-                break
-        
-        # 如果没有_001，选择第一个
-        if not best_file:
-            best_file = sorted(files)[0]
-            print(f"  选择第一个文件: {best_file}")
-        
-        # 生成最终文件名
-        _, ext = os.path.splitext(best_file)
-        final_filename = f"{mineral_id}_001{ext.lower()}"
-        
-        # 复制到最终目录
-        source_path = os.path.join(temp_dir, best_file)
-        target_path = os.path.join(final_dir, final_filename)
-        
-        try:
-            shutil.copy2(source_path, target_path)
-            print(f"  最终文件: {final_filename}")
-        except Exception as e:
-            print(f"  复制失败: {e}")
+    with stage("share_images"), Progress("复制图片", total=len(mineral_groups), counter="images_shared") as progress:
+        for mineral_id, files in mineral_groups.items():
+            # 优先选择 _001 版本，没有时选择第一个
+            best_file = next((file for file in files if '_001.' in file), None) or sorted(files)[0]
+            
+            # 生成最终文件名
+            _, ext = os.path.splitext(best_file)
+            final_filename = f"{mineral_id}_001{ext.lower()}"
+            
+            # 复制到最终目录
+            source_path = os.path.join(temp_dir, best_file)
+            target_path = os.path.join(final_dir, final_filename)
+            
+            try:
+                copy_if_changed(source_path, target_path)
+            except Exception as e:
+                print(f"  复制失败 {best_file}: {e}")
+            progress.update(detail=f"{best_file} -> {final_filename}（{len(files)} 个文件）")
     
     # 统计最终结果
     final_files = [f for f in os.listdir(final_dir) if f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp'))]
@@ -195,10 +184,6 @@ def apply_resource_sharing(temp_dir, final_dir):
     print(f"\\n=== 最终统计 ===")
     print(f"唯一矿物种类: {len(mineral_groups)}")
     print(f"最终图片文件: {len(final_files)}")
-    
-    print(f"\\n最终图片文件:")
-    for file in sorted(final_files):
-        print(f"  - {file}")
 
 def main():
     """主函数"""
@@ -228,4 +213,4 @@ def main():
         print("=" * 80)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run_main(main)
\ No newline at end of file
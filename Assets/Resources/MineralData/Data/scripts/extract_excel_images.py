@@ -7,13 +7,14 @@ Excel图片提取和重命名脚本
 
 import os
 import sys
-import pandas as pd
-from PIL import Image
 import zipfile
 import xml.etree.ElementTree as ET
 from pathlib import Path
 import shutil
 
+from atomic_output import copy_if_changed
+from instrumentation import Progress, run_main, stage
+
 def generate_mineral_id(mineral_name):
     """生成矿物ID - 与数据库脚本保持一致"""
     name_map = {
@@ -79,6 +80,9 @@ def extract_images_from_xlsx(excel_file_path, output_dir):
         output_dir: 输出目录
     """
     
+    # pandas 导入需要数秒，只在真正读取Excel时加载
+    import pandas as pd
+    
     # 确保输出目录存在
     os.makedirs(output_dir, exist_ok=True)
     
@@ -121,9 +125,11 @@ def extract_images_from_xlsx(excel_file_path, output_dir):
             temp_image_dir = os.path.join(output_dir, 'temp_images')
             os.makedirs(temp_image_dir, exist_ok=True)
             
-            for image_file in image_files:
-                zip_ref.extract(image_file, temp_image_dir)
-                print(f"提取图片: {image_file}")
+            with stage("extract_images"), \
+                    Progress("提取图片", total=len(image_files), counter="images_extracted") as progress:
+                for image_file in image_files:
+                    zip_ref.extract(image_file, temp_image_dir)
+                    progress.update(detail=image_file)
         
         # 清理临时ZIP文件
         os.remove(temp_zip)
@@ -152,6 +158,8 @@ def rename_images_by_order(df, mineral_column, temp_dir, output_dir, image_files
         image_files: 图片文件列表
     """
     
+    from PIL import Image
+    
     # 获取有效的矿物数据（去掉空值）
     valid_minerals = []
     for index, row in df.iterrows():
@@ -165,41 +173,47 @@ def rename_images_by_order(df, mineral_column, temp_dir, output_dir, image_files
     # 按照顺序匹配图片和矿物
     renamed_count = 0
     
-    for i, (row_index, mineral_name) in enumerate(valid_minerals):
-        if i < len(image_files):
-            # 生成矿物ID
-            mineral_id = generate_mineral_id(mineral_name)
-            
-            # 原图片路径
-            original_image = image_files[i]
-            temp_image_path = os.path.join(temp_dir, original_image)
-            
-            # 获取文件扩展名
-            _, ext = os.path.splitext(original_image)
-            if not ext:
-                ext = '.jpg'  # 默认扩展名
-            
-            # 新文件名
-            new_filename = f"{mineral_id}_001{ext.lower()}"
-            new_image_path = os.path.join(output_dir, new_filename)
-            
-            try:
-                # 复制并重命名图片
-                shutil.copy2(temp_image_path, new_image_path)
-                print(f"重命名成功: {mineral_name} -> {new_filename}")
-                renamed_count += 1
+    missing_images = []
+    with stage("rename_images"), Progress("重命名图片", total=min(len(valid_minerals), len(image_files)),
+                                          counter="images_renamed") as progress:
+        for i, (row_index, mineral_name) in enumerate(valid_minerals):
+            if i < len(image_files):
+                # 生成矿物ID
+                mineral_id = generate_mineral_id(mineral_name)
+                
+                # 原图片路径
+                original_image = image_files[i]
+                temp_image_path = os.path.join(temp_dir, original_image)
+                
+                # 获取文件扩展名
+                _, ext = os.path.splitext(original_image)
+                if not ext:
+                    ext = '.jpg'  # 默认扩展名
+                
+                # 新文件名
+                new_filename = f"{mineral_id}_001{ext.lower()}"
+                new_image_path = os.path.join(output_dir, new_filename)
                 
-                # 验证图片是否有效
                 try:
-                    with Image.open(new_image_path) as img:
-                        print(f"  图片验证成功: {img.size}, {img.format}")
-                except Exception as e:
-                    print(f"  警告: 图片可能损坏 {new_filename}: {e}")
+                    # 复制并重命名图片
+                    copy_if_changed(temp_image_path, new_image_path)
+                    renamed_count += 1
                     
-            except Exception as e:
-                print(f"重命名失败: {mineral_name} -> {new_filename}: {e}")
-        else:
-            print(f"警告: 矿物 '{mineral_name}' 没有对应的图片")
+                    # 验证图片是否有效
+                    try:
+                        with Image.open(new_image_path) as img:
+                            img.verify()
+                    except Exception as e:
+                        print(f"  警告: 图片可能损坏 {new_filename}: {e}")
+                        
+                except Exception as e:
+                    print(f"重命名失败: {mineral_name} -> {new_filename}: {e}")
+                progress.update(detail=f"{mineral_name} -> {new_filename}")
+            else:
+                missing_images.append(mineral_name)
+    
+    if missing_images:
+        print(f"警告: {len(missing_images)} 个矿物没有对应的图片: {', '.join(missing_images)}")
     
     print(f"\n重命名完成! 成功处理 {renamed_count} 个图片文件")
 
@@ -250,9 +264,7 @@ def main():
         if os.path.exists(output_dir):
             files = os.listdir(output_dir)
             image_files = [f for f in files if f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp'))]
-            print(f"\n生成的图片文件 ({len(image_files)} 个):")
-            for file in sorted(image_files):
-                print(f"  - {file}")
+            print(f"\n生成的图片文件: {len(image_files)} 个")
     else:
         print("\n图片提取失败!")
     
@@ -260,7 +272,7 @@ def main():
 
 if __name__ == "__main__":
     try:
-        main()
+        run_main(main)
     except KeyboardInterrupt:
         print("\n\n用户中断操作")
     except Exception as e:
@@ -12,6 +12,9 @@ import shutil
 import csv
 from pathlib import Path
 
+from atomic_output import copy_if_changed
+from instrumentation import Progress, run_main, stage
+
 def generate_mineral_id(mineral_name):
     """生成矿物ID - 与数据库脚本保持一致"""
     name_map = {
@@ -108,9 +111,7 @@ def extract_images_from_xlsx(excel_file_path, output_dir):
                 if filename.startswith('xl/media/') and any(filename.lower().endswith(ext) for ext in ['.png', '.jpg', '.jpeg', '.gif', '.bmp']):
                     image_files.append(filename)
             
-            print(f"在Excel中发现 {len(image_files)} 个图片文件:")
-            for img in image_files:
-                print(f"  - {img}")
+            print(f"在Excel中发现 {len(image_files)} 个图片文件")
             
             if not image_files:
                 print("未在Excel中找到图片文件")
@@ -122,14 +123,16 @@ def extract_images_from_xlsx(excel_file_path, output_dir):
             
             # 提取所有图片文件
             extracted_images = []
-            for image_file in image_files:
-                try:
-                    zip_ref.extract(image_file, temp_dir)
-                    extracted_path = os.path.join(temp_dir, image_file)
-                    extracted_images.append(extracted_path)
-                    print(f"提取成功: {image_file}")
-                except Exception as e:
-                    print(f"提取失败 {image_file}: {e}")
+            with stage("extract_images"), \
+                    Progress("提取图片", total=len(image_files), counter="images_extracted") as progress:
+                for image_file in image_files:
+                    try:
+                        zip_ref.extract(image_file, temp_dir)
+                        extracted_path = os.path.join(temp_dir, image_file)
+                        extracted_images.append(extracted_path)
+                    except Exception as e:
+                        print(f"提取失败 {image_file}: {e}")
+                    progress.update(detail=image_file)
             
             # 清理临时ZIP文件
             os.remove(temp_zip)
@@ -155,30 +158,33 @@ def rename_images_by_csv(csv_file_path, extracted_images, temp_dir, output_dir):
     renamed_count = 0
     
     # 按照顺序匹配
-    for i, extracted_path in enumerate(extracted_images):
-        if i < len(minerals):
-            mineral_name = minerals[i]
-            mineral_id = generate_mineral_id(mineral_name)
-            
-            # 获取文件扩展名
-            _, ext = os.path.splitext(extracted_path)
-            if not ext:
-                ext = '.jpg'
-            
-            # 新文件名
-            new_filename = f"{mineral_id}_001{ext.lower()}"
-            new_path = os.path.join(output_dir, new_filename)
-            
-            try:
-                # 复制并重命名
-                shutil.copy2(extracted_path, new_path)
-                print(f"✓ {mineral_name} -> {new_filename}")
-                renamed_count += 1
+    with stage("rename_images"), \
+            Progress("重命名图片", total=len(extracted_images), counter="images_renamed") as progress:
+        for i, extracted_path in enumerate(extracted_images):
+            if i < len(minerals):
+                mineral_name = minerals[i]
+                mineral_id = generate_mineral_id(mineral_name)
                 
-            except Exception as e:
-                print(f"✗ 重命名失败 {mineral_name}: {e}")
-        else:
-            print(f"警告: 图片 {extracted_path} 没有对应的矿物名称")
+                # 获取文件扩展名
+                _, ext = os.path.splitext(extracted_path)
+                if not ext:
+                    ext = '.jpg'
+                
+                # 新文件名
+                new_filename = f"{mineral_id}_001{ext.lower()}"
+                new_path = os.path.join(output_dir, new_filename)
+                
+                try:
+                    # 复制并重命名
+                    copy_if_changed(extracted_path, new_path)
+                    renamed_count += 1
+                    
+                except Exception as e:
+                    print(f"✗ 重命名失败 {mineral_name}: {e}")
+                progress.update(detail=f"{mineral_name} -> {new_filename}")
+            else:
+                print(f"警告: 图片 {extracted_path} 没有对应的矿物名称")
+                progress.update()
     
     # 清理临时目录
     try:
@@ -254,7 +260,7 @@ def main():
 
 if __name__ == "__main__":
     try:
-        main()
+        run_main(main)
     except KeyboardInterrupt:
         print("\n用户中断操作")
     except Exception as e:
@@ -10,6 +10,10 @@ import os
 import csv
 from collections import OrderedDict
 
+from atomic_output import write_bytes_if_changed
+from instrumentation import Progress, count, run_main, stage
+from mineral_assets import EXCEL_PATH, MINERAL_CSV_PATH, MINERAL_IMAGES_DIR
+
 def generate_mineral_id(mineral_name):
     """生成矿物ID"""
     name_map = {
@@ -55,6 +59,7 @@ def get_unique_minerals_in_order(csv_file):
         headers = next(reader)
         
         for row_num, row in enumerate(reader, start=2):
+            count("rows_parsed")
             if len(row) >= 3:
                 mineral_name = row[2].strip()
                 
@@ -78,14 +83,10 @@ def extract_final_correct_mapping(excel_file, csv_file, output_dir):
     print(f"输出目录: {output_dir}")
     
     # 获取唯一矿物（按首次出现顺序）
-    unique_minerals = get_unique_minerals_in_order(csv_file)
+    with stage("read_csv"):
+        unique_minerals = get_unique_minerals_in_order(csv_file)
     print(f"\\n发现唯一矿物种类: {len(unique_minerals)} 种")
-    
-    # 显示唯一矿物顺序
-    print("\\n唯一矿物按首次出现顺序:")
     mineral_list = list(unique_minerals.items())
-    for i, (mineral_name, info) in enumerate(mineral_list):
-        print(f"{i+1:2d}. {mineral_name:20} -> {info['mineral_id']:20} (首次出现: 行{info['first_row']})")
     
     os.makedirs(output_dir, exist_ok=True)
     
@@ -103,9 +104,7 @@ def extract_final_correct_mapping(excel_file, csv_file, output_dir):
         print(f"读取Excel文件时出错: {e}")
         return
     
-    print(f"\\nExcel中图片文件 ({len(image_files)} 个):")
-    for i, img_file in enumerate(image_files, 1):
-        print(f"{i:2d}. {img_file}")
+    print(f"\\nExcel中图片文件: {len(image_files)} 个")
     
     # 检查数量是否匹配
     if len(image_files) != len(unique_minerals):
@@ -120,7 +119,8 @@ def extract_final_correct_mapping(excel_file, csv_file, output_dir):
     print("\\n=== 图片与唯一矿物映射 ===")
     
     try:
-        with zipfile.ZipFile(excel_file, 'r') as zip_file:
+        with stage("extract_images"), zipfile.ZipFile(excel_file, 'r') as zip_file, \
+                Progress("提取图片", total=mapping_count, counter="images_extracted") as progress:
             for i in range(mapping_count):
                 mineral_name, mineral_info = mineral_list[i]
                 image_file = image_files[i]
@@ -134,10 +134,9 @@ def extract_final_correct_mapping(excel_file, csv_file, output_dir):
                 image_data = zip_file.read(image_file)
                 output_path = os.path.join(output_dir, new_filename)
                 
-                with open(output_path, 'wb') as f:
-                    f.write(image_data)
+                write_bytes_if_changed(output_path, image_data)
                 
-                print(f"{i+1:2d}. {image_file:20} -> {mineral_name:20} -> {new_filename}")
+                progress.update(detail=f"{image_file} -> {mineral_name} -> {new_filename}")
     
     except Exception as e:
         print(f"提取图片时出错: {e}")
@@ -153,10 +152,6 @@ def extract_final_correct_mapping(excel_file, csv_file, output_dir):
     print(f"Excel图片数量: {len(image_files)}")
     print(f"成功提取图片: {len(extracted_files)}")
     
-    print(f"\\n最终图片文件 ({len(extracted_files)} 个):")
-    for file in sorted(extracted_files):
-        print(f"  - {file}")
-    
     print("\\n" + "=" * 80)
     print("✅ 处理完成!")
     print("每种唯一矿物现在对应一张正确的图片")
@@ -164,9 +159,9 @@ def extract_final_correct_mapping(excel_file, csv_file, output_dir):
 
 def main():
     """主函数"""
-    excel_path = "../../MineralRelated/仙台地层岩石矿物分析-完整.xlsx"
-    csv_path = "../../MineralRelated/仙台地层岩石矿物分析-完整-新.csv"
-    output_path = "../Images/Minerals"
+    excel_path = EXCEL_PATH
+    csv_path = MINERAL_CSV_PATH
+    output_path = MINERAL_IMAGES_DIR
     
     if not os.path.exists(excel_path):
         print(f"Excel文件不存在: {excel_path}")
@@ -179,4 +174,4 @@ def main():
     extract_final_correct_mapping(excel_path, csv_path, output_path)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run_main(main)
\ No newline at end of file
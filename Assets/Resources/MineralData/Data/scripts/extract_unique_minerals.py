@@ -7,10 +7,12 @@
 
 import zipfile
 import os
-import shutil
 import csv
 from collections import OrderedDict
 
+from atomic_output import write_bytes_if_changed
+from instrumentation import Progress, run_main, stage
+
 def generate_mineral_id(mineral_name):
     """生成矿物ID"""
     name_map = {
@@ -83,11 +85,6 @@ def extract_and_map_unique_images(excel_file, csv_file, output_dir):
     unique_minerals = get_unique_minerals_from_csv(csv_file)
     print(f"\\n发现唯一矿物种类: {len(unique_minerals)} 种")
     
-    # 显示所有唯一矿物
-    print("\\n唯一矿物列表:")
-    for i, (mineral_name, info) in enumerate(unique_minerals.items(), 1):
-        print(f"{i:2d}. {mineral_name} -> {info['mineral_id']} (首次出现: 行{info['first_row']})")
-    
     os.makedirs(output_dir, exist_ok=True)
     
     # 提取Excel中的图片
@@ -104,9 +101,7 @@ def extract_and_map_unique_images(excel_file, csv_file, output_dir):
         print(f"读取Excel文件时出错: {e}")
         return
     
-    print(f"\\nExcel中图片文件 ({len(image_files)} 个):")
-    for i, img_file in enumerate(image_files, 1):
-        print(f"{i:2d}. {img_file}")
+    print(f"\\nExcel中图片文件: {len(image_files)} 个")
     
     # 检查图片数量是否匹配
     if len(image_files) < len(unique_minerals):
@@ -122,7 +117,8 @@ def extract_and_map_unique_images(excel_file, csv_file, output_dir):
     mapping_count = min(len(image_files), len(unique_minerals))
     
     try:
-        with zipfile.ZipFile(excel_file, 'r') as zip_file:
+        with stage("extract_images"), zipfile.ZipFile(excel_file, 'r') as zip_file, \
+                Progress("提取图片", total=mapping_count, counter="images_extracted") as progress:
             for i in range(mapping_count):
                 mineral_name, mineral_info = mineral_list[i]
                 image_file = image_files[i]
@@ -136,10 +132,9 @@ def extract_and_map_unique_images(excel_file, csv_file, output_dir):
                 image_data = zip_file.read(image_file)
                 output_path = os.path.join(output_dir, new_filename)
                 
-                with open(output_path, 'wb') as f:
-                    f.write(image_data)
+                write_bytes_if_changed(output_path, image_data)
                 
-                print(f"{i+1:2d}. {mineral_name:25} -> {new_filename}")
+                progress.update(detail=f"{image_file} -> {mineral_name} (首次出现: 行{mineral_info['first_row']}) -> {new_filename}")
     
     except Exception as e:
         print(f"提取图片时出错: {e}")
@@ -155,10 +150,6 @@ def extract_and_map_unique_images(excel_file, csv_file, output_dir):
     print(f"Excel图片数量: {len(image_files)}")
     print(f"成功提取图片: {len(extracted_files)}")
     
-    print(f"\\n最终图片文件:")
-    for file in sorted(extracted_files):
-        print(f"  - {file}")
-    
     print("\\n" + "=" * 80)
     print("处理完成!")
     print("每种唯一矿物现在对应一张独特的图片")
@@ -181,4 +172,4 @@ def main():
     extract_and_map_unique_images(excel_path, csv_path, output_path)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run_main(main)
\ No newline at end of file
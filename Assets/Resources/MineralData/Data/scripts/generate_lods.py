@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GLB 模型 LOD 生成工具
+使用二次误差度量 (QEM) 的边折叠简化网格，为每个模型生成多级 LOD：
+- 边折叠到已有端点，LOD 只新增索引缓冲，顶点缓冲与原网格共享
+- 边界边（包括 UV 接缝处拆开的顶点）加惩罚平面，且边界顶点只能沿边界折叠
+- 折叠后三角形法线翻转的候选会被拒绝
+结果按 MSFT_lod 写入节点扩展（各级 LOD 是额外的网格和节点），
+并在输出目录生成 lod_manifest.json 供运行时选择。
+清单中的误差是实测的表面距离（相对包围盒对角线）：原网格顶点到简化表面、
+简化三角形重心到原表面两个方向取最大，近似双向 Hausdorff 距离
+"""
+
+import argparse
+import heapq
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from atomic_output import write_json_if_changed
+from glb_inspect import find_models
+from glb_mesh import accessor_array, add_accessor, index_component_type, primitive_indices
+from glb_utils import MODE_TRIANGLES, TARGET_ELEMENT_ARRAY_BUFFER, GlbError, GlbFile
+from instrumentation import run_main
+from mineral_assets import MINERAL_DATA_DIR
+from profiling import worker_initializer
+from quantize_glb import optimized_output_dir
+
+EXTENSION_NAME = "MSFT_lod"
+MANIFEST_NAME = "lod_manifest.json"
+
+DEFAULT_RATIOS = (0.5, 0.25, 0.1)
+# 每级 LOD 切换时的屏幕覆盖率（MSFT_screencoverage），最后一项之下不渲染
+DEFAULT_COVERAGE = (0.5, 0.25, 0.1, 0.01)
+
+
+def face_quadrics(positions, triangles):
+    """按面积加权的平面二次型，累加到顶点 (n, 4, 4)"""
+    a = positions[triangles[:, 0]]
+    b = positions[triangles[:, 1]]
+    c = positions[triangles[:, 2]]
+    normals = np.cross(b - a, c - a)
+    lengths = np.linalg.norm(normals, axis=1)
+    valid = lengths > 0
+    normals[valid] /= lengths[valid, None]
+    areas = lengths / 2
+
+    planes = np.concatenate([normals, -(normals * a).sum(axis=1, keepdims=True)], axis=1)
+    quadrics = np.einsum('fi,fj->fij', planes, planes) * areas[:, None, None]
+
+    result = np.zeros((len(positions), 4, 4))
+    for corner in range(3):
+        np.add.at(result, triangles[:, corner], quadrics)
+    return result, normals
+
+
+def segment_distances(points, start, end):
+    """点 (n, 1, 3) 到线段 (m, 3) 的距离 (n, m)"""
+    edge = end - start
+    length2 = np.maximum((edge * edge).sum(axis=1), 1e-30)
+    t = np.clip(((points - start) * edge).sum(axis=2) / length2, 0.0, 1.0)
+    return np.linalg.norm(points - (start + t[..., None] * edge), axis=2)
+
+
+class SurfaceDistance:
+    """
+    点到三角网格表面的最近距离
+    三角形按包围盒放入均匀网格，查询点按所在格子分组，从所在格子逐圈向外查找，
+    已找到的最近距离不超过下一圈的最小可能距离时停止
+    """
+
+    def __init__(self, positions, triangles):
+        self.a = positions[triangles[:, 0]]
+        self.b = positions[triangles[:, 1]]
+        self.c = positions[triangles[:, 2]]
+        self.ab = self.b - self.a
+        self.ac = self.c - self.a
+        self.normals = np.cross(self.ab, self.ac)
+        self.d00 = (self.ab * self.ab).sum(axis=1)
+        self.d01 = (self.ab * self.ac).sum(axis=1)
+        self.d11 = (self.ac * self.ac).sum(axis=1)
+        denominator = self.d00 * self.d11 - self.d01 * self.d01
+        self.degenerate = denominator <= 0
+        self.denominator = np.where(self.degenerate, 1.0, denominator)
+        self.normal_lengths = np.where(self.degenerate, 1.0, np.linalg.norm(self.normals, axis=1))
+
+        corners = np.stack([self.a, self.b, self.c], axis=1)
+        low = corners.min(axis=1)
+        high = corners.max(axis=1)
+        self.origin = low.min(axis=0) if len(triangles) else np.zeros(3)
+        # 格子边长取三角形包围盒尺寸中位数的两倍，每个三角形只落在少数几个格子里
+        extent = float(np.median((high - low).max(axis=1))) if len(triangles) else 0.0
+        self.cell_size = extent * 2 or 1.0
+        self.cells = {}
+        first = self.cell_of(low)
+        last = self.cell_of(high)
+        for index, (lo, hi) in enumerate(zip(first.tolist(), last.tolist())):
+            for x in range(lo[0], hi[0] + 1):
+                for y in range(lo[1], hi[1] + 1):
+                    for z in range(lo[2], hi[2] + 1):
+                        self.cells.setdefault((x, y, z), []).append(index)
+        keys = np.array(list(self.cells)) if self.cells else np.zeros((0, 3), dtype=np.int64)
+        self.cell_range = (keys.min(axis=0), keys.max(axis=0)) if len(keys) else None
+
+    def cell_of(self, points):
+        return np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+
+    def triangle_distances(self, points, indices):
+        """点 (n, 3) 到指定三角形的最近距离 (n,)"""
+        p = points[:, None, :]
+        a = self.a[indices]
+        ab = self.ab[indices]
+        ac = self.ac[indices]
+        ap = p - a
+        d20 = (ap * ab).sum(axis=2)
+        d21 = (ap * ac).sum(axis=2)
+        d00 = self.d00[indices]
+        d01 = self.d01[indices]
+        d11 = self.d11[indices]
+        denominator = self.denominator[indices]
+        v = (d11 * d20 - d01 * d21) / denominator
+        w = (d00 * d21 - d01 * d20) / denominator
+        # 投影落在三角形内时取到平面的距离，否则取到三条边的最近距离
+        inside = (v >= 0) & (w >= 0) & (v + w <= 1) & ~self.degenerate[indices]
+        plane = np.abs((ap * self.normals[indices]).sum(axis=2)) / self.normal_lengths[indices]
+        b = self.b[indices]
+        c = self.c[indices]
+        edges = np.minimum(np.minimum(segment_distances(p, a, b), segment_distances(p, b, c)),
+                           segment_distances(p, c, a))
+        return np.where(inside, plane, edges).min(axis=1)
+
+    def ring(self, center, radius):
+        """与 center 的切比雪夫距离恰为 radius 的格子中的三角形"""
+        found = []
+        span = range(-radius, radius + 1)
+        for dx in span:
+            for dy in span:
+                edge = radius in (abs(dx), abs(dy))
+                for dz in (span if edge else (-radius, radius)):
+                    found.extend(self.cells.get((center[0] + dx, center[1] + dy, center[2] + dz), ()))
+        return found
+
+    def distances(self, points):
+        """每个点到表面的最近距离 (n,)；没有三角形时为 inf"""
+        result = np.full(len(points), np.inf)
+        if self.cell_range is None or not len(points):
+            return result
+        groups = {}
+        for index, cell in enumerate(map(tuple, self.cell_of(points).tolist())):
+            groups.setdefault(cell, []).append(index)
+
+        low, high = self.cell_range
+        for cell, indices in groups.items():
+            group = points[indices]
+            best = np.full(len(indices), np.inf)
+            # 超过这一圈就覆盖了所有有三角形的格子
+            last_ring = int(max(np.max(high - cell), np.max(np.array(cell) - low), 0))
+            for radius in range(last_ring + 1):
+                candidates = self.ring(cell, radius)
+                if candidates:
+                    best = np.minimum(best, self.triangle_distances(group, np.unique(candidates)))
+                # 第 radius+1 圈的三角形离格子内任意点至少 radius 个格子边长
+                if best.max() <= radius * self.cell_size:
+                    break
+            result[indices] = best
+        return result
+
+
+def surface_error(positions, original, simplified, original_surface=None):
+    """
+    简化网格与原网格的表面距离（近似双向 Hausdorff）
+    简化网格的顶点都是原顶点，只需测被折叠掉的原顶点到简化表面、简化三角形重心到原表面；
+    同一网格的多级 LOD 可以传入共用的 original_surface
+    """
+    used = np.zeros(len(positions), dtype=bool)
+    used[simplified.reshape(-1)] = True
+    removed = np.unique(original.reshape(-1))
+    removed = removed[~used[removed]]
+    forward = SurfaceDistance(positions, simplified).distances(positions[removed])
+    original_surface = original_surface or SurfaceDistance(positions, original)
+    backward = original_surface.distances(positions[simplified].mean(axis=1))
+    return float(max(forward.max(initial=0.0), backward.max(initial=0.0)))
+
+
+def boundary_edges(triangles):
+    """只属于一个三角形的边，返回 [(a, b, 面索引)]"""
+    edges = np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]])
+    faces = np.tile(np.arange(len(triangles)), 3)
+    keys = np.sort(edges, axis=1)
+    _, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    single = counts[inverse.reshape(-1)] == 1
+    return [(int(a), int(b), int(f)) for (a, b), f in zip(edges[single], faces[single])]
+
+
+class QuadricSimplifier:
+    """边折叠简化器，一次运行可以依次导出多个目标三角形数的索引"""
+
+    def __init__(self, positions, triangles, boundary_weight=10.0):
+        self.positions = np.asarray(positions, dtype=np.float64)
+        self.triangles = np.array(triangles, dtype=np.int64)
+        self.alive = np.ones(len(self.triangles), dtype=bool)
+        self.alive_count = len(self.triangles)
+        self.quadrics, face_normals = face_quadrics(self.positions, self.triangles)
+
+        self.vertex_faces = [set() for _ in range(len(self.positions))]
+        for face, triangle in enumerate(self.triangles.tolist()):
+            for vertex in triangle:
+                self.vertex_faces[vertex].add(face)
+
+        # 边界惩罚: 过边界边且垂直于所在三角形的平面
+        self.boundary = set()
+        for a, b, face in boundary_edges(self.triangles):
+            self.boundary.add((min(a, b), max(a, b)))
+            edge = self.positions[b] - self.positions[a]
+            normal = np.cross(edge, face_normals[face])
+            length = np.linalg.norm(normal)
+            if length == 0:
+                continue
+            normal /= length
+            plane = np.append(normal, -normal @ self.positions[a])
+            quadric = np.outer(plane, plane) * boundary_weight * float(edge @ edge)
+            self.quadrics[a] += quadric
+            self.quadrics[b] += quadric
+        self.boundary_vertices = {vertex for edge in self.boundary for vertex in edge}
+
+        self.version = [0] * len(self.positions)
+        self.heap = []
+        for a, b in self._edges():
+            self._push(a, b)
+
+    def _edges(self):
+        edges = set()
+        for triangle in self.triangles[self.alive].tolist():
+            for i in range(3):
+                a, b = triangle[i], triangle[(i + 1) % 3]
+                edges.add((min(a, b), max(a, b)))
+        return edges
+
+    def _cost(self, source, target):
+        """把 source 折叠到 target 的误差"""
+        point = np.append(self.positions[target], 1.0)
+        return float(point @ (self.quadrics[source] + self.quadrics[target]) @ point)
+
+    def _allowed(self, source, target):
+        """边界顶点只能沿边界边折叠，避免边界和 UV 接缝内缩"""
+        if source in self.boundary_vertices:
+            return (min(source, target), max(source, target)) in self.boundary
+        return True
+
+    def _push(self, a, b):
+        candidates = [(self._cost(s, t), s, t) for s, t in ((a, b), (b, a)) if self._allowed(s, t)]
+        if not candidates:
+            return
+        cost, source, target = min(candidates)
+        heapq.heappush(self.heap, (cost, source, target, self.version[source], self.version[target]))
+
+    def _flips(self, source, target):
+        """折叠后 source 周围（不含 target 的）三角形是否翻转或退化"""
+        triangles = self.triangles[list(self.vertex_faces[source])]
+        triangles = triangles[(triangles != target).all(axis=1)]
+        if not len(triangles):
+            return False
+
+        corners = self.positions[triangles]
+        before = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        corners[triangles == source] = self.positions[target]
+        after = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        return bool(((before * after).sum(axis=1) <= 0.0).any())
+
+    def _collapse(self, source, target):
+        for face in list(self.vertex_faces[source]):
+            triangle = self.triangles[face]
+            if target in triangle:
+                self.alive[face] = False
+                self.alive_count -= 1
+                for vertex in triangle:
+                    if vertex != source:
+                        self.vertex_faces[vertex].discard(face)
+            else:
+                triangle[list(triangle).index(source)] = target
+                self.vertex_faces[target].add(face)
+        self.vertex_faces[source] = set()
+        self.quadrics[target] += self.quadrics[source]
+
+        # 折叠到边界上时 source 的边界边转移给 target
+        if source in self.boundary_vertices:
+            for edge in [edge for edge in self.boundary if source in edge]:
+                self.boundary.discard(edge)
+                other = edge[0] if edge[1] == source else edge[1]
+                if other != target:
+                    self.boundary.add((min(other, target), max(other, target)))
+            self.boundary_vertices.discard(source)
+            self.boundary_vertices.add(target)
+
+        self.version[source] += 1
+        self.version[target] += 1
+        neighbors = {vertex for face in self.vertex_faces[target] for vertex in self.triangles[face].tolist()}
+        for vertex in neighbors - {target}:
+            self._push(target, vertex)
+
+    def simplify(self, target_count):
+        """折叠到活动三角形数不超过 target_count 或没有可折叠的边，返回索引 (n, 3)"""
+        while self.alive_count > target_count and self.heap:
+            cost, source, target, source_version, target_version = heapq.heappop(self.heap)
+            if source_version != self.version[source] or target_version != self.version[target]:
+                continue
+            if self._flips(source, target):
+                continue
+            self._collapse(source, target)
+        return self.triangles[self.alive].copy()
+
+
+def generate_lods(glb, ratios=DEFAULT_RATIOS, coverage=DEFAULT_COVERAGE, boundary_weight=10.0, max_error=None):
+    """
+    为 GLB 中每个被节点引用的网格生成 LOD（原地修改），返回各级统计
+    max_error 为相对对角线的误差上限，超过上限的级别及之后的级别不生成
+    """
+    gltf = glb.gltf
+    meshes = gltf.get("meshes", [])
+    nodes = gltf.get("nodes", [])
+    results = []
+    generated = False
+
+    for node_index in range(len(nodes)):
+        node = nodes[node_index]
+        if "mesh" not in node or EXTENSION_NAME in node.get("extensions", {}):
+            continue
+        mesh = meshes[node["mesh"]]
+        if any(p.get("mode", MODE_TRIANGLES) != MODE_TRIANGLES for p in mesh["primitives"]):
+            continue
+
+        simplifiers = []
+        for primitive in mesh["primitives"]:
+            positions = accessor_array(glb, primitive["attributes"]["POSITION"])
+            triangles = primitive_indices(glb, primitive)
+            diagonal = float(np.linalg.norm(positions.max(axis=0) - positions.min(axis=0))) or 1.0
+            simplifier = QuadricSimplifier(positions, triangles, boundary_weight)
+            simplifiers.append((simplifier, triangles, diagonal, SurfaceDistance(simplifier.positions, triangles)))
+
+        levels = [{
+            "lod": 0,
+            "node": node_index,
+            "mesh": node["mesh"],
+            "triangles": sum(len(triangles) for _, triangles, _, _ in simplifiers),
+            "error": 0.0,
+        }]
+        lod_nodes = []
+        for level, ratio in enumerate(ratios, start=1):
+            simplified = []
+            error = 0.0
+            for simplifier, original, diagonal, original_surface in simplifiers:
+                triangles = simplifier.simplify(max(1, int(len(original) * ratio)))
+                simplified.append(triangles)
+                error = max(error, surface_error(simplifier.positions, original, triangles, original_surface) / diagonal)
+            if max_error is not None and error > max_error:
+                break
+
+            primitives = []
+            for primitive, triangles in zip(mesh["primitives"], simplified):
+                new_primitive = {key: value for key, value in primitive.items() if key != "indices"}
+                new_primitive["attributes"] = dict(primitive["attributes"])
+                vertex_count = gltf["accessors"][primitive["attributes"]["POSITION"]]["count"]
+                new_primitive["indices"] = add_accessor(
+                    glb, triangles.reshape(-1), index_component_type(vertex_count), TARGET_ELEMENT_ARRAY_BUFFER)
+                primitives.append(new_primitive)
+
+            meshes.append({"name": f"{mesh.get('name', 'mesh')}_LOD{level}", "primitives": primitives})
+            lod_node = {key: value for key, value in node.items() if key not in ("children", "extensions", "extras")}
+            lod_node["name"] = f"{node.get('name', 'node')}_LOD{level}"
+            lod_node["mesh"] = len(meshes) - 1
+            nodes.append(lod_node)
+            lod_nodes.append(len(nodes) - 1)
+            levels.append({
+                "lod": level,
+                "node": len(nodes) - 1,
+                "mesh": len(meshes) - 1,
+                "triangles": sum(len(triangles) for triangles in simplified),
+                "error": error,
+            })
+
+        if lod_nodes:
+            node.setdefault("extensions", {})[EXTENSION_NAME] = {"ids": lod_nodes}
+            node.setdefault("extras", {})["MSFT_screencoverage"] = list(coverage[:len(lod_nodes) + 1])
+            generated = True
+        for level, screen_coverage in zip(levels, coverage):
+            level["screenCoverage"] = screen_coverage
+        results.append({"node": node.get("name", str(node_index)), "levels": levels})
+
+    if generated:
+        glb.add_extension(EXTENSION_NAME)
+        glb.repack()
+    return results
+
+
+def process_model(rel_path, path, output_dir, ratios, coverage, boundary_weight, max_error=None):
+    """处理单个模型（在子进程中运行），返回清单条目"""
+    try:
+        glb = GlbFile.load(path)
+        results = generate_lods(glb, ratios, coverage, boundary_weight, max_error)
+    except (GlbError, OSError, ValueError, KeyError) as e:
+        return {"error": str(e)}
+
+    target = os.path.join(output_dir, rel_path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    glb.save(target)
+    return {"output": rel_path, "fileBytes": os.path.getsize(target), "nodes": results}
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="使用二次误差度量为 GLB 模型生成 LOD")
+    parser.add_argument("models", nargs="*", help="要处理的 GLB 文件（默认 MineralData/Models 下全部）")
+    parser.add_argument("--root", default=MINERAL_DATA_DIR, help="MineralData 目录")
+    parser.add_argument("--output-dir", default=optimized_output_dir("lods"),
+                        help="输出目录（保持相对 MineralData 的路径，默认 OptimizedModels/lods）")
+    parser.add_argument("--ratios", type=float, nargs="+", default=list(DEFAULT_RATIOS),
+                        help="各级 LOD 相对原网格的三角形比例")
+    parser.add_argument("--boundary-weight", type=float, default=10.0, help="边界惩罚权重")
+    parser.add_argument("--max-error", type=float, default=None,
+                        help="误差上限（相对包围盒对角线，如 0.01），超过上限的级别不生成")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出清单")
+    args = parser.parse_args()
+
+    if args.models:
+        models = [(os.path.relpath(path, args.root).replace(os.sep, "/"), path) for path in args.models]
+    else:
+        models = find_models(args.root)
+
+    coverage = list(DEFAULT_COVERAGE)
+    if len(args.ratios) + 1 > len(coverage):
+        coverage += [coverage[-1]] * (len(args.ratios) + 1 - len(coverage))
+
+    manifest = {}
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=worker_initializer) as executor:
+        futures = [
+            executor.submit(process_model, rel_path, path, args.output_dir, args.ratios, coverage,
+                            args.boundary_weight, args.max_error)
+            for rel_path, path in models
+        ]
+        for (rel_path, _), future in zip(models, futures):
+            manifest[rel_path] = future.result()
+    failed = sum(1 for entry in manifest.values() if "error" in entry)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest_path = os.path.join(args.output_dir, MANIFEST_NAME)
+    write_json_if_changed(manifest_path, manifest)
+
+    if args.json:
+        print(json.dumps(manifest, ensure_ascii=False, indent=2))
+        return 1 if failed else 0
+
+    print("=" * 90)
+    print("GLB 模型 LOD 生成 (QEM)")
+    print("=" * 90)
+    for rel_path, entry in manifest.items():
+        if "error" in entry:
+            print(f"{rel_path:45} ✗ 处理失败: {entry['error']}")
+            continue
+        for node in entry["nodes"]:
+            chain = " -> ".join(f"{level['triangles']}" for level in node["levels"])
+            worst = max(level["error"] for level in node["levels"])
+            print(f"{rel_path:45} 三角形 {chain}  (最大误差 {worst * 100:.2f}% 对角线)")
+
+    print(f"\nLOD 清单: {manifest_path}")
+    if failed:
+        print(f"处理失败: {failed} 个")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
@@ -7,12 +7,13 @@
 import os
 import csv
 
-def generate_mineral_mapping_table():
+from atomic_output import atomic_write
+from instrumentation import count, run_main
+from mineral_assets import MAPPING_TABLE_PATH, MINERAL_IMAGES_DIR
+
+def generate_mineral_mapping_table(minerals_dir=MINERAL_IMAGES_DIR, output_file=MAPPING_TABLE_PATH):
     """生成矿物图片映射表格"""
     
-    minerals_dir = "../Images/Minerals"
-    output_file = "../../MineralRelated/矿物图片映射表.csv"
-    
     # 中文名称映射
     chinese_names = {
         "amphibole": "角闪石",
@@ -72,10 +73,8 @@ def generate_mineral_mapping_table():
             'mapping': f"{chinese_name}-{file}"
         })
     
-    # 输出到CSV文件
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    
-    with open(output_file, 'w', newline='', encoding='utf-8-sig') as csvfile:
+    # 输出到CSV文件（内容未变化时不写入）
+    with atomic_write(output_file, 'w', newline='', encoding='utf-8-sig') as csvfile:
         fieldnames = ['序号', '中文名称', '英文ID', '图片文件名', '映射关系']
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         
@@ -92,14 +91,10 @@ def generate_mineral_mapping_table():
                 '映射关系': data['mapping']
             })
     
+    count("mapping_rows", len(mapping_data))
     print(f"\\n映射表已生成: {output_file}")
     print(f"总计 {len(mapping_data)} 条记录")
     
-    # 显示映射关系
-    print(f"\\n=== 矿物图片映射关系 ===")
-    for i, data in enumerate(mapping_data, 1):
-        print(f"{i:2d}. {data['mapping']}")
-    
     return output_file
 
 def main():
@@ -116,4 +111,4 @@ def main():
     print("=" * 60)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run_main(main)
\ No newline at end of file
@@ -6,121 +6,106 @@
 """
 
 import csv
-import json
 import os
 
-def process_csv_to_json(csv_file_path, output_path):
+from atomic_output import write_json_if_changed
+from instrumentation import count, run_main, stage
+from mineral_assets import DATABASE_OVERRIDES_PATH, AssetNames, check_database_replacement
+from records import Database, DatabaseOverrides, Layer, Mineral, Rock
+
+def build_database(rows, asset_names=None):
     """
-    将CSV文件转换为结构化的JSON数据库
+    数据行（不含标题行，每行至少12列）-> Database 记录
+    地层名、岩石类型为空时沿用上一行；图片/模型文件名按 asset_names（默认索引 MineralData 下的资源）
     """
-    
-    # 存储所有数据
-    mineral_database = {
-        "version": "1.0",
-        "lastUpdated": "2025-01-27", 
-        "description": "仙台地区地质样本矿物数据库",
-        "stratigraphicLayers": []
-    }
+    asset_names = asset_names or AssetNames()
+    database = Database("1.0", "2025-01-27", "仙台地区地质样本矿物数据库")
     
     current_layer_name = None
     current_rock_data = None
     layer_dict = {}
+    rock_dict = {}  # (地层名, 岩石类型) -> Rock
     
-    with open(csv_file_path, 'r', encoding='utf-8') as file:
-        reader = csv.reader(file)
-        headers = next(reader)  # 跳过标题行
-        
-        for row in reader:
-            if len(row) < 12:
-                continue
-                
-            layer_name = row[0].strip()
-            rock_type = row[1].strip() 
-            mineral_name = row[2].strip()
-            percentage = float(row[3]) if row[3] else 0.0
-            hardness = row[4].strip()
-            acid_reaction = row[5].strip() == "是"
-            uv_fluorescence = row[6].strip()
-            magnetism = row[7].strip()
-            density = row[8].strip()
-            polarized_color = row[9].strip()
-            appearance = row[10].strip()
-            image_file = row[11].strip()
+    for row in rows:
+        if len(row) < 12:
+            continue
+        count("rows_parsed")
             
-            # 处理地层名称：如果为空，使用前一行的地层名
-            if layer_name:
-                current_layer_name = layer_name
-            elif current_layer_name:
-                layer_name = current_layer_name
-            else:
-                continue  # 没有地层信息，跳过
-            
-            # 创建地层数据结构
-            if layer_name not in layer_dict:
-                layer_id = generate_layer_id(layer_name)
-                layer_dict[layer_name] = {
-                    "layerId": layer_id,
-                    "layerName": layer_name,
-                    "layerNameEN": translate_layer_name(layer_name),
-                    "layerNameJA": translate_layer_name_ja(layer_name),
-                    "rockTypes": []
-                }
-                
-            current_layer_data = layer_dict[layer_name]
-            
-            # 处理岩石类型：如果为空，使用前一行的岩石类型
-            if rock_type:
-                # 查找是否已存在该岩石类型
-                rock_exists = False
-                for rock in current_layer_data["rockTypes"]:
-                    if rock["rockName"] == rock_type:
-                        current_rock_data = rock
-                        rock_exists = True
-                        break
-                        
-                if not rock_exists:
-                    rock_id = generate_rock_id(layer_name, rock_type)
-                    current_rock_data = {
-                        "rockId": rock_id,
-                        "rockName": rock_type,
-                        "rockNameEN": translate_rock_name(rock_type),
-                        "rockNameJA": translate_rock_name_ja(rock_type),
-                        "minerals": []
-                    }
-                    current_layer_data["rockTypes"].append(current_rock_data)
-            elif current_rock_data is None:
-                # 如果没有当前岩石且岩石类型为空，跳过
-                continue
+        layer_name = row[0].strip()
+        rock_type = row[1].strip() 
+        mineral_name = row[2].strip()
+        percentage = float(row[3]) if row[3] else 0.0
+        hardness = row[4].strip()
+        acid_reaction = row[5].strip() == "是"
+        uv_fluorescence = row[6].strip()
+        magnetism = row[7].strip()
+        density = row[8].strip()
+        polarized_color = row[9].strip()
+        appearance = row[10].strip()
+        image_file = row[11].strip()
+        
+        # 处理地层名称：如果为空，使用前一行的地层名
+        if layer_name:
+            current_layer_name = layer_name
+        elif current_layer_name:
+            layer_name = current_layer_name
+        else:
+            continue  # 没有地层信息，跳过
+        
+        # 创建地层数据结构
+        if layer_name not in layer_dict:
+            layer_dict[layer_name] = Layer(generate_layer_id(layer_name), layer_name,
+                                           translate_layer_name(layer_name),
+                                           translate_layer_name_ja(layer_name))
             
-            # 处理矿物
-            if mineral_name:
-                mineral_id = generate_mineral_id(mineral_name)
-                mineral_data = {
-                    "mineralId": mineral_id,
-                    "mineralName": mineral_name,
-                    "mineralNameEN": translate_mineral_name(mineral_name),
-                    "mineralNameJA": translate_mineral_name_ja(mineral_name),
-                    "percentage": percentage,
-                    "properties": {
-                        "mohsHardness": hardness,
-                        "acidReaction": acid_reaction,
-                        "uvFluorescence": uv_fluorescence,
-                        "magnetism": magnetism,
-                        "density": density,
-                        "polarizedColor": polarized_color,
-                        "appearance": appearance,
-                        "imageFile": generate_image_filename(mineral_name, mineral_id),
-                        "modelFile": generate_model_filename(mineral_name, mineral_id)
-                    }
-                }
-                current_rock_data["minerals"].append(mineral_data)
+        current_layer_data = layer_dict[layer_name]
+        
+        # 处理岩石类型：如果为空，使用前一行的岩石类型
+        if rock_type:
+            # 查找是否已存在该岩石类型
+            current_rock_data = rock_dict.get((layer_name, rock_type))
+            if current_rock_data is None:
+                current_rock_data = Rock(generate_rock_id(layer_name, rock_type), rock_type,
+                                         translate_rock_name(rock_type), translate_rock_name_ja(rock_type))
+                current_layer_data.rock_types.append(current_rock_data)
+                rock_dict[(layer_name, rock_type)] = current_rock_data
+        elif current_rock_data is None:
+            # 如果没有当前岩石且岩石类型为空，跳过
+            continue
+        
+        # 处理矿物
+        if mineral_name:
+            mineral_id = generate_mineral_id(mineral_name)
+            current_rock_data.minerals.append(Mineral(
+                mineral_id, mineral_name,
+                translate_mineral_name(mineral_name), translate_mineral_name_ja(mineral_name),
+                percentage, hardness, acid_reaction, uv_fluorescence, magnetism, density,
+                polarized_color, appearance,
+                generate_image_filename(mineral_name, mineral_id, asset_names),
+                generate_model_filename(mineral_name, mineral_id, asset_names)))
     
-    # 转换为列表
-    mineral_database["stratigraphicLayers"] = list(layer_dict.values())
+    database.layers = list(layer_dict.values())
+    return database
+
+def process_csv_to_json(csv_file_path, output_path, overrides_path=DATABASE_OVERRIDES_PATH):
+    """
+    将CSV文件转换为结构化的JSON数据库
+    生成后应用 database_overrides.json 中的矿物修订；会丢失能加载的资源引用时不覆盖 output_path
+    """
+    with stage("parse_csv"), open(csv_file_path, 'r', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        next(reader)  # 跳过标题行
+        database = build_database(reader)
+    
+    replaced = DatabaseOverrides.load(overrides_path).apply_minerals(database)
+    if replaced:
+        print(f"应用手工修订: {replaced} 个矿物")
+    mineral_database = database.to_dict()
     
     # 保存JSON文件
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(mineral_database, f, ensure_ascii=False, indent=2)
+    with stage("write_json"):
+        check_database_replacement(output_path, mineral_database)
+        write_json_if_changed(output_path, mineral_database)
     
     print(f"数据库已生成: {output_path}")
     print(f"地层数量: {len(mineral_database['stratigraphicLayers'])}")
@@ -335,19 +320,27 @@ def translate_mineral_name_ja(chinese_name):
     }
     return translations.get(chinese_name, chinese_name)
 
-def generate_image_filename(mineral_name, mineral_id):
+def generate_image_filename(mineral_name, mineral_id, asset_names):
     """生成图片文件名"""
-    return f"{mineral_id}_001.jpg"
+    return asset_names.image_file("mineral", mineral_id)
 
-def generate_model_filename(mineral_name, mineral_id):
-    """生成模型文件名"""
-    return f"{mineral_id}_001.fbx"
+def generate_model_filename(mineral_name, mineral_id, asset_names):
+    """生成模型文件名（运行时只去掉 .glb 后加载，主名与 Models/ 下的实际文件一致）"""
+    return asset_names.model_file("mineral", mineral_id)
 
-if __name__ == "__main__":
-    csv_path = "../../MineralRelated/仙台地层岩石矿物分析-完整-新.csv"
-    output_path = "SendaiMineralDatabase.json"
+def main():
+    """主函数（输出不含化石的基础数据库，再由 add_fossils_to_database 合并化石写入正式数据库）"""
+    from mineral_assets import BASE_DATABASE_PATH, MINERAL_CSV_PATH
+
+    csv_path = MINERAL_CSV_PATH
+    output_path = BASE_DATABASE_PATH
     
     if os.path.exists(csv_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
         process_csv_to_json(csv_path, output_path)
+        print("正式数据库需要合并化石: python3 geodata.py add-fossils（或 python3 pipeline.py）")
     else:
-        print(f"CSV文件不存在: {csv_path}")
\ No newline at end of file
+        print(f"CSV文件不存在: {csv_path}")
+
+if __name__ == "__main__":
+    run_main(main)
\ No newline at end of file
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据脚本统一入口
+python3 geodata.py <子命令> [参数]，路径参数默认指向项目中的源数据和输出位置。
+各子命令的模块只在执行该子命令时导入，pandas、Pillow 等重依赖不影响其他子命令的启动时间。
+与其他入口一样支持 --metrics 和 --profile。
+"""
+
+import argparse
+import os
+import sys
+
+from instrumentation import run_main
+from mineral_assets import (
+    BASE_DATABASE_PATH,
+    DATABASE_PATH,
+    EXCEL_PATH,
+    FOSSIL_CSV_PATH,
+    MAPPING_TABLE_PATH,
+    MINERAL_CSV_PATH,
+    MINERAL_DATA_DIR,
+    MINERAL_IMAGES_DIR,
+    MINERAL_RELATED_DIR,
+    PROJECT_DIR,
+    REGIONS_DIR,
+)
+
+# 只在部分子命令中使用的第三方依赖: 模块名 -> pip 包名
+OPTIONAL_DEPENDENCIES = {"pandas": "pandas", "PIL": "Pillow", "numpy": "numpy"}
+
+# extract_all_images_properly.py 的输出目录，资源共享从这里复制到矿物图片目录
+COMPLETE_IMAGES_DIR = os.path.join(MINERAL_DATA_DIR, "Images", "Minerals_Complete")
+
+
+def command_convert(args):
+    if MINERAL_RELATED_DIR not in sys.path:
+        sys.path.insert(0, MINERAL_RELATED_DIR)
+    from convert_excel_to_csv import extract_excel_data, save_to_csv
+
+    if not os.path.exists(args.excel):
+        print(f"Excel文件不存在: {args.excel}")
+        return 1
+    data = extract_excel_data(args.excel)
+    if not data:
+        print("没有读取到数据")
+        return 1
+    save_to_csv(data, args.minerals_csv)
+    return 0
+
+
+def command_build_db(args):
+    from generate_mineral_database import process_csv_to_json
+
+    os.makedirs(os.path.dirname(args.database), exist_ok=True)
+    process_csv_to_json(args.minerals_csv, args.database)
+    if args.database == BASE_DATABASE_PATH:
+        print("基础数据库不含化石，接着执行 geodata.py add-fossils 更新正式数据库")
+    return 0
+
+
+def command_add_fossils(args):
+    from add_fossils_to_database import add_fossils_to_database
+
+    if not os.path.exists(args.database):
+        print(f"基础数据库不存在: {args.database}（先执行 geodata.py build-db）")
+        return 1
+    add_fossils_to_database(args.database, args.fossils_csv, args.output)
+    return 0
+
+
+def command_batch(args):
+    from batch_convert import batch_convert
+
+    return batch_convert(args.inputs, args.output_dir, args.jobs)
+
+
+def command_extract_images(args):
+    if args.method == "pandas":
+        from extract_excel_images import extract_images_from_xlsx
+
+        return 0 if extract_images_from_xlsx(args.excel, args.images_dir) else 1
+
+    from extract_final_correct import extract_final_correct_mapping
+
+    extract_final_correct_mapping(args.excel, args.minerals_csv, args.images_dir)
+    return 0
+
+
+def command_share_resources(args):
+    from apply_resource_sharing import apply_resource_sharing_logic, create_resource_mapping_summary
+
+    apply_resource_sharing_logic(args.source_dir, args.images_dir)
+    create_resource_mapping_summary(args.images_dir)
+    return 0
+
+
+def command_mapping_table(args):
+    from generate_mapping_table import generate_mineral_mapping_table
+
+    generate_mineral_mapping_table(args.images_dir, args.mapping_table)
+    return 0
+
+
+def command_analyze(args):
+    if args.report == "mapping":
+        from analyze_excel_image_mapping import map_images_to_minerals
+
+        map_images_to_minerals(args.excel, args.minerals_csv)
+    else:
+        from analyze_missing_images import report_missing_images
+
+        report_missing_images(args.minerals_csv, args.images_dir)
+    return 0
+
+
+def add_path(parser, option, default, help):
+    parser.add_argument(option, default=default, type=os.path.abspath, help=f"{help}（默认 {os.path.relpath(default, PROJECT_DIR)}）")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="geodata", description="仙台地质数据处理")
+    subparsers = parser.add_subparsers(dest="command", metavar="<子命令>", required=True)
+
+    convert = subparsers.add_parser("convert", help="Excel -> 矿物 CSV")
+    add_path(convert, "--excel", EXCEL_PATH, "矿物分析 Excel")
+    add_path(convert, "--minerals-csv", MINERAL_CSV_PATH, "CSV 输出")
+    convert.set_defaults(handler=command_convert)
+
+    build_db = subparsers.add_parser("build-db", help="矿物 CSV -> 不含化石的基础数据库（之后执行 add-fossils）")
+    add_path(build_db, "--minerals-csv", MINERAL_CSV_PATH, "矿物 CSV")
+    add_path(build_db, "--database", BASE_DATABASE_PATH, "基础数据库输出")
+    build_db.set_defaults(handler=command_build_db)
+
+    add_fossils = subparsers.add_parser("add-fossils", help="基础数据库 + 化石 CSV -> 正式数据库")
+    add_path(add_fossils, "--database", BASE_DATABASE_PATH, "基础数据库（build-db 的输出）")
+    add_path(add_fossils, "--fossils-csv", FOSSIL_CSV_PATH, "化石 CSV")
+    add_path(add_fossils, "--output", DATABASE_PATH, "数据库输出")
+    add_fossils.set_defaults(handler=command_add_fossils)
+
+    batch = subparsers.add_parser("batch", help="多地区工作簿 -> 各地区数据库、全局矿物目录和索引（进程池并行）")
+    batch.add_argument("inputs", nargs="+", help="工作簿、包含工作簿的目录，或 地区=工作簿")
+    add_path(batch, "--output-dir", REGIONS_DIR, "输出目录")
+    batch.add_argument("--jobs", type=int, default=None, help="并行进程数（默认 CPU 核心数）")
+    batch.set_defaults(handler=command_batch)
+
+    extract = subparsers.add_parser("extract-images", help="从 Excel 提取矿物图片")
+    add_path(extract, "--excel", EXCEL_PATH, "矿物分析 Excel")
+    add_path(extract, "--minerals-csv", MINERAL_CSV_PATH, "矿物 CSV，决定唯一矿物的顺序")
+    add_path(extract, "--images-dir", MINERAL_IMAGES_DIR, "图片输出目录")
+    extract.add_argument("--method", choices=("unique", "pandas"), default="unique",
+                         help="unique：唯一矿物按首次出现顺序对应图片（流水线使用）；pandas：早期按 Excel 行顺序的版本（需要 pandas 和 Pillow）")
+    extract.set_defaults(handler=command_extract_images)
+
+    share = subparsers.add_parser("share-resources", help="相同矿物只保留一张图片")
+    add_path(share, "--source-dir", COMPLETE_IMAGES_DIR, "按行提取的完整图片目录")
+    add_path(share, "--images-dir", MINERAL_IMAGES_DIR, "目标图片目录")
+    share.set_defaults(handler=command_share_resources)
+
+    mapping = subparsers.add_parser("mapping-table", help="生成矿物图片映射表")
+    add_path(mapping, "--images-dir", MINERAL_IMAGES_DIR, "矿物图片目录")
+    add_path(mapping, "--mapping-table", MAPPING_TABLE_PATH, "映射表输出")
+    mapping.set_defaults(handler=command_mapping_table)
+
+    analyze = subparsers.add_parser("analyze", help="分析报告")
+    analyze.add_argument("report", choices=("mapping", "missing"),
+                         help="mapping：Excel 图片锚点与矿物行的对应；missing：没有图片的矿物")
+    add_path(analyze, "--excel", EXCEL_PATH, "矿物分析 Excel")
+    add_path(analyze, "--minerals-csv", MINERAL_CSV_PATH, "矿物 CSV")
+    add_path(analyze, "--images-dir", MINERAL_IMAGES_DIR, "矿物图片目录")
+    analyze.set_defaults(handler=command_analyze)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    try:
+        return args.handler(args)
+    except ModuleNotFoundError as e:
+        if e.name not in OPTIONAL_DEPENDENCIES:
+            raise
+        print(f"子命令 {args.command} 需要 {e.name}: pip install {OPTIONAL_DEPENDENCIES[e.name]}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GLB 模型检查与 WebGL 预算检查
+统计每个模型的顶点数、三角形数、图元/材质数量和内嵌贴图尺寸与字节数，
+超出预算文件中的阈值时返回非零退出码
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from glb_utils import GlbError, GlbFile, image_dimensions, primitive_triangle_count
+from instrumentation import run_main
+from mineral_assets import MINERAL_DATA_DIR, PROJECT_DIR, scan_asset_tree
+
+BUDGET_PATH = os.path.join(PROJECT_DIR, "Assets", "MineralRelated", "glb_budget.json")
+
+# 报告字段 -> 预算键
+BUDGET_KEYS = {
+    "fileBytes": "maxFileBytes",
+    "vertices": "maxVertices",
+    "triangles": "maxTriangles",
+    "primitives": "maxPrimitives",
+    "materials": "maxMaterials",
+    "textureBytes": "maxTextureBytes",
+    "maxTextureDimension": "maxTextureDimension",
+}
+
+
+def inspect_glb(path):
+    """统计单个 GLB 模型"""
+    file_bytes = os.path.getsize(path)
+    glb = GlbFile.load(path)
+    gltf = glb.gltf
+
+    vertex_accessors = set()
+    triangles = 0
+    primitives = 0
+    for mesh in gltf.get("meshes", []):
+        for primitive in mesh.get("primitives", []):
+            primitives += 1
+            triangles += primitive_triangle_count(primitive, gltf)
+            position = primitive.get("attributes", {}).get("POSITION")
+            if position is not None:
+                vertex_accessors.add(position)
+
+    vertices = sum(gltf["accessors"][index]["count"] for index in vertex_accessors)
+
+    geometry_views = {accessor["bufferView"] for accessor in gltf.get("accessors", []) if "bufferView" in accessor}
+    geometry_bytes = sum(gltf["bufferViews"][index]["byteLength"] for index in geometry_views)
+
+    textures = []
+    for index, image in enumerate(gltf.get("images", [])):
+        data = glb.image_bytes(index)
+        if data is None:
+            textures.append({"name": image.get("name", ""), "uri": image.get("uri"), "external": True})
+            continue
+        width, height = image_dimensions(data) or (0, 0)
+        textures.append({
+            "name": image.get("name", ""),
+            "mimeType": image.get("mimeType", ""),
+            "width": width,
+            "height": height,
+            "bytes": len(data),
+        })
+
+    return {
+        "fileBytes": file_bytes,
+        "binBytes": len(glb.binary),
+        "vertices": vertices,
+        "triangles": triangles,
+        "meshes": len(gltf.get("meshes", [])),
+        "primitives": primitives,
+        "materials": len(gltf.get("materials", [])),
+        "geometryBytes": geometry_bytes,
+        "textures": textures,
+        "textureBytes": sum(texture.get("bytes", 0) for texture in textures),
+        "maxTextureDimension": max((max(t.get("width", 0), t.get("height", 0)) for t in textures), default=0),
+        "extensionsUsed": gltf.get("extensionsUsed", []),
+    }
+
+
+def load_budget(budget_path):
+    """读取预算文件：default 为默认阈值，overrides 按模型相对路径覆盖"""
+    with open(budget_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def check_budget(rel_path, report, budget):
+    """返回超出预算的项目列表"""
+    limits = dict(budget.get("default", {}))
+    limits.update(budget.get("overrides", {}).get(rel_path, {}))
+
+    violations = []
+    for metric, key in BUDGET_KEYS.items():
+        limit = limits.get(key)
+        if limit is not None and report[metric] > limit:
+            violations.append({"metric": metric, "value": report[metric], "limit": limit})
+    return violations
+
+
+def find_models(base_dir):
+    """查找 Models/ 下所有 GLB 文件"""
+    models = []
+    for rel_dir, filename, entry in scan_asset_tree(os.path.join(base_dir, "Models"), base_dir):
+        if filename.lower().endswith(".glb"):
+            models.append((f"{rel_dir}/{filename}", entry.path))
+    return sorted(models)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="检查 GLB 模型开销并执行 WebGL 预算检查")
+    parser.add_argument("models", nargs="*", help="要检查的 GLB 文件（默认 MineralData/Models 下全部）")
+    parser.add_argument("--root", default=MINERAL_DATA_DIR, help="MineralData 目录")
+    parser.add_argument("--budget", default=BUDGET_PATH, help="预算文件路径")
+    parser.add_argument("--no-budget", action="store_true", help="只统计，不检查预算")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+    args = parser.parse_args()
+
+    if args.models:
+        models = [(os.path.relpath(path, args.root).replace(os.sep, "/"), path) for path in args.models]
+    else:
+        models = find_models(args.root)
+
+    budget = None
+    if not args.no_budget:
+        if not os.path.exists(args.budget):
+            print(f"预算文件不存在: {args.budget}", file=sys.stderr)
+            return 2
+        budget = load_budget(args.budget)
+
+    results = {}
+    failed = 0
+    for rel_path, path in models:
+        try:
+            report = inspect_glb(path)
+        except (GlbError, OSError, ValueError, KeyError) as e:
+            results[rel_path] = {"error": str(e)}
+            failed += 1
+            continue
+
+        if budget is not None:
+            report["violations"] = check_budget(rel_path, report, budget)
+            if report["violations"]:
+                failed += 1
+        results[rel_path] = report
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print("=" * 100)
+        print("GLB 模型开销统计")
+        print("=" * 100)
+        print(f"{'模型':45} {'大小KB':>9} {'顶点':>7} {'三角形':>7} {'图元':>4} {'材质':>4} {'贴图':>12} {'贴图KB':>9}")
+        for rel_path, report in results.items():
+            if "error" in report:
+                print(f"{rel_path:45} ✗ 解析失败: {report['error']}")
+                continue
+            dims = ",".join(sorted({f"{t['width']}x{t['height']}" for t in report["textures"] if not t.get("external")}))
+            mark = "✗" if report.get("violations") else " "
+            print(f"{mark}{rel_path:44} {report['fileBytes'] / 1024:9.1f} {report['vertices']:7d} "
+                  f"{report['triangles']:7d} {report['primitives']:4d} {report['materials']:4d} "
+                  f"{dims:>12} {report['textureBytes'] / 1024:9.1f}")
+            for violation in report.get("violations", []):
+                print(f"    超出预算: {violation['metric']} = {violation['value']} (上限 {violation['limit']})")
+
+        total_bytes = sum(r.get("fileBytes", 0) for r in results.values())
+        total_triangles = sum(r.get("triangles", 0) for r in results.values())
+        print(f"\n模型数量: {len(results)}，总大小: {total_bytes / 1024 / 1024:.1f} MB，总三角形: {total_triangles}")
+        if budget is not None:
+            print(f"超出预算或解析失败: {failed} 个")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GLB 网格数据的 NumPy 公共函数
+访问器与数组互转、节点变换矩阵，供模型优化脚本复用
+"""
+
+import numpy as np
+
+from glb_utils import NORMALIZE_DIVISORS, TARGET_ARRAY_BUFFER, TYPE_COMPONENTS
+
+COMPONENT_DTYPES = {
+    5120: np.int8,
+    5121: np.uint8,
+    5122: np.int16,
+    5123: np.uint16,
+    5125: np.uint32,
+    5126: np.float32,
+}
+
+COMPONENTS_TYPE = {1: "SCALAR", 2: "VEC2", 3: "VEC3", 4: "VEC4"}
+
+
+def accessor_array(glb, accessor_index, normalize=True):
+    """
+    读取访问器为 (count, components) 数组
+    normalize=True 时归一化整数会转换为 float32
+    """
+    accessor = glb.gltf["accessors"][accessor_index]
+    component_type = accessor["componentType"]
+    dtype = np.dtype(COMPONENT_DTYPES[component_type]).newbyteorder('<')
+    components = TYPE_COMPONENTS[accessor["type"]]
+    count = accessor["count"]
+
+    if "sparse" in accessor or "bufferView" not in accessor:
+        result = np.array(glb.read_accessor(accessor_index), dtype=np.float32 if accessor.get("normalized") else dtype)
+        return result.reshape(count, components)
+
+    view = glb.gltf["bufferViews"][accessor["bufferView"]]
+    data = glb.view_bytes(accessor["bufferView"])
+    offset = accessor.get("byteOffset", 0)
+    element_size = dtype.itemsize * components
+    stride = view.get("byteStride") or element_size
+
+    result = np.array(np.ndarray(
+        shape=(count, components),
+        dtype=dtype,
+        buffer=data,
+        offset=offset,
+        strides=(stride, dtype.itemsize),
+    ))
+
+    if normalize and accessor.get("normalized") and component_type in NORMALIZE_DIVISORS:
+        result = np.maximum(result.astype(np.float32) / NORMALIZE_DIVISORS[component_type], -1.0)
+
+    return result
+
+
+def add_accessor(glb, values, component_type, target=None, normalized=False, bounds=False, pad_to=None):
+    """
+    把数组写成新的 bufferView + accessor，返回访问器索引
+    pad_to: 顶点属性每个元素补齐到的分量数（glTF 要求顶点步长为4字节的倍数）
+    """
+    values = np.asarray(values)
+    if values.ndim == 1:
+        values = values.reshape(-1, 1)
+    count, components = values.shape
+    dtype = np.dtype(COMPONENT_DTYPES[component_type]).newbyteorder('<')
+    typed = values.astype(dtype)
+
+    stored = typed
+    byte_stride = None
+    if pad_to and pad_to > components:
+        stored = np.zeros((count, pad_to), dtype=dtype)
+        stored[:, :components] = typed
+        byte_stride = pad_to * dtype.itemsize
+    elif target == TARGET_ARRAY_BUFFER and (components * dtype.itemsize) % 4:
+        raise ValueError("顶点属性元素大小必须是4字节的倍数，请指定 pad_to")
+
+    view_index = glb.add_buffer_view(np.ascontiguousarray(stored).tobytes(), target, byte_stride)
+
+    accessor = {
+        "bufferView": view_index,
+        "componentType": component_type,
+        "count": int(count),
+        "type": COMPONENTS_TYPE[components],
+    }
+    if normalized:
+        accessor["normalized"] = True
+    if bounds:
+        accessor["min"] = typed.min(axis=0).tolist()
+        accessor["max"] = typed.max(axis=0).tolist()
+        if component_type == 5126:
+            accessor["min"] = [float(v) for v in accessor["min"]]
+            accessor["max"] = [float(v) for v in accessor["max"]]
+
+    glb.gltf.setdefault("accessors", []).append(accessor)
+    return len(glb.gltf["accessors"]) - 1
+
+
+def index_component_type(vertex_count):
+    """按顶点数选择最小的索引类型"""
+    if vertex_count <= 0xFFFF:
+        return 5123
+    return 5125
+
+
+def quaternion_matrix(q):
+    """四元数 (x, y, z, w) -> 3x3 旋转矩阵"""
+    x, y, z, w = q
+    return np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ], dtype=np.float64)
+
+
+def node_local_matrix(node):
+    """节点的局部变换矩阵 (4x4)"""
+    if "matrix" in node:
+        # glTF 矩阵按列主序存储
+        return np.array(node["matrix"], dtype=np.float64).reshape(4, 4).T
+
+    matrix = np.identity(4)
+    scale = np.array(node.get("scale", [1.0, 1.0, 1.0]), dtype=np.float64)
+    matrix[:3, :3] = quaternion_matrix(node.get("rotation", [0.0, 0.0, 0.0, 1.0])) * scale
+    matrix[:3, 3] = node.get("translation", [0.0, 0.0, 0.0])
+    return matrix
+
+
+def mesh_instances(gltf):
+    """
+    遍历默认场景，返回 [(网格索引, 世界矩阵)]
+    没有场景时把所有根节点视为场景
+    """
+    nodes = gltf.get("nodes", [])
+    scenes = gltf.get("scenes", [])
+    if scenes:
+        roots = scenes[gltf.get("scene", 0)].get("nodes", [])
+    else:
+        children = {child for node in nodes for child in node.get("children", [])}
+        roots = [i for i in range(len(nodes)) if i not in children]
+
+    instances = []
+    stack = [(index, np.identity(4)) for index in roots]
+    while stack:
+        index, parent = stack.pop()
+        node = nodes[index]
+        world = parent @ node_local_matrix(node)
+        if "mesh" in node:
+            instances.append((node["mesh"], world))
+        for child in node.get("children", []):
+            stack.append((child, world))
+    return instances
+
+
+def transform_points(matrix, points):
+    """用 4x4 矩阵变换点集"""
+    points = np.asarray(points, dtype=np.float64)
+    return points @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def primitive_indices(glb, primitive):
+    """图元的三角形索引 (n, 3)，条带和扇形会展开为三角形列表"""
+    if "indices" in primitive:
+        indices = accessor_array(glb, primitive["indices"]).reshape(-1).astype(np.int64)
+    else:
+        count = glb.gltf["accessors"][primitive["attributes"]["POSITION"]]["count"]
+        indices = np.arange(count, dtype=np.int64)
+
+    mode = primitive.get("mode", 4)
+    if mode == 4:
+        return indices[:len(indices) // 3 * 3].reshape(-1, 3)
+    if mode == 5:
+        triangles = np.stack([indices[:-2], indices[1:-1], indices[2:]], axis=1)
+        odd = np.arange(len(triangles)) % 2 == 1
+        triangles[odd] = triangles[odd][:, [1, 0, 2]]
+        return triangles
+    if mode == 6:
+        return np.stack([np.full(len(indices) - 2, indices[0]), indices[1:-1], indices[2:]], axis=1)
+    return np.zeros((0, 3), dtype=np.int64)
+
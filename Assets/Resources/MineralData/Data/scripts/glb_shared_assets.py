@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GLB 跨模型资源去重工具
+对所有 GLB 的内嵌图片和 bufferView 计算内容哈希，统计跨模型的重复字节；
+--externalize 把被多个模型共用的贴图提取为单独的外部文件，
+各模型改为通过 images[].uri 引用同一份文件
+（整文件级别的重复由 dedup_resources.py 处理）
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from collections import defaultdict
+
+from atomic_output import write_bytes_if_changed
+from glb_inspect import find_models
+from glb_utils import GlbError, GlbFile
+from instrumentation import run_main
+from mineral_assets import MINERAL_DATA_DIR
+from quantize_glb import optimized_output_dir
+
+SHARED_TEXTURE_DIR = "Models/SharedTextures"
+
+MIME_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/ktx2": ".ktx2",
+}
+
+
+def collect_blobs(models):
+    """
+    对每个模型的图片和非图片 bufferView 计算哈希
+    返回 {("image"|"bufferView", sha256): [(模型相对路径, 索引, 字节数)]}
+    """
+    blobs = defaultdict(list)
+    errors = {}
+
+    for rel_path, path in models:
+        try:
+            glb = GlbFile.load(path)
+        except (GlbError, OSError) as e:
+            errors[rel_path] = str(e)
+            continue
+
+        image_views = set()
+        for index, image in enumerate(glb.gltf.get("images", [])):
+            data = glb.image_bytes(index)
+            if data is None:
+                continue
+            image_views.add(image["bufferView"])
+            blobs[("image", hashlib.sha256(data).hexdigest())].append((rel_path, index, len(data)))
+
+        for index in range(len(glb.gltf.get("bufferViews", []))):
+            if index in image_views:
+                continue
+            data = glb.view_bytes(index)
+            blobs[("bufferView", hashlib.sha256(data).hexdigest())].append((rel_path, index, len(data)))
+
+    return blobs, errors
+
+
+def summarize(blobs):
+    """按类型统计总字节数和重复字节数（同一内容只保留一份时可省下的部分）"""
+    summary = {}
+    for kind in ("image", "bufferView"):
+        entries = [users for (blob_kind, _), users in blobs.items() if blob_kind == kind]
+        shared = [users for users in entries if len({rel_path for rel_path, _, _ in users}) > 1]
+        summary[kind] = {
+            "unique": len(entries),
+            "totalBytes": sum(size for users in entries for _, _, size in users),
+            "sharedGroups": len(shared),
+            "duplicateBytes": sum(users[0][2] * (len(users) - 1) for users in shared),
+        }
+    return summary
+
+
+def externalize_textures(models, blobs, output_dir, min_models=2, errors=None):
+    """
+    把被至少 min_models 个模型使用的贴图写成外部文件并改写各模型的 images[]
+    errors 中已记录的模型跳过，读取失败的模型记入 errors（与 collect_blobs 一致）
+    返回 {贴图相对路径: [模型相对路径]}
+    """
+    if errors is None:
+        errors = {}
+    shared = {}
+    for (kind, sha256), users in blobs.items():
+        model_paths = sorted({rel_path for rel_path, _, _ in users})
+        if kind == "image" and len(model_paths) >= min_models:
+            shared[sha256] = model_paths
+
+    if not shared:
+        return {}
+
+    written = {}
+    texture_dir = os.path.join(output_dir, SHARED_TEXTURE_DIR)
+    os.makedirs(texture_dir, exist_ok=True)
+
+    for rel_path, path in models:
+        if rel_path in errors:
+            continue
+        try:
+            glb = GlbFile.load(path)
+        except (GlbError, OSError) as e:
+            errors[rel_path] = str(e)
+            continue
+        changed = False
+        for index, image in enumerate(glb.gltf.get("images", [])):
+            data = glb.image_bytes(index)
+            if data is None:
+                continue
+            sha256 = hashlib.sha256(data).hexdigest()
+            if sha256 not in shared:
+                continue
+
+            filename = sha256[:16] + MIME_EXTENSIONS.get(image.get("mimeType"), ".bin")
+            texture_path = os.path.join(texture_dir, filename)
+            write_bytes_if_changed(texture_path, data)
+
+            model_dir = os.path.dirname(os.path.join(output_dir, rel_path))
+            image.pop("bufferView")
+            image["uri"] = os.path.relpath(texture_path, model_dir).replace(os.sep, "/")
+            written.setdefault(f"{SHARED_TEXTURE_DIR}/{filename}", []).append(rel_path)
+            changed = True
+
+        if changed:
+            glb.repack()
+            target = os.path.join(output_dir, rel_path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            glb.save(target)
+
+    return written
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="统计 GLB 模型之间重复的贴图和缓冲数据")
+    parser.add_argument("models", nargs="*", help="要检查的 GLB 文件（默认 MineralData/Models 下全部）")
+    parser.add_argument("--root", default=MINERAL_DATA_DIR, help="MineralData 目录")
+    parser.add_argument("--externalize", action="store_true", help="把共用贴图提取为外部文件")
+    parser.add_argument("--min-models", type=int, default=2, help="提取贴图所需的最少共用模型数")
+    parser.add_argument("--output-dir", default=optimized_output_dir("shared_textures"),
+                        help="提取后的模型和贴图输出目录（默认 OptimizedModels/shared_textures）")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出")
+    args = parser.parse_args()
+
+    if args.models:
+        models = [(os.path.relpath(path, args.root).replace(os.sep, "/"), path) for path in args.models]
+    else:
+        models = find_models(args.root)
+
+    blobs, errors = collect_blobs(models)
+    summary = summarize(blobs)
+    groups = [
+        {"kind": kind, "sha256": sha256, "bytes": users[0][2],
+         "users": [{"model": rel_path, "index": index} for rel_path, index, _ in users]}
+        for (kind, sha256), users in sorted(blobs.items())
+        if len({rel_path for rel_path, _, _ in users}) > 1
+    ]
+
+    externalized = {}
+    if args.externalize:
+        externalized = externalize_textures(models, blobs, args.output_dir, args.min_models, errors)
+
+    if args.json:
+        print(json.dumps({"summary": summary, "sharedGroups": groups, "externalized": externalized,
+                          "errors": errors}, ensure_ascii=False, indent=2))
+        return 1 if errors else 0
+
+    print("=" * 80)
+    print(f"GLB 跨模型重复数据 ({len(models)} 个模型)")
+    print("=" * 80)
+    labels = {"image": "内嵌图片", "bufferView": "缓冲数据"}
+    for kind, item in summary.items():
+        print(f"{labels[kind]}: {item['unique']} 份不同内容，共 {item['totalBytes'] / 1024 / 1024:.2f} MB，"
+              f"跨模型共用 {item['sharedGroups']} 组，重复 {item['duplicateBytes'] / 1024 / 1024:.2f} MB")
+
+    for group in groups:
+        print(f"\n  {labels[group['kind']]} {group['sha256'][:12]} ({group['bytes'] / 1024:.1f} KB):")
+        for user in group["users"]:
+            print(f"    - {user['model']} #{user['index']}")
+
+    if args.externalize:
+        if externalized:
+            print(f"\n✅ 已提取 {len(externalized)} 张共用贴图到: {os.path.join(args.output_dir, SHARED_TEXTURE_DIR)}")
+            print("注意: Resources.Load 加载的模型无法解析外部 uri，需要配合按路径加载的导入方式使用")
+        else:
+            print("\n没有被多个模型共用的贴图，无需提取")
+
+    for rel_path, message in errors.items():
+        print(f"✗ {rel_path}: {message}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
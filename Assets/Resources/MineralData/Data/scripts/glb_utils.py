@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GLB (glTF 2.0 二进制) 读写公共函数
+纯Python实现：解析文件头、JSON/BIN块、访问器数据，以及重新打包BIN块
+"""
+
+import json
+import struct
+from array import array
+
+from atomic_output import write_bytes_if_changed
+
+GLB_MAGIC = 0x46546C67          # b"glTF"
+GLB_VERSION = 2
+CHUNK_JSON = 0x4E4F534A         # b"JSON"
+CHUNK_BIN = 0x004E4942          # b"BIN\0"
+
+# componentType -> (struct 格式, 字节数)
+COMPONENT_TYPES = {
+    5120: ('b', 1),   # BYTE
+    5121: ('B', 1),   # UNSIGNED_BYTE
+    5122: ('h', 2),   # SHORT
+    5123: ('H', 2),   # UNSIGNED_SHORT
+    5125: ('I', 4),   # UNSIGNED_INT
+    5126: ('f', 4),   # FLOAT
+}
+
+TYPE_COMPONENTS = {
+    "SCALAR": 1,
+    "VEC2": 2,
+    "VEC3": 3,
+    "VEC4": 4,
+    "MAT2": 4,
+    "MAT3": 9,
+    "MAT4": 16,
+}
+
+# 归一化整数的除数（glTF 2.0 规范 3.11）
+NORMALIZE_DIVISORS = {
+    5120: 127.0,
+    5121: 255.0,
+    5122: 32767.0,
+    5123: 65535.0,
+}
+
+MODE_POINTS = 0
+MODE_TRIANGLES = 4
+MODE_TRIANGLE_STRIP = 5
+MODE_TRIANGLE_FAN = 6
+
+TARGET_ARRAY_BUFFER = 34962
+TARGET_ELEMENT_ARRAY_BUFFER = 34963
+
+
+# 按 buffer 字节偏移引用数据的扩展，重新打包后偏移失效，repack 拒绝处理
+REPACK_UNSUPPORTED_EXTENSIONS = ("EXT_meshopt_compression", "KHR_meshopt_compression")
+
+
+class GlbError(ValueError):
+    """GLB 文件格式错误"""
+
+
+def _extension_view_refs(node, inside=False):
+    """遍历 extensions 对象中带 bufferView 索引的字典（如 KHR_draco_mesh_compression）"""
+    if isinstance(node, dict):
+        if inside and isinstance(node.get("bufferView"), int):
+            yield node
+        for key, value in node.items():
+            yield from _extension_view_refs(value, inside or key == "extensions")
+    elif isinstance(node, list):
+        for value in node:
+            yield from _extension_view_refs(value, inside)
+
+
+def _pad(data, alignment=4, fill=b'\0'):
+    """按字节对齐补齐"""
+    remainder = len(data) % alignment
+    if remainder:
+        return data + fill * (alignment - remainder)
+    return data
+
+
+class GlbFile:
+    """一个已解析的 GLB 文件：gltf JSON + BIN 块"""
+
+    def __init__(self, gltf, binary=b''):
+        self.gltf = gltf
+        self.binary = binary
+
+    @classmethod
+    def load(cls, path):
+        """从文件读取"""
+        with open(path, 'rb') as f:
+            return cls.parse(f.read())
+
+    @classmethod
+    def parse(cls, data):
+        """解析 GLB 字节"""
+        if len(data) < 20:
+            raise GlbError("文件过短，不是GLB")
+
+        magic, version, length = struct.unpack_from('<III', data, 0)
+        if magic != GLB_MAGIC:
+            raise GlbError("文件头不是 glTF")
+        if version != GLB_VERSION:
+            raise GlbError(f"不支持的GLB版本: {version}")
+        if length > len(data):
+            raise GlbError(f"文件被截断: 声明 {length} 字节，实际 {len(data)} 字节")
+
+        gltf = None
+        binary = b''
+        offset = 12
+        while offset + 8 <= length:
+            chunk_length, chunk_type = struct.unpack_from('<II', data, offset)
+            chunk_start = offset + 8
+            chunk = data[chunk_start:chunk_start + chunk_length]
+            if chunk_type == CHUNK_JSON and gltf is None:
+                gltf = json.loads(bytes(chunk).decode('utf-8'))
+            elif chunk_type == CHUNK_BIN and not binary:
+                binary = bytes(chunk)
+            offset = chunk_start + chunk_length
+
+        if gltf is None:
+            raise GlbError("缺少 JSON 块")
+
+        return cls(gltf, binary)
+
+    # ---- 序列化 ----
+
+    def to_bytes(self):
+        """序列化为 GLB 字节（有待写入的 bufferView 时先重新打包）"""
+        if any("_data" in view for view in self.gltf.get("bufferViews", [])):
+            self.repack()
+
+        json_chunk = _pad(json.dumps(self.gltf, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+                          4, b' ')
+        bin_chunk = _pad(self.binary) if self.binary else b''
+
+        length = 12 + 8 + len(json_chunk)
+        if bin_chunk:
+            length += 8 + len(bin_chunk)
+
+        parts = [
+            struct.pack('<III', GLB_MAGIC, GLB_VERSION, length),
+            struct.pack('<II', len(json_chunk), CHUNK_JSON),
+            json_chunk,
+        ]
+        if bin_chunk:
+            parts.append(struct.pack('<II', len(bin_chunk), CHUNK_BIN))
+            parts.append(bin_chunk)
+        return b''.join(parts)
+
+    def save(self, path):
+        """写出到文件（内容未变化时不写入），返回是否写入"""
+        return write_bytes_if_changed(path, self.to_bytes())
+
+    # ---- 数据访问 ----
+
+    def _check_buffer(self, buffer_index):
+        buffers = self.gltf.get("buffers", [])
+        if buffer_index != 0 or not buffers or "uri" in buffers[0]:
+            raise GlbError("只支持引用GLB内嵌BIN块的缓冲区")
+
+    def view_bytes(self, view_index):
+        """返回 bufferView 对应的字节"""
+        view = self.gltf["bufferViews"][view_index]
+        if "_data" in view:
+            return memoryview(view["_data"])
+        self._check_buffer(view.get("buffer", 0))
+        start = view.get("byteOffset", 0)
+        return memoryview(self.binary)[start:start + view["byteLength"]]
+
+    def image_bytes(self, image_index):
+        """返回内嵌图片的字节，外部图片返回 None"""
+        image = self.gltf["images"][image_index]
+        if "bufferView" not in image:
+            return None
+        return bytes(self.view_bytes(image["bufferView"]))
+
+    def read_accessor(self, accessor_index):
+        """
+        读取访问器数据，返回元组列表（SCALAR 也是单元素元组）
+        处理 byteStride、归一化整数和稀疏访问器
+        """
+        accessor = self.gltf["accessors"][accessor_index]
+        component_type = accessor["componentType"]
+        fmt, size = COMPONENT_TYPES[component_type]
+        components = TYPE_COMPONENTS[accessor["type"]]
+        count = accessor["count"]
+
+        if "bufferView" in accessor:
+            view = self.gltf["bufferViews"][accessor["bufferView"]]
+            data = self.view_bytes(accessor["bufferView"])
+            offset = accessor.get("byteOffset", 0)
+            element_size = size * components
+            stride = view.get("byteStride") or element_size
+
+            if stride == element_size:
+                values = array(fmt)
+                values.frombytes(bytes(data[offset:offset + element_size * count]))
+                flat = values.tolist()
+                rows = [tuple(flat[i:i + components]) for i in range(0, len(flat), components)]
+            else:
+                unpack = struct.Struct('<' + fmt * components).unpack_from
+                rows = [unpack(data, offset + i * stride) for i in range(count)]
+        else:
+            rows = [(0,) * components] * count
+
+        sparse = accessor.get("sparse")
+        if sparse:
+            rows = list(rows)
+            index_fmt, _ = COMPONENT_TYPES[sparse["indices"]["componentType"]]
+            index_values = array(index_fmt)
+            index_data = self.view_bytes(sparse["indices"]["bufferView"])
+            index_offset = sparse["indices"].get("byteOffset", 0)
+            index_values.frombytes(bytes(index_data[index_offset:index_offset + sparse["count"] * index_values.itemsize]))
+
+            value_values = array(fmt)
+            value_data = self.view_bytes(sparse["values"]["bufferView"])
+            value_offset = sparse["values"].get("byteOffset", 0)
+            value_values.frombytes(bytes(value_data[value_offset:value_offset + sparse["count"] * size * components]))
+            flat = value_values.tolist()
+            for i, target in enumerate(index_values):
+                rows[target] = tuple(flat[i * components:(i + 1) * components])
+
+        if accessor.get("normalized") and component_type in NORMALIZE_DIVISORS:
+            divisor = NORMALIZE_DIVISORS[component_type]
+            rows = [tuple(max(v / divisor, -1.0) for v in row) for row in rows]
+
+        return rows
+
+    def read_indices(self, primitive):
+        """读取图元索引，无索引时按顶点顺序生成"""
+        if "indices" in primitive:
+            return [row[0] for row in self.read_accessor(primitive["indices"])]
+        return list(range(self.gltf["accessors"][primitive["attributes"]["POSITION"]]["count"]))
+
+    # ---- 重新打包 ----
+
+    def add_buffer_view(self, data, target=None, byte_stride=None):
+        """追加一个 bufferView（数据暂存，repack 时写入BIN块），返回索引"""
+        view = {"buffer": 0, "byteLength": len(data), "_data": bytes(data)}
+        if target is not None:
+            view["target"] = target
+        if byte_stride:
+            view["byteStride"] = byte_stride
+        self.gltf.setdefault("bufferViews", []).append(view)
+        return len(self.gltf["bufferViews"]) - 1
+
+    def replace_buffer_view(self, view_index, data):
+        """替换 bufferView 的内容"""
+        view = self.gltf["bufferViews"][view_index]
+        view["_data"] = bytes(data)
+        view["byteLength"] = len(data)
+
+    def repack(self):
+        """
+        删除未被引用的 bufferView，按4字节对齐重建BIN块并修正偏移
+        访问器、图片、稀疏访问器和扩展对象中的 bufferView 索引会同步更新；
+        使用按字节偏移引用 buffer 的扩展时抛出 GlbError
+        """
+        unsupported = [name for name in self.gltf.get("extensionsUsed", []) if name in REPACK_UNSUPPORTED_EXTENSIONS]
+        if unsupported:
+            raise GlbError(f"不支持重新打包使用 {', '.join(unsupported)} 的模型（扩展按 buffer 偏移引用数据）")
+
+        views = self.gltf.get("bufferViews", [])
+        accessors = self.gltf.get("accessors", [])
+        images = self.gltf.get("images", [])
+        extension_refs = list(_extension_view_refs(self.gltf))
+
+        used = set()
+        for accessor in accessors:
+            if "bufferView" in accessor:
+                used.add(accessor["bufferView"])
+            sparse = accessor.get("sparse")
+            if sparse:
+                used.add(sparse["indices"]["bufferView"])
+                used.add(sparse["values"]["bufferView"])
+        for image in images:
+            if "bufferView" in image:
+                used.add(image["bufferView"])
+        for ref in extension_refs:
+            used.add(ref["bufferView"])
+
+        remap = {}
+        new_views = []
+        chunks = []
+        offset = 0
+        for old_index, view in enumerate(views):
+            if old_index not in used:
+                continue
+            data = view.pop("_data", None)
+            if data is None:
+                data = bytes(self.view_bytes(old_index))
+
+            # 顶点属性按4字节对齐，其余同样对齐以保持简单
+            padding = (-offset) % 4
+            if padding:
+                chunks.append(b'\0' * padding)
+                offset += padding
+
+            view["buffer"] = 0
+            view["byteOffset"] = offset
+            view["byteLength"] = len(data)
+            chunks.append(data)
+            offset += len(data)
+
+            remap[old_index] = len(new_views)
+            new_views.append(view)
+
+        for accessor in accessors:
+            if "bufferView" in accessor:
+                accessor["bufferView"] = remap[accessor["bufferView"]]
+            sparse = accessor.get("sparse")
+            if sparse:
+                sparse["indices"]["bufferView"] = remap[sparse["indices"]["bufferView"]]
+                sparse["values"]["bufferView"] = remap[sparse["values"]["bufferView"]]
+        for image in images:
+            if "bufferView" in image:
+                image["bufferView"] = remap[image["bufferView"]]
+        for ref in extension_refs:
+            ref["bufferView"] = remap[ref["bufferView"]]
+
+        self.binary = b''.join(chunks)
+        self.gltf["bufferViews"] = new_views
+        if new_views:
+            self.gltf["buffers"] = [{"byteLength": len(self.binary)}]
+        else:
+            self.gltf.pop("buffers", None)
+            self.gltf.pop("bufferViews", None)
+
+    def remove_unused_accessors(self):
+        """删除没有被图元、蒙皮、动画或扩展引用的访问器，返回删除数量"""
+        accessors = self.gltf.get("accessors", [])
+        meshes = self.gltf.get("meshes", [])
+
+        used = set()
+        for mesh in meshes:
+            for primitive in mesh.get("primitives", []):
+                used.update(primitive.get("attributes", {}).values())
+                if "indices" in primitive:
+                    used.add(primitive["indices"])
+                for target in primitive.get("targets", []):
+                    used.update(target.values())
+        for skin in self.gltf.get("skins", []):
+            if "inverseBindMatrices" in skin:
+                used.add(skin["inverseBindMatrices"])
+        for animation in self.gltf.get("animations", []):
+            for sampler in animation.get("samplers", []):
+                used.add(sampler["input"])
+                used.add(sampler["output"])
+
+        remap = {}
+        kept = []
+        for old_index, accessor in enumerate(accessors):
+            if old_index in used:
+                remap[old_index] = len(kept)
+                kept.append(accessor)
+        if len(kept) == len(accessors):
+            return 0
+
+        for mesh in meshes:
+            for primitive in mesh.get("primitives", []):
+                attributes = primitive.get("attributes", {})
+                for name in attributes:
+                    attributes[name] = remap[attributes[name]]
+                if "indices" in primitive:
+                    primitive["indices"] = remap[primitive["indices"]]
+                for target in primitive.get("targets", []):
+                    for name in target:
+                        target[name] = remap[target[name]]
+        for skin in self.gltf.get("skins", []):
+            if "inverseBindMatrices" in skin:
+                skin["inverseBindMatrices"] = remap[skin["inverseBindMatrices"]]
+        for animation in self.gltf.get("animations", []):
+            for sampler in animation.get("samplers", []):
+                sampler["input"] = remap[sampler["input"]]
+                sampler["output"] = remap[sampler["output"]]
+
+        self.gltf["accessors"] = kept
+        return len(accessors) - len(kept)
+
+    def add_extension(self, name, required=False):
+        """登记使用的扩展"""
+        used = self.gltf.setdefault("extensionsUsed", [])
+        if name not in used:
+            used.append(name)
+        if required:
+            required_list = self.gltf.setdefault("extensionsRequired", [])
+            if name not in required_list:
+                required_list.append(name)
+
+
+def primitive_triangle_count(primitive, gltf):
+    """图元的三角形数量"""
+    mode = primitive.get("mode", MODE_TRIANGLES)
+    if "indices" in primitive:
+        count = gltf["accessors"][primitive["indices"]]["count"]
+    else:
+        count = gltf["accessors"][primitive["attributes"]["POSITION"]]["count"]
+
+    if mode == MODE_TRIANGLES:
+        return count // 3
+    if mode in (MODE_TRIANGLE_STRIP, MODE_TRIANGLE_FAN):
+        return max(count - 2, 0)
+    return 0
+
+
+def image_dimensions(data):
+    """从图片头读取宽高 (PNG/JPEG/WebP)，无法识别时返回 None"""
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and len(data) >= 24:
+        return struct.unpack('>II', data[16:24])
+
+    if data[:2] == b'\xff\xd8':
+        offset = 2
+        while offset + 4 <= len(data):
+            if data[offset] != 0xFF:
+                offset += 1
+                continue
+            marker = data[offset + 1]
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                offset += 2
+                continue
+            segment_length = struct.unpack('>H', data[offset + 2:offset + 4])[0]
+            # SOF0-SOF15（排除 DHT/JPG/DAC）
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>HH', data[offset + 5:offset + 9])
+                return width, height
+            offset += 2 + segment_length
+        return None
+
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP' and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', data[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L':
+            bits = int.from_bytes(data[21:25], 'little')
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b'VP8X':
+            width = int.from_bytes(data[24:27], 'little') + 1
+            height = int.from_bytes(data[27:30], 'little') + 1
+            return width, height
+
+    return None
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+脚本运行指标
+- 阶段：墙钟时间、CPU 时间、tracemalloc 内存峰值（阶段可嵌套）
+- 计数器：解析行数、写入文件数/字节数、缓存命中等，由各公共模块直接累加
+- 进度：限速输出，替代逐行/逐图 print
+入口用 run_main(main) 包装后，命令行加 --metrics <路径> 即写出 JSON 报告（- 表示输出到终端），
+加 --profile cprofile|sample 即剖析整个 main()（见 profiling.py）。
+计数器和计时始终开启（开销可忽略）；内存跟踪只在 --metrics 时开启，tracemalloc 会明显拖慢运行。
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+PROGRESS_INTERVAL = 0.5
+METRICS_OPTION = "--metrics"
+PROFILE_OPTION = "--profile"
+PROFILE_OUTPUT_OPTION = "--profile-output"
+# 剖析设置通过环境变量传给工作进程（fork 和 spawn 都适用），格式为 "模式|输出前缀"
+PROFILE_ENV = "GEODATA_PROFILE"
+
+
+class Metrics:
+    """一次运行的阶段记录和计数器"""
+
+    def __init__(self):
+        self.script = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0]
+        self.counters = Counter()
+        self.stages = []
+        self.trace_memory = False
+        self.stack = []  # [阶段名, 子阶段内存峰值]
+        self.started_wall = time.perf_counter()
+        self.started_cpu = time.process_time()
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def enable_memory_tracing(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.trace_memory = True
+
+    def _propagate_peak(self, peak):
+        if self.stack:
+            self.stack[-1][1] = max(self.stack[-1][1], peak)
+
+    @contextmanager
+    def stage(self, name):
+        """记录一个阶段；嵌套阶段的名称为 父/子"""
+        path = "/".join([frame[0] for frame in self.stack] + [name])
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            # reset_peak 是全局的：先把父阶段到目前为止的峰值记下来
+            self._propagate_peak(tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        frame = [name, 0]
+        self.stack.append(frame)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            record = {
+                "stage": path,
+                "wall": round(time.perf_counter() - wall, 6),
+                "cpu": round(time.process_time() - cpu, 6),
+            }
+            if tracing:
+                peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+                record["peakMemory"] = peak
+                self._propagate_peak(peak)
+            self.stages.append(record)
+
+    def merge(self, report, prefix=None):
+        """合并子进程的报告（阶段名默认加上当前阶段路径作为前缀，计数器累加）"""
+        if prefix is None:
+            prefix = "/".join(frame[0] for frame in self.stack)
+        for record in report.get("stages", []):
+            record = dict(record)
+            if prefix:
+                record["stage"] = f"{prefix}/{record['stage']}"
+            self.stages.append(record)
+        self.counters.update(report.get("counters", {}))
+
+    def report(self):
+        """JSON 报告"""
+        result = {
+            "script": self.script,
+            "wall": round(time.perf_counter() - self.started_wall, 6),
+            "cpu": round(time.process_time() - self.started_cpu, 6),
+            "stages": self.stages,
+            "counters": dict(sorted(self.counters.items())),
+        }
+        if self.trace_memory and tracemalloc.is_tracing():
+            result["peakMemory"] = max([tracemalloc.get_traced_memory()[1]] +
+                                       [record.get("peakMemory", 0) for record in self.stages])
+        return result
+
+
+METRICS = Metrics()
+
+
+def count(name, amount=1):
+    """累加计数器"""
+    METRICS.count(name, amount)
+
+
+def stage(name):
+    """with stage("parse"): ..."""
+    return METRICS.stage(name)
+
+
+def merge_report(report):
+    """合并子进程返回的报告"""
+    METRICS.merge(report)
+
+
+def memory_tracing_enabled():
+    return METRICS.trace_memory
+
+
+def reset_metrics(trace_memory=False):
+    """重新开始记录（进程池中的工作进程会被复用，每个任务开始时调用）"""
+    global METRICS
+    METRICS = Metrics()
+    if trace_memory:
+        METRICS.enable_memory_tracing()
+    return METRICS
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def print_summary(report, stream=None):
+    """终端摘要：各阶段耗时/内存和计数器"""
+    stream = stream or sys.stdout
+    print(f"\n=== 运行指标: {report['script']} ===", file=stream)
+    for record in report["stages"]:
+        memory = f"  峰值 {format_bytes(record['peakMemory']):>9}" if "peakMemory" in record else ""
+        print(f"  {record['stage']:40} 墙钟 {record['wall']:8.3f}s  CPU {record['cpu']:8.3f}s{memory}", file=stream)
+    for name, value in report["counters"].items():
+        text = format_bytes(value) if "bytes" in name else str(value)
+        print(f"  {name:40} {text}", file=stream)
+
+
+def write_report(path, report=None):
+    """写出 JSON 报告；path 为 - 时输出到终端"""
+    report = report or METRICS.report()
+    text = json.dumps(report, ensure_ascii=False, indent=2) + "\n"
+    if path == "-":
+        sys.stdout.write(text)
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def pop_option(argv, option):
+    """从参数列表中取出 option 的值（支持 --opt 值 和 --opt=值），不存在时返回 None"""
+    for i, arg in enumerate(argv):
+        if arg == option and i + 1 < len(argv):
+            value = argv[i + 1]
+            del argv[i:i + 2]
+            return value
+        if arg.startswith(option + "="):
+            del argv[i]
+            return arg[len(option) + 1:]
+    return None
+
+
+def profile_context(mode, prefix):
+    """--profile 对应的剖析上下文；profiling 只在需要时导入"""
+    if not mode:
+        return nullcontext()
+    import profiling
+
+    if mode not in profiling.PROFILE_MODES:
+        sys.exit(f"{PROFILE_OPTION} 只支持: {', '.join(profiling.PROFILE_MODES)}")
+    prefix = prefix or profiling.default_prefix(METRICS.script)
+    profiling.activate(mode, prefix)
+    return profiling.profiled(mode, prefix)
+
+
+def run_main(main):
+    """
+    脚本入口包装：处理并移除命令行中的 --metrics <路径>、--profile <模式>、--profile-output <前缀>
+    （脚本自身的参数解析不受影响），把整个 main() 记为一个阶段，结束后写出报告并打印摘要；
+    返回 main() 的返回值
+    """
+    report_path = pop_option(sys.argv, METRICS_OPTION)
+    profile_mode = pop_option(sys.argv, PROFILE_OPTION)
+    profile_prefix = pop_option(sys.argv, PROFILE_OUTPUT_OPTION)
+    if report_path:
+        METRICS.enable_memory_tracing()
+    try:
+        with stage(METRICS.script), profile_context(profile_mode, profile_prefix):
+            return main()
+    finally:
+        if report_path:
+            report = METRICS.report()
+            write_report(report_path, report)
+            if report_path != "-":
+                print_summary(report)
+                print(f"指标报告: {report_path}")
+
+
+class Progress:
+    """
+    限速进度输出：终端上原地刷新，输出被重定向时每 interval 秒最多一行
+    with Progress("提取图片", total=len(items), counter="images_written") as progress:
+        for item in items:
+            ...
+            progress.update(detail=item)
+    """
+
+    def __init__(self, label, total=None, counter=None, interval=PROGRESS_INTERVAL, stream=None):
+        self.label = label
+        self.total = total
+        self.counter = counter
+        self.interval = interval
+        self.stream = stream or sys.stdout
+        self.interactive = hasattr(self.stream, "isatty") and self.stream.isatty()
+        self.done = 0
+        self.started = time.perf_counter()
+        self.last_emit = self.started
+        self.last_width = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def format(self, detail=""):
+        if self.total:
+            text = f"{self.label}: {self.done}/{self.total} ({self.done * 100 // self.total}%)"
+        else:
+            text = f"{self.label}: {self.done}"
+        elapsed = time.perf_counter() - self.started
+        if elapsed > 0 and self.done:
+            text += f"  {self.done / elapsed:.0f}/s"
+        return f"{text}  {detail}" if detail else text
+
+    def emit(self, text, final=False):
+        if self.interactive:
+            padding = " " * max(0, self.last_width - len(text))
+            self.stream.write("\r" + text + padding + ("\n" if final else ""))
+            self.last_width = len(text)
+        else:
+            self.stream.write(text + "\n")
+        self.stream.flush()
+
+    def update(self, amount=1, detail=""):
+        self.done += amount
+        if self.counter:
+            count(self.counter, amount)
+        now = time.perf_counter()
+        if now - self.last_emit >= self.interval:
+            self.last_emit = now
+            self.emit(self.format(detail))
+
+    def close(self, detail=""):
+        if self.done or self.total:
+            elapsed = time.perf_counter() - self.started
+            self.emit(f"{self.format(detail)}  用时 {elapsed:.2f}s", final=True)
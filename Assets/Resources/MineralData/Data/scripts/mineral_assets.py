@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+矿物数据资源公共函数
+数据库资源引用遍历、资源目录索引，供各资源检查脚本复用
+"""
+
+import hashlib
+import json
+import os
+
+from atomic_output import write_text_if_changed
+from instrumentation import count
+
+# 路径均以本脚本位置为基准，不依赖当前工作目录
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.dirname(SCRIPTS_DIR)
+MINERAL_DATA_DIR = os.path.dirname(DATA_DIR)
+PROJECT_DIR = os.path.abspath(os.path.join(MINERAL_DATA_DIR, "..", "..", ".."))
+DATABASE_PATH = os.path.join(DATA_DIR, "SendaiMineralDatabase.json")
+MODEL_MANIFEST_PATH = os.path.join(DATA_DIR, "SendaiModelManifest.json")
+MINERAL_IMAGES_DIR = os.path.join(MINERAL_DATA_DIR, "Images", "Minerals")
+# batch_convert.py 的多地区输出（各地区数据库、全局矿物目录和索引）
+REGIONS_DIR = os.path.join(DATA_DIR, "Regions")
+
+# 源数据（不随构建打包）
+MINERAL_RELATED_DIR = os.path.join(PROJECT_DIR, "Assets", "MineralRelated")
+EXCEL_PATH = os.path.join(MINERAL_RELATED_DIR, "仙台地层岩石矿物分析-完整.xlsx")
+MINERAL_CSV_PATH = os.path.join(MINERAL_RELATED_DIR, "仙台地层岩石矿物分析-完整-新.csv")
+FOSSIL_CSV_PATH = os.path.join(MINERAL_RELATED_DIR, "sendai_fossils_expanded.csv")
+MAPPING_TABLE_PATH = os.path.join(MINERAL_RELATED_DIR, "矿物图片映射表.csv")
+# 源数据不能重现的手工修订（generate_mineral_database.py / add_fossils_to_database.py 在生成后应用）
+DATABASE_OVERRIDES_PATH = os.path.join(MINERAL_RELATED_DIR, "database_overrides.json")
+
+# 本地缓存目录（以 . 开头，Unity 不会导入）
+CACHE_DIR = os.path.join(SCRIPTS_DIR, ".cache")
+HASH_CACHE_PATH = os.path.join(CACHE_DIR, "file_hashes.json")
+# 不含化石的基础数据库（generate_mineral_database.py 的输出，add_fossils_to_database.py 合并化石后写入 DATABASE_PATH）
+BASE_DATABASE_PATH = os.path.join(CACHE_DIR, "pipeline", "SendaiMineralDatabase.base.json")
+
+# 资源根目录（相对 MineralData）
+ASSET_ROOTS = ("Images", "Models")
+
+# 运行时按记录类型查找资源的目录（与 EncyclopediaData.cs 的路径设置一致）
+ASSET_DIRS = {
+    ("mineral", "imageFile"): "Images/Minerals",
+    ("fossil", "imageFile"): "Images/Fossil",
+    ("mineral", "modelFile"): "Models/Minerals",
+    ("fossil", "modelFile"): "Models/Fossil",
+}
+
+# MicroscopeController.LoadMineralModel 依次尝试的模型目录
+MODEL_FALLBACK_DIRS = (
+    "Models/Minerals",
+    "Models/Minerals1",
+    "Models/Rocks",
+    "Models/Fossil",
+    "Models/Fossil1",
+    "Models/Layers",
+)
+
+ASSET_FIELDS = ("imageFile", "modelFile")
+
+# 运行时加载前去掉的扩展名（EncyclopediaData 去掉图片的 .jpg/.jpeg/.png，
+# MineralDatabase.GetMineralModel 只去掉 .glb），第一个为生成器使用的扩展名
+RUNTIME_EXTENSIONS = {
+    "imageFile": (".jpg", ".jpeg", ".png"),
+    "modelFile": (".glb",),
+}
+
+LFS_POINTER_PREFIX = b"version https://git-lfs.github.com/spec/v1"
+
+
+def load_database(database_path=DATABASE_PATH):
+    """读取矿物数据库JSON"""
+    with open(database_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def iter_asset_references(database):
+    """
+    遍历数据库中的资源引用
+    产出 (记录类型, 记录ID, 显示名称, 字段名, 文件名)
+    """
+    for layer in database.get("stratigraphicLayers", []):
+        for rock in layer.get("rockTypes", []):
+            for mineral in rock.get("minerals", []):
+                properties = mineral.get("properties", {})
+                for field in ASSET_FIELDS:
+                    filename = properties.get(field)
+                    if filename:
+                        yield "mineral", mineral["mineralId"], mineral["mineralName"], field, filename
+
+        for fossil in layer.get("fossils", []):
+            properties = fossil.get("properties", {})
+            for field in ASSET_FIELDS:
+                filename = properties.get(field)
+                if filename:
+                    yield "fossil", fossil["fossilId"], fossil["fossilName"], field, filename
+
+
+def split_stem(filename):
+    """拆分文件名为 (主名, 小写扩展名)；Resources.Load 只按主名查找"""
+    stem, ext = os.path.splitext(filename)
+    return stem, ext.lower()
+
+
+def scan_asset_tree(root_dir, base_dir=MINERAL_DATA_DIR):
+    """
+    用 os.scandir 递归索引资源目录
+    产出 (相对 base_dir 的目录, 文件名, os.DirEntry)，跳过 .meta 和隐藏文件
+    """
+    if not os.path.isdir(root_dir):
+        return
+
+    stack = [root_dir]
+    while stack:
+        current = stack.pop()
+        rel_dir = os.path.relpath(current, base_dir).replace(os.sep, "/")
+        with os.scandir(current) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or entry.name.endswith('.meta'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield rel_dir, entry.name, entry
+
+
+def index_asset_files(base_dir=MINERAL_DATA_DIR):
+    """按 (目录, 主名) 索引 Images/、Models/ 下的资源文件名"""
+    files = {}
+    for root in ASSET_ROOTS:
+        for rel_dir, filename, _ in scan_asset_tree(os.path.join(base_dir, root), base_dir):
+            stem, _ = split_stem(filename)
+            files.setdefault((rel_dir, stem), []).append(filename)
+    return files
+
+
+def asset_search_dirs(kind, field):
+    """运行时查找资源的目录：记录类型目录，模型再按 MicroscopeController 的回退目录"""
+    primary = ASSET_DIRS[(kind, field)]
+    if field != "modelFile":
+        return (primary,)
+    return (primary,) + tuple(directory for directory in MODEL_FALLBACK_DIRS if directory != primary)
+
+
+def asset_reference_resolves(kind, field, filename, files):
+    """运行时能否加载该引用：扩展名是运行时会去掉的扩展名，且主名在查找目录中存在"""
+    stem, ext = split_stem(filename)
+    if ext not in RUNTIME_EXTENSIONS[field]:
+        return False
+    return any((directory, stem) in files for directory in asset_search_dirs(kind, field))
+
+
+class AssetNames:
+    """
+    生成器使用的资源文件名：主名取磁盘上实际存在的 <ID>_001 或 <ID>（都不存在时为 <ID>_001），
+    扩展名取运行时约定（图片 .jpg，模型 .glb），与数据库中已有的引用一致
+    """
+
+    def __init__(self, base_dir=MINERAL_DATA_DIR):
+        self.files = index_asset_files(base_dir)
+
+    def filename(self, kind, field, record_id):
+        extension = RUNTIME_EXTENSIONS[field][0]
+        for stem in (f"{record_id}_001", record_id):
+            if asset_reference_resolves(kind, field, stem + extension, self.files):
+                return stem + extension
+        return f"{record_id}_001{extension}"
+
+    def image_file(self, kind, record_id):
+        return self.filename(kind, "imageFile", record_id)
+
+    def model_file(self, kind, record_id):
+        return self.filename(kind, "modelFile", record_id)
+
+
+def lost_asset_references(old_database, new_database, base_dir=MINERAL_DATA_DIR):
+    """
+    新数据库中不再能加载的资源引用：旧数据库中能加载的引用，在新数据库中同一记录的同一字段
+    没有能加载的引用（记录或字段被删除也算）
+    返回 [(记录类型, 记录ID, 字段, 旧文件名, 新文件名或 None)]；新增的记录没有资源不算
+    """
+    files = index_asset_files(base_dir)
+    # 同一记录可能出现在多个岩石/地层中，按 (类型, ID, 字段) 收集全部文件名
+    new_references = {}
+    for kind, record_id, _, field, filename in iter_asset_references(new_database):
+        new_references.setdefault((kind, record_id, field), []).append(filename)
+
+    lost = []
+    seen = set()
+    for kind, record_id, _, field, old_filename in iter_asset_references(old_database):
+        key = (kind, record_id, field)
+        if key in seen or not asset_reference_resolves(kind, field, old_filename, files):
+            continue
+        seen.add(key)
+        new_filenames = new_references.get(key, [])
+        if not any(asset_reference_resolves(kind, field, filename, files) for filename in new_filenames):
+            lost.append((kind, record_id, field, old_filename, new_filenames[0] if new_filenames else None))
+    return lost
+
+
+class AssetReferenceError(ValueError):
+    """生成的数据库会丢失能加载的资源引用"""
+
+
+def check_database_replacement(path, new_database, base_dir=MINERAL_DATA_DIR):
+    """覆盖 path 处的数据库之前检查资源引用，会丢失能加载的引用时抛出 AssetReferenceError，不写入"""
+    if not os.path.exists(path):
+        return
+    lost = lost_asset_references(load_database(path), new_database, base_dir)
+    if lost:
+        details = "\n".join(f"  {kind} {record_id} {field}: {old} -> {new or '（已删除）'}"
+                            for kind, record_id, field, old, new in lost)
+        raise AssetReferenceError(f"新数据库中 {len(lost)} 个资源引用无法加载，未覆盖 {path}:\n{details}")
+
+
+def read_lfs_pointer(path):
+    """如果文件是 Git LFS 指针，返回 (sha256, 实际大小)，否则返回 None"""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(256)
+    except OSError:
+        return None
+
+    if not head.startswith(LFS_POINTER_PREFIX):
+        return None
+
+    oid = None
+    size = None
+    for line in head.decode('utf-8', 'replace').splitlines():
+        if line.startswith("oid sha256:"):
+            oid = line.split(":", 1)[1].strip()
+        elif line.startswith("size "):
+            size = int(line.split(" ", 1)[1])
+    if oid is None or size is None:
+        return None
+    return oid, size
+
+
+def asset_size(path, stat_size=None):
+    """资源的实际大小；LFS 指针未拉取时使用指针中记录的大小"""
+    if stat_size is None:
+        stat_size = os.path.getsize(path)
+    if stat_size < 256:
+        pointer = read_lfs_pointer(path)
+        if pointer:
+            return pointer[1]
+    return stat_size
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """计算文件内容的 SHA-256；LFS 指针直接使用其中记录的对象哈希"""
+    pointer = read_lfs_pointer(path)
+    if pointer:
+        return pointer[0]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class HashCache:
+    """按 (大小, 修改时间) 缓存文件哈希，文件未变化时不重新计算"""
+
+    def __init__(self, cache_path=HASH_CACHE_PATH):
+        self.cache_path = cache_path
+        self.entries = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def lookup(self, path, stat_result):
+        """返回缓存的哈希，失效时返回 None"""
+        entry = self.entries.get(os.path.abspath(path))
+        if entry and entry["size"] == stat_result.st_size and entry["mtime_ns"] == stat_result.st_mtime_ns:
+            self.hits += 1
+            count("hash_cache_hits")
+            return entry["sha256"]
+        return None
+
+    def store(self, path, stat_result, sha256):
+        """记录新计算的哈希"""
+        self.misses += 1
+        count("hash_cache_misses")
+        self.entries[os.path.abspath(path)] = {
+            "size": stat_result.st_size,
+            "mtime_ns": stat_result.st_mtime_ns,
+            "sha256": sha256,
+        }
+        self.dirty = True
+
+    def hash_file(self, path):
+        """带缓存地计算单个文件哈希"""
+        stat_result = os.stat(path)
+        sha256 = self.lookup(path, stat_result)
+        if sha256 is None:
+            sha256 = file_sha256(path)
+            self.store(path, stat_result, sha256)
+        return sha256
+
+    def save(self):
+        """写回缓存文件"""
+        if not self.dirty:
+            return
+        write_text_if_changed(self.cache_path, json.dumps(self.entries, ensure_ascii=False, indent=0, sort_keys=True))
+        self.dirty = False
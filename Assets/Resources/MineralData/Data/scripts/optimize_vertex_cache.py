@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GLB 索引缓冲的顶点缓存与过度绘制优化
+1. 按 Forsyth 算法重排三角形，提高 GPU 顶点缓存命中率
+2. 在缓存冷启动处切分三角形簇，按遮挡潜力排序（朝外、远离中心的簇先画），
+   ACMR 变差超过阈值时放弃这一步
+3. 按首次读取顺序重排顶点缓冲，共享同一组顶点属性的所有图元（包括 LOD）同步重映射
+输出每个模型优化前后的 ACMR（FIFO 缓存模拟，平均每个三角形的缓存未命中数）
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from glb_inspect import find_models
+from glb_mesh import accessor_array, add_accessor, index_component_type, primitive_indices
+from glb_utils import MODE_TRIANGLES, TARGET_ARRAY_BUFFER, TARGET_ELEMENT_ARRAY_BUFFER, GlbError, GlbFile
+from instrumentation import run_main
+from mineral_assets import MINERAL_DATA_DIR
+from quantize_glb import optimized_output_dir
+
+# Forsyth 评分参数
+CACHE_DECAY_POWER = 1.5
+LAST_TRIANGLE_SCORE = 0.75
+VALENCE_BOOST_SCALE = 2.0
+VALENCE_BOOST_POWER = 0.5
+
+# 过度绘制排序允许的 ACMR 增幅
+OVERDRAW_THRESHOLD = 1.05
+
+
+def simulate_fifo(triangles, cache_size=32):
+    """FIFO 顶点缓存模拟，返回每个三角形的未命中数"""
+    cache = []
+    cached = set()
+    misses = []
+    for triangle in triangles:
+        miss = 0
+        for vertex in triangle:
+            if vertex not in cached:
+                miss += 1
+                cache.append(vertex)
+                cached.add(vertex)
+                if len(cache) > cache_size:
+                    cached.discard(cache.pop(0))
+        misses.append(miss)
+    return misses
+
+
+def acmr(triangles, cache_size=32):
+    """平均缓存未命中率 (Average Cache Miss Ratio)"""
+    if not len(triangles):
+        return 0.0
+    return sum(simulate_fifo(triangles, cache_size)) / len(triangles)
+
+
+def _vertex_score(position, valence, cache_size):
+    if valence == 0:
+        return -1.0
+    score = 0.0
+    if position >= 0:
+        if position < 3:
+            score = LAST_TRIANGLE_SCORE
+        else:
+            score = (1.0 - (position - 3) / (cache_size - 3)) ** CACHE_DECAY_POWER
+    return score + VALENCE_BOOST_SCALE * valence ** -VALENCE_BOOST_POWER
+
+
+def forsyth_order(triangles, vertex_count, cache_size=32):
+    """Forsyth 线性速度顶点缓存优化，返回重排后的三角形列表"""
+    triangles = [tuple(triangle) for triangle in triangles]
+    vertex_triangles = [[] for _ in range(vertex_count)]
+    for index, triangle in enumerate(triangles):
+        for vertex in triangle:
+            vertex_triangles[vertex].append(index)
+
+    vertex_scores = [_vertex_score(-1, len(faces), cache_size) for faces in vertex_triangles]
+    triangle_scores = [sum(vertex_scores[v] for v in triangle) for triangle in triangles]
+    emitted = [False] * len(triangles)
+
+    cache = []
+    output = []
+    best = max(range(len(triangles)), key=triangle_scores.__getitem__, default=-1)
+    while best >= 0:
+        triangle = triangles[best]
+        emitted[best] = True
+        output.append(triangle)
+        for vertex in triangle:
+            vertex_triangles[vertex].remove(best)
+
+        # touched 包括刚被挤出缓存的顶点，它们的分数也要更新
+        touched = list(triangle) + [vertex for vertex in cache if vertex not in triangle]
+        cache = touched[:cache_size]
+
+        for position, vertex in enumerate(touched):
+            vertex_scores[vertex] = _vertex_score(position if position < cache_size else -1,
+                                                  len(vertex_triangles[vertex]), cache_size)
+
+        best = -1
+        best_score = -1.0
+        for vertex in touched:
+            for face in vertex_triangles[vertex]:
+                score = sum(vertex_scores[v] for v in triangles[face])
+                triangle_scores[face] = score
+                if score > best_score:
+                    best, best_score = face, score
+
+        if best < 0 and len(output) < len(triangles):
+            # 缓存中的顶点都没有剩余三角形（网格孤岛），全局查找
+            best = max((i for i in range(len(triangles)) if not emitted[i]), key=triangle_scores.__getitem__)
+
+    return output
+
+
+def overdraw_order(positions, triangles, cache_size=32, threshold=OVERDRAW_THRESHOLD):
+    """
+    Tipsify 风格的过度绘制优化：在缓存冷启动（三个顶点都未命中）处切分簇，
+    按簇的遮挡潜力 dot(簇中心 - 网格中心, 簇法线) 从大到小排序
+    """
+    if len(triangles) < 2:
+        return triangles
+
+    misses = simulate_fifo(triangles, cache_size)
+    starts = [i for i, miss in enumerate(misses) if miss == 3 or i == 0]
+    bounds = list(zip(starts, starts[1:] + [len(triangles)]))
+
+    array = np.asarray(triangles, dtype=np.int64)
+    corners = positions[array]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    centroids = corners.mean(axis=1)
+    areas = np.linalg.norm(normals, axis=1)
+    center = (centroids * areas[:, None]).sum(axis=0) / max(areas.sum(), 1e-12)
+
+    potentials = []
+    for start, end in bounds:
+        weights = areas[start:end]
+        total = weights.sum()
+        cluster_center = (centroids[start:end] * weights[:, None]).sum(axis=0) / total if total else centroids[start]
+        normal = normals[start:end].sum(axis=0)
+        length = np.linalg.norm(normal)
+        potentials.append(float((cluster_center - center) @ normal / length) if length else 0.0)
+
+    order = sorted(range(len(bounds)), key=lambda i: -potentials[i])
+    result = [triangles[i] for cluster in order for i in range(*bounds[cluster])]
+
+    if acmr(result, cache_size) > acmr(triangles, cache_size) * threshold:
+        return triangles
+    return result
+
+
+def attribute_groups(gltf):
+    """
+    把共享顶点属性访问器的图元分组（连通分量），返回 [(访问器集合, [(网格, 图元)])]
+    同组图元的顶点缓冲必须一起重排
+    """
+    parent = {}
+
+    def find(item):
+        while parent.setdefault(item, item) != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    primitives = []
+    for mesh_index, mesh in enumerate(gltf.get("meshes", [])):
+        for primitive_index, primitive in enumerate(mesh.get("primitives", [])):
+            accessors = set(primitive.get("attributes", {}).values())
+            for target in primitive.get("targets", []):
+                accessors.update(target.values())
+            key = ("primitive", mesh_index, primitive_index)
+            for accessor_index in accessors:
+                parent[find(key)] = find(("accessor", accessor_index))
+            primitives.append((key, accessors))
+
+    groups = {}
+    for key, accessors in primitives:
+        root = find(key)
+        group = groups.setdefault(root, (set(), []))
+        group[0].update(accessors)
+        group[1].append(key[1:])
+    return list(groups.values())
+
+
+def permute_accessor(glb, accessor_index, order):
+    """按新顺序重写顶点属性访问器（保持分量类型、归一化和步长），返回新访问器索引"""
+    accessor = glb.gltf["accessors"][accessor_index]
+    values = accessor_array(glb, accessor_index, normalize=False)[order]
+
+    pad_to = None
+    view = glb.gltf["bufferViews"][accessor["bufferView"]]
+    if view.get("byteStride"):
+        pad_to = view["byteStride"] // values.dtype.itemsize
+
+    new_index = add_accessor(glb, values, accessor["componentType"], TARGET_ARRAY_BUFFER,
+                             normalized=accessor.get("normalized", False), pad_to=pad_to)
+    new_accessor = glb.gltf["accessors"][new_index]
+    for key in ("min", "max", "name"):
+        if key in accessor:
+            new_accessor[key] = accessor[key]
+    return new_index
+
+
+def optimize_glb(glb, cache_size=32, overdraw=True):
+    """对 GlbFile 中所有三角形图元执行优化（原地修改），返回统计"""
+    gltf = glb.gltf
+    accessors = gltf.get("accessors", [])
+    meshes = gltf.get("meshes", [])
+    stats = {"triangles": 0, "acmrBefore": 0.0, "acmrAfter": 0.0, "skipped": []}
+
+    for accessor_set, members in attribute_groups(gltf):
+        counts = {accessors[index]["count"] for index in accessor_set}
+        primitives = [meshes[m]["primitives"][p] for m, p in members]
+        if len(counts) != 1 or any(p.get("mode", MODE_TRIANGLES) != MODE_TRIANGLES for p in primitives):
+            stats["skipped"].append(f"mesh {members[0][0]}: 属性数量不一致或非三角形列表")
+            continue
+        if any("sparse" in accessors[index] or "bufferView" not in accessors[index] for index in accessor_set):
+            stats["skipped"].append(f"mesh {members[0][0]}: 稀疏访问器")
+            continue
+        vertex_count = counts.pop()
+
+        ordered = []
+        for primitive in primitives:
+            triangles = primitive_indices(glb, primitive).tolist()
+            optimized = forsyth_order(triangles, vertex_count, cache_size)
+            if overdraw:
+                positions = accessor_array(glb, primitive["attributes"]["POSITION"]).astype(np.float64)
+                optimized = overdraw_order(positions, optimized, cache_size)
+
+            misses_before = sum(simulate_fifo(triangles, cache_size))
+            misses_after = sum(simulate_fifo(optimized, cache_size))
+            if misses_after >= misses_before:
+                # 导出工具已经排过序的网格保持原顺序
+                optimized, misses_after = triangles, misses_before
+
+            stats["triangles"] += len(triangles)
+            stats["acmrBefore"] += misses_before
+            stats["acmrAfter"] += misses_after
+            ordered.append(optimized)
+
+        # 按首次读取顺序重排顶点；只被其他图元读取或未被读取的顶点排在后面
+        remap = np.full(vertex_count, -1, dtype=np.int64)
+        next_index = 0
+        for triangles in ordered:
+            for triangle in triangles:
+                for vertex in triangle:
+                    if remap[vertex] < 0:
+                        remap[vertex] = next_index
+                        next_index += 1
+        unused = np.flatnonzero(remap < 0)
+        remap[unused] = np.arange(next_index, vertex_count)
+        order = np.argsort(remap)
+
+        new_accessors = {index: permute_accessor(glb, index, order) for index in sorted(accessor_set)}
+        for primitive, triangles in zip(primitives, ordered):
+            for name, index in primitive["attributes"].items():
+                primitive["attributes"][name] = new_accessors[index]
+            for target in primitive.get("targets", []):
+                for name, index in target.items():
+                    target[name] = new_accessors[index]
+            indices = remap[np.asarray(triangles, dtype=np.int64).reshape(-1)]
+            primitive["indices"] = add_accessor(glb, indices, index_component_type(vertex_count),
+                                                TARGET_ELEMENT_ARRAY_BUFFER)
+
+    glb.remove_unused_accessors()
+    glb.repack()
+
+    triangles = stats["triangles"]
+    stats["acmrBefore"] = stats["acmrBefore"] / triangles if triangles else 0.0
+    stats["acmrAfter"] = stats["acmrAfter"] / triangles if triangles else 0.0
+    return stats
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="优化 GLB 索引缓冲的顶点缓存命中率和过度绘制")
+    parser.add_argument("models", nargs="*", help="要处理的 GLB 文件（默认 MineralData/Models 下全部）")
+    parser.add_argument("--root", default=MINERAL_DATA_DIR, help="MineralData 目录")
+    parser.add_argument("--output-dir", default=optimized_output_dir("vertex_cache"),
+                        help="输出目录（保持相对 MineralData 的路径，默认 OptimizedModels/vertex_cache）")
+    parser.add_argument("--in-place", action="store_true", help="直接覆盖原文件")
+    parser.add_argument("--cache-size", type=int, default=32, help="模拟的顶点缓存大小")
+    parser.add_argument("--no-overdraw", action="store_true", help="跳过过度绘制排序")
+    parser.add_argument("--dry-run", action="store_true", help="只统计 ACMR，不写文件")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出统计")
+    args = parser.parse_args()
+
+    if args.models:
+        models = [(os.path.relpath(path, args.root).replace(os.sep, "/"), path) for path in args.models]
+    else:
+        models = find_models(args.root)
+
+    results = {}
+    failed = 0
+    for rel_path, path in models:
+        try:
+            glb = GlbFile.load(path)
+            stats = optimize_glb(glb, args.cache_size, not args.no_overdraw)
+        except (GlbError, OSError, ValueError, KeyError) as e:
+            results[rel_path] = {"error": str(e)}
+            failed += 1
+            continue
+
+        if not args.dry_run:
+            target = path if args.in_place else os.path.join(args.output_dir, rel_path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            glb.save(target)
+        results[rel_path] = stats
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 1 if failed else 0
+
+    print("=" * 80)
+    print(f"GLB 顶点缓存优化 (FIFO 缓存 {args.cache_size})")
+    print("=" * 80)
+    print(f"{'模型':45} {'三角形':>7} {'ACMR前':>8} {'ACMR后':>8}")
+    for rel_path, stats in results.items():
+        if "error" in stats:
+            print(f"{rel_path:45} ✗ 处理失败: {stats['error']}")
+            continue
+        print(f"{rel_path:45} {stats['triangles']:7d} {stats['acmrBefore']:8.3f} {stats['acmrAfter']:8.3f}")
+        for item in stats["skipped"]:
+            print(f"    跳过 {item}")
+
+    valid = [stats for stats in results.values() if "error" not in stats and stats["triangles"]]
+    if valid:
+        total = sum(stats["triangles"] for stats in valid)
+        before = sum(stats["acmrBefore"] * stats["triangles"] for stats in valid) / total
+        after = sum(stats["acmrAfter"] * stats["triangles"] for stats in valid) / total
+        print(f"\n整体 ACMR: {before:.3f} -> {after:.3f}")
+    if not args.in_place and not args.dry_run:
+        print(f"输出目录: {args.output_dir}")
+    if failed:
+        print(f"处理失败: {failed} 个")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
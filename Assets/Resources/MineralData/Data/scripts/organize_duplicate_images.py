@@ -9,6 +9,8 @@ import os
 from collections import defaultdict
 import shutil
 
+from instrumentation import Progress, run_main, stage
+
 def organize_duplicate_images(images_dir):
     """整理重复的图片文件"""
     
@@ -45,52 +47,49 @@ def organize_duplicate_images(images_dir):
     # 处理重复文件
     renamed_count = 0
     
-    for mineral_id, files in mineral_groups.items():
-        if len(files) > 1:
-            print(f"\n处理重复矿物: {mineral_id} ({len(files)} 个文件)")
-            
-            # 按文件名排序，确保处理顺序一致
-            files.sort()
-            
-            for i, old_file in enumerate(files):
+    with stage("rename_images"), Progress("整理矿物", total=len(mineral_groups), counter="image_groups_organized") as progress:
+        for mineral_id, files in mineral_groups.items():
+            if len(files) > 1:
+                # 按文件名排序，确保处理顺序一致
+                files.sort()
+                
+                for i, old_file in enumerate(files):
+                    old_path = os.path.join(images_dir, old_file)
+                    
+                    # 获取文件扩展名
+                    _, ext = os.path.splitext(old_file)
+                    
+                    # 生成新文件名
+                    new_filename = f"{mineral_id}_{i+1:03d}{ext.lower()}"
+                    new_path = os.path.join(images_dir, new_filename)
+                    
+                    # 如果文件名已经正确，跳过
+                    if old_file == new_filename:
+                        continue
+                    
+                    try:
+                        # 重命名文件
+                        shutil.move(old_path, new_path)
+                        renamed_count += 1
+                        
+                    except Exception as e:
+                        print(f"  错误: 重命名失败 {old_file}: {e}")
+            else:
+                # 单个文件，确保命名格式正确
+                old_file = files[0]
                 old_path = os.path.join(images_dir, old_file)
                 
-                # 获取文件扩展名
                 _, ext = os.path.splitext(old_file)
+                correct_filename = f"{mineral_id}_001{ext.lower()}"
+                correct_path = os.path.join(images_dir, correct_filename)
                 
-                # 生成新文件名
-                new_filename = f"{mineral_id}_{i+1:03d}{ext.lower()}"
-                new_path = os.path.join(images_dir, new_filename)
-                
-                # 如果文件名已经正确，跳过
-                if old_file == new_filename:
-                    print(f"  保持: {old_file}")
-                    continue
-                
-                try:
-                    # 重命名文件
-                    shutil.move(old_path, new_path)
-                    print(f"  重命名: {old_file} -> {new_filename}")
-                    renamed_count += 1
-                    
-                except Exception as e:
-                    print(f"  错误: 重命名失败 {old_file}: {e}")
-        else:
-            # 单个文件，确保命名格式正确
-            old_file = files[0]
-            old_path = os.path.join(images_dir, old_file)
-            
-            _, ext = os.path.splitext(old_file)
-            correct_filename = f"{mineral_id}_001{ext.lower()}"
-            correct_path = os.path.join(images_dir, correct_filename)
-            
-            if old_file != correct_filename:
-                try:
-                    shutil.move(old_path, correct_path)
-                    print(f"标准化: {old_file} -> {correct_filename}")
-                    renamed_count += 1
-                except Exception as e:
-                    print(f"标准化失败 {old_file}: {e}")
+                if old_file != correct_filename:
+                    try:
+                        shutil.move(old_path, correct_path)
+                        renamed_count += 1
+                    except Exception as e:
+                        print(f"标准化失败 {old_file}: {e}")
+            progress.update(detail=f"{mineral_id} ({len(files)} 个文件)")
     
     print(f"\n整理完成! 重命名了 {renamed_count} 个文件")
     
@@ -100,9 +99,7 @@ def organize_duplicate_images(images_dir):
         if file.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp')):
             final_files.append(file)
     
-    print(f"\n最终图片文件 ({len(final_files)} 个):")
-    for file in sorted(final_files):
-        print(f"  - {file}")
+    print(f"最终图片文件: {len(final_files)} 个")
 
 def create_mineral_summary():
     """创建矿物图片汇总"""
@@ -149,4 +146,4 @@ def main():
     print("=" * 60)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run_main(main)
\ No newline at end of file
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据流水线
+把 Excel 转换、数据库生成、化石合并、图片提取、映射表生成声明为带显式输入/输出的 DAG：
+输入（含脚本本身）的内容哈希与上次运行相同且输出未被改动时跳过该阶段，
+互不依赖的分支（图片提取与数据库生成）在子进程中并行执行。
+运行状态保存在 .cache/pipeline_state.json，文件哈希复用 HashCache（未变化的文件只做 stat）。
+加 --profile 时各阶段在子进程中分别剖析，结果合并到流水线的剖析输出中。
+
+输出被手工修改过时不会覆盖（数据库和图片都有手工调整），需要 --force；
+第一次运行时没有状态：先在临时目录重新生成，与已存在的输出逐字节相同才记录为基准，
+不同时（输出含有生成器不能重现的修改）沿用现有输出、不记录，之后输入变化也不会覆盖，需要 --force。
+数据库中源数据不能重现的手工修订放在 MineralRelated/database_overrides.json，由生成脚本应用。
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from atomic_output import write_text_if_changed
+from instrumentation import PROFILE_ENV, memory_tracing_enabled, merge_report, reset_metrics, run_main, stage
+from mineral_assets import (
+    BASE_DATABASE_PATH,
+    CACHE_DIR,
+    DATABASE_OVERRIDES_PATH,
+    DATABASE_PATH,
+    EXCEL_PATH,
+    FOSSIL_CSV_PATH,
+    MAPPING_TABLE_PATH,
+    MINERAL_CSV_PATH,
+    MINERAL_IMAGES_DIR,
+    MINERAL_RELATED_DIR,
+    SCRIPTS_DIR,
+    HashCache,
+    scan_asset_tree,
+)
+
+STATE_PATH = os.path.join(CACHE_DIR, "pipeline_state.json")
+# 首次运行时重新生成输出用于比较的临时目录
+VERIFY_DIR = os.path.join(CACHE_DIR, "pipeline", "verify")
+
+
+class PipelineError(RuntimeError):
+    """阶段执行失败"""
+
+
+def stage_convert(paths):
+    """Excel -> CSV（convert_excel_to_csv.py 放在源数据目录中）"""
+    if MINERAL_RELATED_DIR not in sys.path:
+        sys.path.insert(0, MINERAL_RELATED_DIR)
+    from convert_excel_to_csv import extract_excel_data, save_to_csv
+
+    data = extract_excel_data(paths["excel"])
+    if not data:
+        raise PipelineError("Excel 中没有读取到数据")
+    save_to_csv(data, paths["minerals_csv"])
+
+
+def stage_build_db(paths):
+    """CSV -> 基础数据库（不含化石）"""
+    from generate_mineral_database import process_csv_to_json
+
+    os.makedirs(os.path.dirname(paths["base_database"]), exist_ok=True)
+    process_csv_to_json(paths["minerals_csv"], paths["base_database"], paths["overrides"])
+
+
+def stage_add_fossils(paths):
+    """基础数据库 + 化石 CSV -> 最终数据库"""
+    from add_fossils_to_database import add_fossils_to_database
+
+    add_fossils_to_database(paths["base_database"], paths["fossils_csv"], paths["database"], paths["overrides"])
+
+
+def stage_extract_images(paths):
+    """Excel 内嵌图片 -> Images/Minerals"""
+    from extract_final_correct import extract_final_correct_mapping
+
+    extract_final_correct_mapping(paths["excel"], paths["minerals_csv"], paths["images_dir"])
+
+
+def stage_mapping_table(paths):
+    """Images/Minerals -> 映射表"""
+    from generate_mapping_table import generate_mineral_mapping_table
+
+    generate_mineral_mapping_table(paths["images_dir"], paths["mapping_table"])
+
+
+def script(name):
+    return os.path.join(SCRIPTS_DIR, name)
+
+
+# 阶段名 -> (执行函数, 输入, 输出)；输入/输出为 paths 的键，"script:" 前缀表示脚本文件
+# 依赖关系由“某阶段的输入是另一阶段的输出”自动推出
+STAGES = {
+    "convert": (stage_convert,
+                ["excel", "script:" + os.path.join(MINERAL_RELATED_DIR, "convert_excel_to_csv.py")],
+                ["minerals_csv"]),
+    "build-db": (stage_build_db,
+                 ["minerals_csv", "overrides", "script:" + script("generate_mineral_database.py")],
+                 ["base_database"]),
+    "add-fossils": (stage_add_fossils,
+                    ["base_database", "fossils_csv", "overrides", "script:" + script("add_fossils_to_database.py")],
+                    ["database"]),
+    "extract-images": (stage_extract_images,
+                       ["excel", "minerals_csv", "script:" + script("extract_final_correct.py")],
+                       ["images_dir"]),
+    "mapping-table": (stage_mapping_table,
+                      ["images_dir", "script:" + script("generate_mapping_table.py")],
+                      ["mapping_table"]),
+}
+
+
+def resolve(key, paths):
+    """输入/输出键 -> 路径"""
+    return key[len("script:"):] if key.startswith("script:") else paths[key]
+
+
+def describe(key):
+    """输出信息中显示的键名（脚本只显示文件名）"""
+    return os.path.basename(key) if key.startswith("script:") else key
+
+
+def stage_dependencies():
+    """阶段 -> 它所依赖的上游阶段集合"""
+    producers = {output: name for name, (_, _, outputs) in STAGES.items() for output in outputs}
+    return {name: {producers[key] for key in inputs if key in producers}
+            for name, (_, inputs, _) in STAGES.items()}
+
+
+def topological_order(dependencies):
+    """按依赖排序（STAGES 中的声明顺序作为同层次的顺序）"""
+    order = []
+    visiting = set()
+
+    def visit(name):
+        if name in order:
+            return
+        if name in visiting:
+            raise PipelineError(f"阶段依赖存在环: {name}")
+        visiting.add(name)
+        for dependency in sorted(dependencies[name], key=list(STAGES).index):
+            visit(dependency)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in STAGES:
+        visit(name)
+    return order
+
+
+def path_digest(path, hash_cache):
+    """文件或目录的内容哈希；目录按相对路径和文件哈希汇总（忽略 .meta 和隐藏文件）；不存在时返回 None"""
+    if os.path.isfile(path):
+        return hash_cache.hash_file(path)
+    if os.path.isdir(path):
+        digest = hashlib.sha256()
+        files = sorted((f"{rel_dir}/{filename}", entry.path)
+                       for rel_dir, filename, entry in scan_asset_tree(path, path))
+        for rel_path, full_path in files:
+            digest.update(f"{rel_path}\0{hash_cache.hash_file(full_path)}\n".encode('utf-8'))
+        return "dir:" + digest.hexdigest()
+    return None
+
+
+def load_state(path=STATE_PATH):
+    """读取上次运行记录"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state, path=STATE_PATH):
+    """写回运行记录"""
+    write_text_if_changed(path, json.dumps(state, ensure_ascii=False, indent=1, sort_keys=True))
+
+
+def stage_profile(name):
+    """主进程开启了 --profile 时，阶段在子进程中的剖析上下文（输出由主进程合并）"""
+    if not os.environ.get(PROFILE_ENV):
+        return contextlib.nullcontext()
+    from profiling import active_profile, profiled
+
+    mode, prefix = active_profile()
+    return profiled(mode, f"{prefix}.worker-{name}", quiet=True)
+
+
+def run_stage(name, paths, trace_memory=False):
+    """在子进程中执行阶段，捕获输出，返回 (是否成功, 日志, 耗时, 指标报告)"""
+    started = time.time()
+    metrics = reset_metrics(trace_memory)
+    buffer = io.StringIO()
+    success = True
+    with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+        try:
+            with stage(name), stage_profile(name):
+                STAGES[name][0](paths)
+        except Exception:
+            traceback.print_exc()
+            success = False
+    return success, buffer.getvalue(), time.time() - started, metrics.report()
+
+
+def plan_stage(name, paths, state, hash_cache, force):
+    """
+    判断阶段是否需要执行
+    返回 (动作, 说明, 输入哈希)，动作为 run / fresh / keep / adopt / fail
+    """
+    _, inputs, outputs = STAGES[name]
+    input_digests = {key: path_digest(resolve(key, paths), hash_cache) for key in inputs}
+    output_digests = {key: path_digest(resolve(key, paths), hash_cache) for key in outputs}
+    outputs_exist = all(digest is not None for digest in output_digests.values())
+
+    missing = [key for key, digest in input_digests.items() if digest is None]
+    if missing:
+        if outputs_exist:
+            return "keep", "输入缺失，沿用现有输出: " + ", ".join(map(describe, missing)), input_digests
+        return "fail", "输入缺失: " + ", ".join(map(describe, missing)), input_digests
+
+    if force:
+        return "run", "--force", input_digests
+
+    record = state.get(name)
+    if record is None:
+        if outputs_exist:
+            return "adopt", "首次运行，重新生成并与现有输出比较", input_digests
+        return "run", "没有运行记录", input_digests
+
+    if not outputs_exist:
+        return "run", "输出缺失", input_digests
+
+    modified = [key for key, digest in output_digests.items() if record["outputs"].get(key) != digest]
+    if modified:
+        return "keep", "输出在上次运行后被修改，未覆盖（--force 重新生成）: " + ", ".join(modified), input_digests
+
+    changed = [key for key, digest in input_digests.items() if record["inputs"].get(key) != digest]
+    if changed:
+        return "run", "输入变化: " + ", ".join(map(describe, changed)), input_digests
+    return "fresh", "", input_digests
+
+
+def record_stage(name, paths, state, hash_cache, input_digests):
+    """记录阶段的输入和输出哈希"""
+    outputs = STAGES[name][2]
+    state[name] = {
+        "inputs": input_digests,
+        "outputs": {key: path_digest(resolve(key, paths), hash_cache) for key in outputs},
+    }
+
+
+def verify_paths(name, paths):
+    """首次运行时的比较：阶段输出改到临时目录，返回 (paths, 临时目录)"""
+    verify_dir = os.path.join(VERIFY_DIR, name)
+    shutil.rmtree(verify_dir, ignore_errors=True)
+    os.makedirs(verify_dir)
+    paths = dict(paths)
+    for key in STAGES[name][2]:
+        paths[key] = os.path.join(verify_dir, os.path.basename(paths[key]))
+    return paths, verify_dir
+
+
+def compare_outputs(name, paths, regenerated_paths, hash_cache):
+    """重新生成的输出与现有输出不同的键"""
+    return [key for key in STAGES[name][2]
+            if path_digest(regenerated_paths[key], hash_cache) != path_digest(paths[key], hash_cache)]
+
+
+def select_stages(targets, dependencies):
+    """目标阶段及其全部上游"""
+    selected = set()
+    stack = list(targets)
+    while stack:
+        name = stack.pop()
+        if name not in selected:
+            selected.add(name)
+            stack.extend(dependencies[name])
+    return selected
+
+
+def run_pipeline(paths, targets=None, force=False, dry_run=False, jobs=None, verbose=False):
+    """执行流水线，返回 {阶段: (状态, 说明, 耗时)}"""
+    dependencies = stage_dependencies()
+    order = topological_order(dependencies)
+    selected = select_stages(targets or order, dependencies)
+    pending = [name for name in order if name in selected]
+
+    state = load_state()
+    hash_cache = HashCache()
+    results = {}
+    running = {}
+    executor = None
+
+    labels = {"run": "执行", "fresh": "最新", "keep": "沿用", "adopt": "基准", "fail": "失败", "blocked": "阻塞"}
+
+    def report(name, status, note, seconds=0.0):
+        results[name] = (status, note, seconds)
+        detail = f"  {note}" if note else ""
+        timing = f" {seconds:6.2f}s" if seconds else " " * 8
+        print(f"  [{labels[status]}]{timing} {name:16}{detail}", flush=True)
+
+    try:
+        while pending or running:
+            for name in list(pending):
+                upstream = dependencies[name] & selected
+                if any(results.get(dependency, ("",))[0] in ("fail", "blocked") for dependency in upstream):
+                    pending.remove(name)
+                    report(name, "blocked", "上游阶段失败")
+                    continue
+                if not all(dependency in results for dependency in upstream):
+                    continue
+
+                pending.remove(name)
+                action, note, input_digests = plan_stage(name, paths, state, hash_cache, force)
+                if action in ("run", "adopt") and not dry_run:
+                    if executor is None:
+                        executor = ProcessPoolExecutor(max_workers=jobs)
+                    # 首次运行时输出写到临时目录，完成后与现有输出比较
+                    stage_paths, verify_dir = verify_paths(name, paths) if action == "adopt" else (paths, None)
+                    future = executor.submit(run_stage, name, stage_paths, memory_tracing_enabled())
+                    running[future] = (name, note, input_digests, stage_paths, verify_dir)
+                    continue
+                report(name, action, note + ("（--dry-run）" if dry_run and action in ("run", "adopt") else ""))
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, note, input_digests, stage_paths, verify_dir = running.pop(future)
+                success, log, seconds, metrics_report = future.result()
+                merge_report(metrics_report)
+                missing = [key for key in STAGES[name][2] if not os.path.exists(resolve(key, stage_paths))]
+                if success and missing:
+                    success = False
+                    log += "\n没有生成输出: " + ", ".join(missing) + "\n"
+                if verify_dir is not None and success:
+                    different = compare_outputs(name, paths, stage_paths, hash_cache)
+                    if different:
+                        # 不记录基准：之后输入变化时也不会覆盖这些输出
+                        report(name, "keep", "现有输出与重新生成的结果不同（含生成器不能重现的修改），"
+                                             "未覆盖（--force 重新生成）: " + ", ".join(different), seconds)
+                    else:
+                        record_stage(name, paths, state, hash_cache, input_digests)
+                        save_state(state)
+                        report(name, "adopt", "重新生成的结果与现有输出相同，记录为基准", seconds)
+                elif success:
+                    record_stage(name, paths, state, hash_cache, input_digests)
+                    save_state(state)
+                    report(name, "run", note, seconds)
+                else:
+                    report(name, "fail", note, seconds)
+                if verify_dir is not None:
+                    shutil.rmtree(verify_dir, ignore_errors=True)
+                if verbose or not success:
+                    print("\n".join("      " + line for line in log.rstrip().splitlines()))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        hash_cache.save()
+
+    return results
+
+
+def add_path_arguments(parser):
+    """源数据和输出路径参数（pipeline.py 与 watch_sources.py 共用）"""
+    parser.add_argument("--excel", default=EXCEL_PATH, help="矿物分析 Excel")
+    parser.add_argument("--minerals-csv", default=MINERAL_CSV_PATH, help="矿物 CSV（由 Excel 转换）")
+    parser.add_argument("--fossils-csv", default=FOSSIL_CSV_PATH, help="化石 CSV")
+    parser.add_argument("--database", default=DATABASE_PATH, help="数据库输出")
+    parser.add_argument("--images-dir", default=MINERAL_IMAGES_DIR, help="矿物图片目录")
+    parser.add_argument("--mapping-table", default=MAPPING_TABLE_PATH, help="映射表输出")
+    parser.add_argument("--overrides", default=DATABASE_OVERRIDES_PATH, help="数据库手工修订")
+
+
+def paths_from_args(args):
+    """命令行参数 -> 阶段使用的 paths"""
+    return {
+        "excel": os.path.abspath(args.excel),
+        "minerals_csv": os.path.abspath(args.minerals_csv),
+        "fossils_csv": os.path.abspath(args.fossils_csv),
+        "base_database": BASE_DATABASE_PATH,
+        "database": os.path.abspath(args.database),
+        "images_dir": os.path.abspath(args.images_dir),
+        "mapping_table": os.path.abspath(args.mapping_table),
+        "overrides": os.path.abspath(args.overrides),
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="按依赖执行数据流水线，输入未变化的阶段自动跳过")
+    parser.add_argument("stages", nargs="*", metavar="STAGE",
+                        help=f"只执行这些阶段及其上游（{', '.join(STAGES)}），默认全部")
+    parser.add_argument("--force", action="store_true", help="忽略运行记录，重新执行选中的阶段")
+    parser.add_argument("--dry-run", action="store_true", help="只显示将要执行的阶段")
+    parser.add_argument("--jobs", type=int, default=None, help="并行进程数")
+    parser.add_argument("--verbose", action="store_true", help="显示各阶段脚本的完整输出")
+    parser.add_argument("--list", action="store_true", help="列出阶段和依赖")
+    add_path_arguments(parser)
+    args = parser.parse_args()
+
+    unknown = [name for name in args.stages if name not in STAGES]
+    if unknown:
+        parser.error(f"未知阶段: {', '.join(unknown)}（可选: {', '.join(STAGES)}）")
+
+    paths = paths_from_args(args)
+
+    if args.list:
+        dependencies = stage_dependencies()
+        for name in topological_order(dependencies):
+            _, inputs, outputs = STAGES[name]
+            after = f"  (依赖 {', '.join(sorted(dependencies[name]))})" if dependencies[name] else ""
+            print(f"{name}{after}")
+            for key in inputs:
+                print(f"    < {os.path.relpath(resolve(key, paths))}")
+            for key in outputs:
+                print(f"    > {os.path.relpath(resolve(key, paths))}")
+        return 0
+
+    started = time.time()
+    print("=" * 80)
+    print("数据流水线" + ("（--dry-run）" if args.dry_run else ""))
+    print("=" * 80)
+
+    results = run_pipeline(paths, args.stages, args.force, args.dry_run, args.jobs, args.verbose)
+
+    failed = [name for name, (status, _, _) in results.items() if status in ("fail", "blocked")]
+    executed = sum(1 for status, _, _ in results.values() if status == "run")
+    print(f"\n执行 {executed} 个阶段，跳过 {len(results) - executed - len(failed)} 个，"
+          f"失败 {len(failed)} 个，用时 {time.time() - started:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
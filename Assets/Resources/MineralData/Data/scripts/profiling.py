@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能剖析
+run_main 包装的脚本加 --profile cprofile|sample 即可剖析，输出到 .cache/profiles/（--profile-output 指定前缀）：
+- cprofile：<前缀>.pstats（python -m pstats / snakeviz 读取）和 <前缀>.collapsed。
+  cProfile 只记录调用者→被调用者的边，collapsed 栈按各边的累计时间比例展开，是近似结果
+- sample：后台线程每 5 ms 用 sys._current_frames() 采样主线程调用栈，开销很小，
+  适合长时间的图片/模型任务；输出真实调用栈的 <前缀>.collapsed
+collapsed 每行为 "帧;帧;帧 数值"，可直接交给 flamegraph.pl、speedscope 等工具。
+进程池的工作进程用 worker_initializer 初始化后各自剖析，结束时合并到主进程的输出中。
+"""
+
+import cProfile
+import glob
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from multiprocessing import util
+
+from instrumentation import PROFILE_ENV
+from mineral_assets import CACHE_DIR
+
+PROFILE_MODES = ("cprofile", "sample")
+PROFILE_DIR = os.path.join(CACHE_DIR, "profiles")
+SAMPLE_INTERVAL = 0.005
+# cProfile 展开调用栈时忽略小于该值的分支（秒），避免调用图稠密时组合爆炸
+MIN_BRANCH_SECONDS = 1e-6
+MAX_STACK_DEPTH = 200
+TOP_COUNT = 15
+
+_label_cache = {}
+
+
+def code_label(code):
+    """调用栈中一帧的名称：函数名 (文件:行)"""
+    label = _label_cache.get(code)
+    if label is None:
+        label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        _label_cache[code] = label
+    return label
+
+
+def stats_label(function):
+    """pstats 的 (文件, 行, 函数名) -> 与 code_label 相同格式"""
+    filename, lineno, name = function
+    if filename == "~":
+        return name
+    return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+
+def frame_stack(frame):
+    """帧 -> 从外到内的 collapsed 栈字符串"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(code_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+class StackSampler:
+    """后台线程定时采样指定线程的调用栈"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.samples = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="StackSampler", daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[frame_stack(frame)] += 1
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        return self.samples
+
+
+def pstats_to_collapsed(stats):
+    """
+    pstats -> {collapsed 栈: 自身耗时(微秒)}
+    从没有调用者的函数开始向下展开，函数在某条路径上分到的时间按调用边的累计时间比例计算；
+    递归调用不再展开（其时间已包含在外层函数的累计时间里）
+    """
+    entries = stats.stats
+    children = {}
+    for function, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((function, edge[3]))
+
+    stacks = Counter()
+
+    def visit(function, budget, path, on_path):
+        _, _, self_time, cumulative, _ = entries[function]
+        fraction = min(budget / cumulative, 1.0) if cumulative > 0 else 0.0
+        path = path + [stats_label(function)]
+        micros = int(self_time * fraction * 1e6)
+        if micros > 0:
+            stacks[";".join(path)] += micros
+        if len(path) >= MAX_STACK_DEPTH:
+            return
+        on_path.add(function)
+        for callee, edge_cumulative in children.get(function, ()):
+            share = edge_cumulative * fraction
+            if callee not in on_path and share >= MIN_BRANCH_SECONDS:
+                visit(callee, share, path, on_path)
+        on_path.discard(function)
+
+    for function, (_, _, _, cumulative, callers) in entries.items():
+        if not callers:
+            visit(function, cumulative, [], set())
+    return stacks
+
+
+def write_collapsed(path, stacks):
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, value in sorted(stacks.items()):
+            f.write(f"{stack} {value}\n")
+
+
+def read_collapsed(path):
+    stacks = Counter()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            stack, _, value = line.rstrip("\n").rpartition(" ")
+            if stack:
+                stacks[stack] += int(value)
+    return stacks
+
+
+def print_top_stacks(stacks, unit, count=TOP_COUNT):
+    """按栈顶函数汇总自身耗时/样本数"""
+    total = sum(stacks.values())
+    if not total:
+        return
+    leaves = Counter()
+    for stack, value in stacks.items():
+        leaves[stack.rsplit(";", 1)[-1]] += value
+    print(f"\n=== 自身{unit}最多的函数（共 {total} {unit}）===")
+    for label, value in leaves.most_common(count):
+        print(f"  {value * 100 / total:5.1f}%  {label}")
+
+
+def merge_worker_outputs(prefix, mode):
+    """合并工作进程写出的 <前缀>.worker-<pid>.* 文件，返回 (进程数, collapsed 栈, pstats 或 None)"""
+    workers = sorted(glob.glob(glob.escape(prefix) + ".worker-*.collapsed"))
+    if not workers:
+        return 0, Counter(), None
+    stacks = Counter()
+    for path in workers:
+        stacks.update(read_collapsed(path))
+        os.remove(path)
+
+    stats = None
+    for path in sorted(glob.glob(glob.escape(prefix) + ".worker-*.pstats")):
+        if stats is None:
+            stats = pstats.Stats(path)
+        else:
+            stats.add(path)
+        os.remove(path)
+    return len(workers), stacks, stats
+
+
+def default_prefix(name):
+    return os.path.join(PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}")
+
+
+def activate(mode, prefix):
+    """记录当前进程的剖析设置，供工作进程和流水线阶段读取"""
+    os.environ[PROFILE_ENV] = f"{mode}|{prefix}"
+
+
+def active_profile():
+    """当前的 (模式, 输出前缀)，没有剖析时返回 None"""
+    value = os.environ.get(PROFILE_ENV)
+    if not value or "|" not in value:
+        return None
+    mode, prefix = value.split("|", 1)
+    return (mode, prefix) if mode in PROFILE_MODES else None
+
+
+@contextmanager
+def profiled(mode, prefix, interval=SAMPLE_INTERVAL, quiet=False):
+    """剖析 with 块，退出时写出 <前缀>.pstats / <前缀>.collapsed 并合并工作进程的结果"""
+    os.makedirs(os.path.dirname(os.path.abspath(prefix)), exist_ok=True)
+    profiler = sampler = None
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        sampler = StackSampler(interval).start()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            stats = pstats.Stats(profiler)
+            stacks = pstats_to_collapsed(stats)
+        else:
+            stats = None
+            stacks = sampler.stop()
+
+        worker_count, worker_stacks, worker_stats = merge_worker_outputs(prefix, mode)
+        # 工作进程的栈加上前缀，在火焰图中与主进程分开
+        for stack, value in worker_stacks.items():
+            stacks["<workers>;" + stack] += value
+        if worker_stats is not None:
+            stats.add(worker_stats)
+
+        outputs = []
+        if stats is not None:
+            stats.dump_stats(prefix + ".pstats")
+            outputs.append(prefix + ".pstats")
+        write_collapsed(prefix + ".collapsed", stacks)
+        outputs.append(prefix + ".collapsed")
+
+        if not quiet:
+            print_top_stacks(stacks, "微秒" if mode == "cprofile" else "样本")
+            workers = f"（含 {worker_count} 个工作进程）" if worker_count else ""
+            print(f"剖析结果{workers}: {', '.join(outputs)}")
+
+
+def worker_initializer():
+    """
+    进程池的 initializer：主进程正在剖析时，工作进程也剖析自身，
+    进程退出时写出 <前缀>.worker-<pid>.*，由主进程的 profiled() 合并
+    """
+    profile = active_profile()
+    if profile is None:
+        return
+    mode, prefix = profile
+    worker_prefix = f"{prefix}.worker-{os.getpid()}"
+
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        def finish():
+            profiler.disable()
+            stats = pstats.Stats(profiler)
+            stats.dump_stats(worker_prefix + ".pstats")
+            write_collapsed(worker_prefix + ".collapsed", pstats_to_collapsed(stats))
+    else:
+        sampler = StackSampler().start()
+
+        def finish():
+            write_collapsed(worker_prefix + ".collapsed", sampler.stop())
+
+    # 工作进程用 os._exit 退出，atexit 不会执行；multiprocessing 的 Finalize 会
+    util.Finalize(None, finish, exitpriority=100)
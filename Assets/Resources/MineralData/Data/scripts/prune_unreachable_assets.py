@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Resources 未引用资源清理工具
+从 SendaiMineralDatabase.json 的 imageFile/modelFile 出发，按运行时的加载规则
+计算可达资源，统计可节省的构建体积，并可将不可达资源批量移出 Resources（可恢复）
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import shutil
+import sys
+import time
+
+from atomic_output import write_json_if_changed
+from instrumentation import Progress, run_main
+from mineral_assets import (
+    ASSET_DIRS,
+    ASSET_ROOTS,
+    DATABASE_PATH,
+    MINERAL_DATA_DIR,
+    MODEL_FALLBACK_DIRS,
+    PROJECT_DIR,
+    asset_size,
+    iter_asset_references,
+    load_database,
+    scan_asset_tree,
+    split_stem,
+)
+
+PRUNED_DIR = os.path.join(PROJECT_DIR, "PrunedResources")
+MANIFEST_NAME = "prune_manifest.json"
+
+
+def index_assets(base_dir):
+    """索引 Images/ 和 Models/ 下的资源：(目录, 主名) -> [(相对路径, 大小)]"""
+    assets = {}
+
+    for root in ASSET_ROOTS:
+        for rel_dir, filename, entry in scan_asset_tree(os.path.join(base_dir, root), base_dir):
+            stem, _ = split_stem(filename)
+            size = asset_size(entry.path, entry.stat().st_size)
+            assets.setdefault((rel_dir, stem), []).append((f"{rel_dir}/{filename}", size))
+
+    return assets
+
+
+def compute_reachable(database, assets, keep_patterns=()):
+    """
+    按运行时加载规则计算可达资源
+    - 图片: EncyclopediaData/MineralDatabase 按记录类型目录 + 主名加载
+    - 模型: MineralDatabase.GetMineralModel 去掉 .glb 后按主名加载，
+            MicroscopeController 按 MODEL_FALLBACK_DIRS 顺序取第一个存在的
+    同一目录下同名不同扩展名的文件无法区分，全部视为可达
+    """
+    reachable = set()
+    unresolved = []
+
+    for kind, record_id, _, field, filename in iter_asset_references(database):
+        stem, _ = split_stem(filename)
+        primary_dir = ASSET_DIRS[(kind, field)]
+        hit = False
+
+        found = assets.get((primary_dir, stem))
+        if found:
+            reachable.update(path for path, _ in found)
+            hit = True
+
+        if field == "modelFile":
+            for fallback_dir in MODEL_FALLBACK_DIRS:
+                found = assets.get((fallback_dir, stem))
+                if found:
+                    reachable.update(path for path, _ in found)
+                    hit = True
+                    break
+
+        if not hit:
+            unresolved.append(f"{primary_dir}/{filename} <- {record_id}")
+
+    if keep_patterns:
+        for found in assets.values():
+            for path, _ in found:
+                if any(fnmatch.fnmatch(path, pattern) for pattern in keep_patterns):
+                    reachable.add(path)
+
+    return reachable, unresolved
+
+
+def build_prune_plan(database, base_dir=MINERAL_DATA_DIR, keep_patterns=()):
+    """生成清理计划"""
+    assets = index_assets(base_dir)
+    reachable, unresolved = compute_reachable(database, assets, keep_patterns)
+
+    kept = []
+    pruned = []
+    for found in assets.values():
+        for path, size in found:
+            (kept if path in reachable else pruned).append((path, size))
+
+    kept.sort()
+    pruned.sort()
+
+    return {
+        "reachable": kept,
+        "unreachable": pruned,
+        "unresolved": sorted(set(unresolved)),
+        "reachableBytes": sum(size for _, size in kept),
+        "unreachableBytes": sum(size for _, size in pruned),
+    }
+
+
+def print_plan(plan):
+    """打印清理计划"""
+    total = plan["reachableBytes"] + plan["unreachableBytes"]
+
+    print("=" * 80)
+    print("Resources 可达性分析")
+    print("=" * 80)
+    print(f"可达资源: {len(plan['reachable'])} 个 ({plan['reachableBytes'] / 1024 / 1024:.1f} MB)")
+    print(f"不可达资源: {len(plan['unreachable'])} 个 ({plan['unreachableBytes'] / 1024 / 1024:.1f} MB)")
+
+    if total:
+        print(f"可节省构建体积: {plan['unreachableBytes'] / total * 100:.1f}%")
+
+    print("\n不可达资源列表:")
+    for path, size in plan["unreachable"]:
+        print(f"  - {path:55} ({size / 1024:8.1f} KB)")
+
+    if plan["unresolved"]:
+        print(f"\n⚠️  数据库引用但找不到文件 ({len(plan['unresolved'])} 个):")
+        for item in plan["unresolved"]:
+            print(f"  - {item}")
+
+
+def move_with_meta(source, target):
+    """移动文件及其 Unity .meta（保留 GUID，恢复后引用不丢失）"""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(source, target)
+    if os.path.exists(source + ".meta"):
+        shutil.move(source + ".meta", target + ".meta")
+
+
+def write_manifest(batch_dir, manifest):
+    """原子写入批次清单（中断时清单始终完整）"""
+    manifest["movedBytes"] = sum(item["size"] for item in manifest["files"] if item["moved"])
+    write_json_if_changed(os.path.join(batch_dir, MANIFEST_NAME), manifest)
+
+
+def apply_prune(plan, base_dir=MINERAL_DATA_DIR, pruned_dir=PRUNED_DIR):
+    """
+    将不可达资源移到 Resources 之外的批次目录，并记录清单以便恢复
+    清单在移动前写入（列出全部计划移动的文件），每移动一个文件更新一次，
+    中途中断时也可以用 --restore 恢复已移出的部分
+    """
+    if not plan["unreachable"]:
+        print("没有需要移出的资源")
+        return None
+
+    batch_dir = os.path.join(pruned_dir, time.strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(batch_dir)
+    manifest = {
+        "baseDir": os.path.relpath(base_dir, PROJECT_DIR).replace(os.sep, "/"),
+        "createdAt": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "movedBytes": 0,
+        "files": [{"path": path, "size": size, "moved": False} for path, size in plan["unreachable"]],
+    }
+    write_manifest(batch_dir, manifest)
+
+    with Progress("移出资源", total=len(manifest["files"]), counter="assets_pruned") as progress:
+        for item in manifest["files"]:
+            move_with_meta(os.path.join(base_dir, item["path"]), os.path.join(batch_dir, item["path"]))
+            item["moved"] = True
+            write_manifest(batch_dir, manifest)
+            progress.update(detail=item["path"])
+
+    print(f"\n已移出 {len(manifest['files'])} 个资源到: {batch_dir}")
+    print(f"恢复命令: python3 prune_unreachable_assets.py --restore \"{batch_dir}\"")
+    return batch_dir
+
+
+def remove_empty_dirs(directory):
+    """自底向上删除空目录，返回仍有文件的目录中剩余的文件（相对 directory）"""
+    remaining = []
+    for root, _, files in os.walk(directory, topdown=False):
+        remaining.extend(os.path.relpath(os.path.join(root, name), directory) for name in files)
+        if not os.listdir(root):
+            os.rmdir(root)
+    return sorted(remaining)
+
+
+def restore_batch(batch_dir):
+    """
+    按清单把批次中的资源移回 Resources
+    以批次目录中实际存在的文件为准（移出或恢复中断时清单状态可能落后一步），每恢复一个文件更新清单
+    """
+    manifest_path = os.path.join(batch_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        print(f"清单文件不存在: {manifest_path}")
+        return False
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    base_dir = os.path.join(PROJECT_DIR, manifest["baseDir"])
+    for item in manifest["files"]:
+        # 旧版清单在全部移动完成后才写入，没有 moved 字段
+        item.setdefault("moved", True)
+
+    pending = [item for item in manifest["files"]
+               if os.path.exists(os.path.join(batch_dir, item["path"]))
+               or os.path.exists(os.path.join(batch_dir, item["path"]) + ".meta")]
+    conflicts = [item["path"] for item in pending
+                 if os.path.exists(os.path.join(base_dir, item["path"]))
+                 and os.path.exists(os.path.join(batch_dir, item["path"]))]
+    if conflicts:
+        print("恢复中止，以下文件已存在:")
+        for path in conflicts:
+            print(f"  - {path}")
+        return False
+
+    with Progress("恢复资源", total=len(pending), counter="assets_restored") as progress:
+        for item in pending:
+            source = os.path.join(batch_dir, item["path"])
+            target = os.path.join(base_dir, item["path"])
+            if os.path.exists(source):
+                move_with_meta(source, target)
+            elif not os.path.exists(target + ".meta"):
+                # 移出时文件已移动、.meta 尚未移动就中断的反向情况：只剩 .meta
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(source + ".meta", target + ".meta")
+            item["moved"] = False
+            write_manifest(batch_dir, manifest)
+            progress.update(detail=item["path"])
+
+    os.remove(manifest_path)
+    remaining = remove_empty_dirs(batch_dir)
+    if remaining:
+        print(f"批次目录中还有清单以外的文件，未删除: {batch_dir}")
+        for path in remaining:
+            print(f"  - {path}")
+
+    print(f"\n已恢复 {len(pending)} 个资源")
+    return True
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="计算可达资源并清理 Resources 中未引用的资源")
+    parser.add_argument("--database", default=DATABASE_PATH, help="数据库JSON路径")
+    parser.add_argument("--root", default=MINERAL_DATA_DIR, help="MineralData 目录")
+    parser.add_argument("--keep", action="append", default=[], help="额外保留的路径通配符（相对 MineralData，可多次指定）")
+    parser.add_argument("--apply", action="store_true", help="将不可达资源移出 Resources")
+    parser.add_argument("--pruned-dir", default=PRUNED_DIR, help="移出资源的存放目录")
+    parser.add_argument("--restore", metavar="BATCH_DIR", help="恢复某个批次移出的资源")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出清理计划")
+    args = parser.parse_args()
+
+    if args.restore:
+        return 0 if restore_batch(args.restore) else 1
+
+    if not os.path.exists(args.database):
+        print(f"数据库文件不存在: {args.database}", file=sys.stderr)
+        return 2
+
+    plan = build_prune_plan(load_database(args.database), args.root, args.keep)
+
+    if args.json:
+        print(json.dumps(plan, ensure_ascii=False, indent=2))
+    else:
+        print_plan(plan)
+
+    if args.apply:
+        apply_prune(plan, args.root, args.pruned_dir)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
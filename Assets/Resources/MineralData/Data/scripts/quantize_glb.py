@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GLB 网格量化工具 (KHR_mesh_quantization)
+- 顶点位置: int16，反量化用的平移和缩放合并进节点变换
+- 法线/切线: 归一化 int8
+- UV: 取值在 [0, 1] 内时改为归一化 uint16
+量化后逐项检查误差，超出容差的属性保持 float32，最后重新打包BIN块。
+注意: 运行时的 glTF 导入器必须支持 KHR_mesh_quantization，否则模型无法加载，
+因此默认输出到单独目录，确认导入正常后再替换 Resources 中的模型
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from glb_mesh import accessor_array, add_accessor, quaternion_matrix
+from glb_utils import TARGET_ARRAY_BUFFER, GlbError, GlbFile
+from glb_inspect import find_models
+from instrumentation import run_main
+from mineral_assets import MINERAL_DATA_DIR, PROJECT_DIR
+
+EXTENSION_NAME = "KHR_mesh_quantization"
+OPTIMIZED_DIR = os.path.join(PROJECT_DIR, "OptimizedModels")
+
+
+def optimized_output_dir(pass_name):
+    """
+    各优化步骤的默认输出目录 OptimizedModels/<步骤>/，步骤之间互不覆盖
+    链式处理时把上一步的输出目录作为下一步的 --root（输出保持相对 MineralData 的路径）
+    """
+    return os.path.join(OPTIMIZED_DIR, pass_name)
+
+
+FLOAT = 5126
+BYTE = 5120
+SHORT = 5122
+UNSIGNED_SHORT = 5123
+
+POSITION_RANGE = 32767
+NORMAL_RANGE = 127
+UV_RANGE = 65535
+
+
+def geometry_bytes(gltf):
+    """访问器引用的 bufferView 总字节数"""
+    views = {accessor["bufferView"] for accessor in gltf.get("accessors", []) if "bufferView" in accessor}
+    return sum(gltf["bufferViews"][index]["byteLength"] for index in views)
+
+
+def accessor_users(gltf):
+    """访问器索引 -> 引用它的网格集合"""
+    users = {}
+    for mesh_index, mesh in enumerate(gltf.get("meshes", [])):
+        for primitive in mesh.get("primitives", []):
+            for accessor_index in primitive.get("attributes", {}).values():
+                users.setdefault(accessor_index, set()).add(mesh_index)
+    return users
+
+
+def quantizable_meshes(gltf):
+    """
+    可以量化位置的网格: 没有变形目标、没有被蒙皮节点使用、
+    位置访问器不与其他网格共享
+    """
+    users = accessor_users(gltf)
+    skinned = {node["mesh"] for node in gltf.get("nodes", []) if "mesh" in node and "skin" in node}
+
+    result = {}
+    for mesh_index, mesh in enumerate(gltf.get("meshes", [])):
+        primitives = mesh.get("primitives", [])
+        if mesh_index in skinned:
+            result[mesh_index] = "蒙皮网格"
+        elif any("targets" in primitive for primitive in primitives):
+            result[mesh_index] = "含变形目标"
+        elif any(users.get(p["attributes"].get("POSITION"), set()) != {mesh_index} for p in primitives):
+            result[mesh_index] = "位置访问器被多个网格共享"
+        else:
+            result[mesh_index] = None
+    return result
+
+
+def quantize_positions(glb, mesh_index, tolerance):
+    """
+    把网格所有图元的位置量化为 int16（统一的平移和缩放）
+    返回 (偏移, 缩放, 最大误差)；误差超出容差时不修改并返回 None
+    """
+    gltf = glb.gltf
+    primitives = gltf["meshes"][mesh_index]["primitives"]
+    position_accessors = sorted({p["attributes"]["POSITION"] for p in primitives})
+    if any(gltf["accessors"][index]["componentType"] != FLOAT for index in position_accessors):
+        return None
+
+    arrays = {index: accessor_array(glb, index).astype(np.float64) for index in position_accessors}
+    stacked = np.concatenate(list(arrays.values()))
+    low = stacked.min(axis=0)
+    high = stacked.max(axis=0)
+    offset = (low + high) / 2
+    extent = float((high - low).max()) / 2
+    if extent == 0:
+        return None
+    scale = extent / POSITION_RANGE
+
+    quantized = {}
+    max_error = 0.0
+    for index, positions in arrays.items():
+        values = np.clip(np.round((positions - offset) / scale), -POSITION_RANGE, POSITION_RANGE)
+        max_error = max(max_error, float(np.abs(values * scale + offset - positions).max()))
+        quantized[index] = values.astype(np.int16)
+
+    diagonal = float(np.linalg.norm(high - low))
+    if max_error > tolerance * diagonal:
+        return None
+
+    remap = {}
+    for index, values in quantized.items():
+        remap[index] = add_accessor(glb, values, SHORT, TARGET_ARRAY_BUFFER, bounds=True, pad_to=4)
+    for primitive in primitives:
+        primitive["attributes"]["POSITION"] = remap[primitive["attributes"]["POSITION"]]
+
+    return offset, scale, max_error / diagonal
+
+
+def apply_dequantization(gltf, mesh_index, offset, scale):
+    """
+    把反量化变换合并进引用该网格的节点
+    TRS 节点且没有子节点时直接合成 T' = T + R·S·offset, S' = S·scale；
+    否则把网格移到一个携带反量化变换的新子节点，避免影响子节点
+    """
+    nodes = gltf["nodes"]
+    for node_index in range(len(nodes)):
+        node = nodes[node_index]
+        if node.get("mesh") != mesh_index:
+            continue
+
+        if "matrix" not in node and not node.get("children"):
+            node_scale = np.array(node.get("scale", [1.0, 1.0, 1.0]), dtype=np.float64)
+            rotation = quaternion_matrix(node.get("rotation", [0.0, 0.0, 0.0, 1.0]))
+            translation = np.array(node.get("translation", [0.0, 0.0, 0.0]), dtype=np.float64)
+            node["translation"] = (translation + rotation @ (node_scale * offset)).tolist()
+            node["scale"] = (node_scale * scale).tolist()
+            continue
+
+        child = {
+            "name": f"{node.get('name', 'node')}_dequantize",
+            "mesh": node.pop("mesh"),
+            "translation": offset.tolist(),
+            "scale": [scale, scale, scale],
+        }
+        nodes.append(child)
+        node.setdefault("children", []).append(len(nodes) - 1)
+
+
+def quantize_attribute(glb, accessor_index, kind, tolerance):
+    """
+    量化法线/切线（int8 归一化）或 UV（uint16 归一化）
+    返回 (新访问器索引, 误差)，无法量化时返回 (None, 原因)
+    """
+    accessor = glb.gltf["accessors"][accessor_index]
+    if accessor["componentType"] != FLOAT:
+        return None, "已是整数类型"
+
+    values = accessor_array(glb, accessor_index).astype(np.float64)
+
+    if kind == "uv":
+        if values.size and (values.min() < 0 or values.max() > 1):
+            return None, "UV 超出 [0, 1]"
+        quantized = np.round(values * UV_RANGE)
+        error = float(np.abs(quantized / UV_RANGE - values).max()) if values.size else 0.0
+        if error > tolerance:
+            return None, f"误差 {error:.2e} 超出容差"
+        return add_accessor(glb, quantized, UNSIGNED_SHORT, TARGET_ARRAY_BUFFER, normalized=True), error
+
+    # 法线和切线的 xyz 是单位向量，切线的 w 为 ±1
+    quantized = np.clip(np.round(values * NORMAL_RANGE), -NORMAL_RANGE, NORMAL_RANGE)
+    direction = values[:, :3]
+    restored = quantized[:, :3] / NORMAL_RANGE
+    lengths = np.linalg.norm(direction, axis=1) * np.linalg.norm(restored, axis=1)
+    valid = lengths > 0
+    cosines = np.ones(len(values))
+    cosines[valid] = (direction[valid] * restored[valid]).sum(axis=1) / lengths[valid]
+    error = float(np.degrees(np.arccos(np.clip(cosines, -1, 1))).max()) if len(values) else 0.0
+    if error > tolerance:
+        return None, f"角度误差 {error:.2f}° 超出容差"
+
+    pad_to = 4 if quantized.shape[1] == 3 else None
+    return add_accessor(glb, quantized, BYTE, TARGET_ARRAY_BUFFER, normalized=True, pad_to=pad_to), error
+
+
+def quantize_glb(glb, position_tolerance=1e-4, normal_tolerance=2.0, uv_tolerance=1e-4):
+    """
+    对 GlbFile 执行量化（原地修改），返回统计信息
+    position_tolerance: 相对包围盒对角线的最大误差
+    normal_tolerance: 法线最大角度误差（度）
+    uv_tolerance: UV 最大绝对误差
+    """
+    gltf = glb.gltf
+    before = geometry_bytes(gltf)
+    stats = {"geometryBefore": before, "positions": [], "skipped": []}
+
+    for mesh_index, reason in quantizable_meshes(gltf).items():
+        if reason:
+            stats["skipped"].append(f"mesh {mesh_index} POSITION: {reason}")
+            continue
+        result = quantize_positions(glb, mesh_index, position_tolerance)
+        if result is None:
+            stats["skipped"].append(f"mesh {mesh_index} POSITION: 误差超出容差或包围盒为空")
+            continue
+        offset, scale, relative_error = result
+        apply_dequantization(gltf, mesh_index, offset, scale)
+        stats["positions"].append(relative_error)
+
+    converted = {}
+    errors = {"normal": 0.0, "uv": 0.0}
+    for mesh_index, mesh in enumerate(gltf.get("meshes", [])):
+        for primitive in mesh.get("primitives", []):
+            attributes = primitive["attributes"]
+            for name, accessor_index in list(attributes.items()):
+                if name in ("NORMAL", "TANGENT"):
+                    kind, tolerance = "normal", normal_tolerance
+                elif name.startswith("TEXCOORD_"):
+                    kind, tolerance = "uv", uv_tolerance
+                else:
+                    continue
+
+                if accessor_index not in converted:
+                    converted[accessor_index] = quantize_attribute(glb, accessor_index, kind, tolerance)
+                new_index, detail = converted[accessor_index]
+                if new_index is None:
+                    stats["skipped"].append(f"mesh {mesh_index} {name}: {detail}")
+                    continue
+                attributes[name] = new_index
+                errors[kind] = max(errors[kind], detail)
+
+    changed = bool(stats["positions"]) or any(index is not None for index, _ in converted.values())
+    if changed:
+        glb.add_extension(EXTENSION_NAME, required=True)
+        glb.remove_unused_accessors()
+        glb.repack()
+
+    stats["changed"] = changed
+    stats["geometryAfter"] = geometry_bytes(gltf)
+    stats["maxPositionError"] = max(stats["positions"], default=0.0)
+    stats["maxNormalError"] = errors["normal"]
+    stats["maxUvError"] = errors["uv"]
+    del stats["positions"]
+    return stats
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="使用 KHR_mesh_quantization 量化 GLB 模型几何数据")
+    parser.add_argument("models", nargs="*", help="要量化的 GLB 文件（默认 MineralData/Models 下全部）")
+    parser.add_argument("--root", default=MINERAL_DATA_DIR, help="MineralData 目录")
+    parser.add_argument("--output-dir", default=optimized_output_dir("quantized"),
+                        help="输出目录（保持相对 MineralData 的路径，默认 OptimizedModels/quantized）")
+    parser.add_argument("--in-place", action="store_true", help="直接覆盖原文件")
+    parser.add_argument("--position-tolerance", type=float, default=1e-4, help="位置误差上限（相对包围盒对角线）")
+    parser.add_argument("--normal-tolerance", type=float, default=2.0, help="法线角度误差上限（度）")
+    parser.add_argument("--uv-tolerance", type=float, default=1e-4, help="UV 误差上限")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出统计")
+    args = parser.parse_args()
+
+    if args.models:
+        models = [(os.path.relpath(path, args.root).replace(os.sep, "/"), path) for path in args.models]
+    else:
+        models = find_models(args.root)
+
+    results = {}
+    failed = 0
+    for rel_path, path in models:
+        try:
+            glb = GlbFile.load(path)
+            stats = quantize_glb(glb, args.position_tolerance, args.normal_tolerance, args.uv_tolerance)
+        except (GlbError, OSError, ValueError, KeyError) as e:
+            results[rel_path] = {"error": str(e)}
+            failed += 1
+            continue
+
+        target = path if args.in_place else os.path.join(args.output_dir, rel_path)
+        if stats["changed"]:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            glb.save(target)
+        stats["output"] = target if stats["changed"] else None
+        results[rel_path] = stats
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return 1 if failed else 0
+
+    print("=" * 100)
+    print("GLB 网格量化 (KHR_mesh_quantization)")
+    print("=" * 100)
+    print(f"{'模型':45} {'几何KB':>9} {'量化后KB':>9} {'减少':>7} {'位置误差':>10} {'UV误差':>9}")
+
+    total_before = total_after = 0
+    for rel_path, stats in results.items():
+        if "error" in stats:
+            print(f"{rel_path:45} ✗ 处理失败: {stats['error']}")
+            continue
+        before, after = stats["geometryBefore"], stats["geometryAfter"]
+        total_before += before
+        total_after += after
+        saving = (1 - after / before) * 100 if before else 0
+        print(f"{rel_path:45} {before / 1024:9.1f} {after / 1024:9.1f} {saving:6.1f}% "
+              f"{stats['maxPositionError']:10.2e} {stats['maxUvError']:9.2e}")
+        for item in stats["skipped"]:
+            print(f"    跳过 {item}")
+
+    if total_before:
+        print(f"\n几何数据: {total_before / 1024 / 1024:.2f} MB -> {total_after / 1024 / 1024:.2f} MB "
+              f"(减少 {(1 - total_after / total_before) * 100:.1f}%)")
+    if not args.in_place:
+        print(f"输出目录: {args.output_dir}")
+    if failed:
+        print(f"处理失败: {failed} 个")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
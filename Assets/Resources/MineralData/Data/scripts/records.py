@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库记录模型
+地层、岩石、矿物、化石用 __slots__ 类表示，代替逐条嵌套的 dict：
+- 实例没有 __dict__，字段名不再在每条记录里各存一份；properties 直接展开为字段
+- 名称、ID、属性文本等重复值经 sys.intern 共用同一个字符串对象
+- from_dict / to_dict 与 SendaiMineralDatabase.json 的结构一一对应，键顺序不变，
+  往返后 dump_json 的输出与原文件逐字节相同
+数据库中手工添加的未知字段保存在 extra 中，写回时附在该层字段之后。
+"""
+
+import json
+import os
+import sys
+
+from mineral_assets import DATABASE_OVERRIDES_PATH, DATABASE_PATH
+
+
+def intern_text(value):
+    """字符串驻留，其他类型原样返回"""
+    return sys.intern(value) if type(value) is str else value
+
+
+def split_extra(data, known):
+    """不在 known 中的字段（保持原顺序），没有时返回 None"""
+    if len(data) == len(known):
+        return None
+    extra = {key: value for key, value in data.items() if key not in known}
+    return extra or None
+
+
+def merge_extra(result, extra):
+    if extra:
+        result.update(extra)
+    return result
+
+
+class Mineral:
+    __slots__ = ("mineral_id", "name", "name_en", "name_ja", "percentage",
+                 "mohs_hardness", "acid_reaction", "uv_fluorescence", "magnetism", "density",
+                 "polarized_color", "appearance", "image_file", "model_file",
+                 "extra", "properties_extra")
+
+    KEYS = frozenset(("mineralId", "mineralName", "mineralNameEN", "mineralNameJA", "percentage", "properties"))
+    PROPERTY_KEYS = frozenset(("mohsHardness", "acidReaction", "uvFluorescence", "magnetism", "density",
+                               "polarizedColor", "appearance", "imageFile", "modelFile"))
+
+    def __init__(self, mineral_id, name, name_en, name_ja, percentage,
+                 mohs_hardness, acid_reaction, uv_fluorescence, magnetism, density,
+                 polarized_color, appearance, image_file, model_file,
+                 extra=None, properties_extra=None):
+        self.mineral_id = intern_text(mineral_id)
+        self.name = intern_text(name)
+        self.name_en = intern_text(name_en)
+        self.name_ja = intern_text(name_ja)
+        self.percentage = percentage
+        self.mohs_hardness = intern_text(mohs_hardness)
+        self.acid_reaction = acid_reaction
+        self.uv_fluorescence = intern_text(uv_fluorescence)
+        self.magnetism = intern_text(magnetism)
+        self.density = intern_text(density)
+        self.polarized_color = intern_text(polarized_color)
+        self.appearance = intern_text(appearance)
+        self.image_file = intern_text(image_file)
+        self.model_file = intern_text(model_file)
+        self.extra = extra
+        self.properties_extra = properties_extra
+
+    @classmethod
+    def from_dict(cls, data):
+        properties = data["properties"]
+        return cls(data["mineralId"], data["mineralName"], data["mineralNameEN"], data["mineralNameJA"],
+                   data["percentage"],
+                   properties["mohsHardness"], properties["acidReaction"], properties["uvFluorescence"],
+                   properties["magnetism"], properties["density"], properties["polarizedColor"],
+                   properties["appearance"], properties["imageFile"], properties["modelFile"],
+                   split_extra(data, cls.KEYS), split_extra(properties, cls.PROPERTY_KEYS))
+
+    def to_dict(self):
+        return merge_extra({
+            "mineralId": self.mineral_id,
+            "mineralName": self.name,
+            "mineralNameEN": self.name_en,
+            "mineralNameJA": self.name_ja,
+            "percentage": self.percentage,
+            "properties": merge_extra({
+                "mohsHardness": self.mohs_hardness,
+                "acidReaction": self.acid_reaction,
+                "uvFluorescence": self.uv_fluorescence,
+                "magnetism": self.magnetism,
+                "density": self.density,
+                "polarizedColor": self.polarized_color,
+                "appearance": self.appearance,
+                "imageFile": self.image_file,
+                "modelFile": self.model_file,
+            }, self.properties_extra),
+        }, self.extra)
+
+
+class Fossil:
+    __slots__ = ("fossil_id", "name", "name_en", "name_ja", "rarity", "discovery_probability",
+                 "fossil_type", "image_file", "model_file", "description",
+                 "extra", "properties_extra")
+
+    KEYS = frozenset(("fossilId", "fossilName", "fossilNameEN", "fossilNameJA", "rarity",
+                      "discoveryProbability", "properties"))
+    PROPERTY_KEYS = frozenset(("type", "imageFile", "modelFile", "description"))
+
+    def __init__(self, fossil_id, name, name_en, name_ja, rarity, discovery_probability,
+                 image_file, model_file, description, fossil_type="fossil",
+                 extra=None, properties_extra=None):
+        self.fossil_id = intern_text(fossil_id)
+        self.name = intern_text(name)
+        self.name_en = intern_text(name_en)
+        self.name_ja = intern_text(name_ja)
+        self.rarity = intern_text(rarity)
+        self.discovery_probability = discovery_probability
+        self.fossil_type = intern_text(fossil_type)
+        self.image_file = intern_text(image_file)
+        self.model_file = intern_text(model_file)
+        self.description = description
+        self.extra = extra
+        self.properties_extra = properties_extra
+
+    @classmethod
+    def from_dict(cls, data):
+        properties = data["properties"]
+        return cls(data["fossilId"], data["fossilName"], data["fossilNameEN"], data["fossilNameJA"],
+                   data["rarity"], data["discoveryProbability"],
+                   properties["imageFile"], properties["modelFile"], properties["description"],
+                   properties["type"],
+                   split_extra(data, cls.KEYS), split_extra(properties, cls.PROPERTY_KEYS))
+
+    def to_dict(self):
+        return merge_extra({
+            "fossilId": self.fossil_id,
+            "fossilName": self.name,
+            "fossilNameEN": self.name_en,
+            "fossilNameJA": self.name_ja,
+            "rarity": self.rarity,
+            "discoveryProbability": self.discovery_probability,
+            "properties": merge_extra({
+                "type": self.fossil_type,
+                "imageFile": self.image_file,
+                "modelFile": self.model_file,
+                "description": self.description,
+            }, self.properties_extra),
+        }, self.extra)
+
+
+class Rock:
+    __slots__ = ("rock_id", "name", "name_en", "name_ja", "minerals", "extra")
+
+    KEYS = frozenset(("rockId", "rockName", "rockNameEN", "rockNameJA", "minerals"))
+
+    def __init__(self, rock_id, name, name_en, name_ja, minerals=None, extra=None):
+        self.rock_id = intern_text(rock_id)
+        self.name = intern_text(name)
+        self.name_en = intern_text(name_en)
+        self.name_ja = intern_text(name_ja)
+        self.minerals = minerals if minerals is not None else []
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["rockId"], data["rockName"], data["rockNameEN"], data["rockNameJA"],
+                   [Mineral.from_dict(mineral) for mineral in data["minerals"]],
+                   split_extra(data, cls.KEYS))
+
+    def to_dict(self):
+        return merge_extra({
+            "rockId": self.rock_id,
+            "rockName": self.name,
+            "rockNameEN": self.name_en,
+            "rockNameJA": self.name_ja,
+            "minerals": [mineral.to_dict() for mineral in self.minerals],
+        }, self.extra)
+
+
+class Layer:
+    """fossils 为 None 表示数据库中没有该字段（化石合并之前），[] 表示没有化石"""
+
+    __slots__ = ("layer_id", "name", "name_en", "name_ja", "rock_types", "fossils", "extra")
+
+    KEYS = frozenset(("layerId", "layerName", "layerNameEN", "layerNameJA", "rockTypes", "fossils"))
+
+    def __init__(self, layer_id, name, name_en, name_ja, rock_types=None, fossils=None, extra=None):
+        self.layer_id = intern_text(layer_id)
+        self.name = intern_text(name)
+        self.name_en = intern_text(name_en)
+        self.name_ja = intern_text(name_ja)
+        self.rock_types = rock_types if rock_types is not None else []
+        self.fossils = fossils
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data):
+        fossils = data.get("fossils")
+        return cls(data["layerId"], data["layerName"], data["layerNameEN"], data["layerNameJA"],
+                   [Rock.from_dict(rock) for rock in data["rockTypes"]],
+                   [Fossil.from_dict(fossil) for fossil in fossils] if fossils is not None else None,
+                   split_extra(data, cls.KEYS - ({"fossils"} if fossils is None else set())))
+
+    def to_dict(self):
+        result = {
+            "layerId": self.layer_id,
+            "layerName": self.name,
+            "layerNameEN": self.name_en,
+            "layerNameJA": self.name_ja,
+            "rockTypes": [rock.to_dict() for rock in self.rock_types],
+        }
+        if self.fossils is not None:
+            result["fossils"] = [fossil.to_dict() for fossil in self.fossils]
+        return merge_extra(result, self.extra)
+
+
+class Database:
+    __slots__ = ("version", "last_updated", "description", "layers", "extra")
+
+    KEYS = frozenset(("version", "lastUpdated", "description", "stratigraphicLayers"))
+
+    def __init__(self, version, last_updated, description, layers=None, extra=None):
+        self.version = version
+        self.last_updated = last_updated
+        self.description = description
+        self.layers = layers if layers is not None else []
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["version"], data["lastUpdated"], data["description"],
+                   [Layer.from_dict(layer) for layer in data["stratigraphicLayers"]],
+                   split_extra(data, cls.KEYS))
+
+    def to_dict(self):
+        return merge_extra({
+            "version": self.version,
+            "lastUpdated": self.last_updated,
+            "description": self.description,
+            "stratigraphicLayers": [layer.to_dict() for layer in self.layers],
+        }, self.extra)
+
+    def minerals(self):
+        """遍历所有矿物：(地层, 岩石, 矿物)"""
+        for layer in self.layers:
+            for rock in layer.rock_types:
+                for mineral in rock.minerals:
+                    yield layer, rock, mineral
+
+    def fossils(self):
+        """遍历所有化石：(地层, 化石)"""
+        for layer in self.layers:
+            for fossil in layer.fossils or ():
+                yield layer, fossil
+
+
+def load_database_records(database_path=DATABASE_PATH):
+    with open(database_path, 'r', encoding='utf-8') as f:
+        return Database.from_dict(json.load(f))
+
+
+class DatabaseOverrides:
+    """
+    database_overrides.json：源数据不能重现的手工修订
+    - minerals：按 (地层ID, 岩石ID, 生成的矿物ID) 把矿物替换为 record
+    - fossils：按地层ID替换整个化石列表（不再使用化石 CSV 中该地层的行）
+    """
+
+    __slots__ = ("minerals", "fossils")
+
+    def __init__(self, minerals=None, fossils=None):
+        self.minerals = minerals if minerals is not None else {}
+        self.fossils = fossils if fossils is not None else {}
+
+    @classmethod
+    def from_dict(cls, data):
+        minerals = {(entry["layerId"], entry["rockId"], entry["mineralId"]): entry["record"]
+                    for entry in data.get("minerals", [])}
+        return cls(minerals, dict(data.get("fossils", {})))
+
+    @classmethod
+    def load(cls, path=DATABASE_OVERRIDES_PATH):
+        """读取修订文件；path 为 None 或文件不存在时没有修订"""
+        if not path or not os.path.exists(path):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def apply_minerals(self, database):
+        """
+        替换矿物，返回替换的数量
+        有修订没有匹配到矿物时（源数据变化）抛出 ValueError，避免修订被静默丢弃
+        """
+        used = set()
+        for layer in database.layers:
+            for rock in layer.rock_types:
+                for index, mineral in enumerate(rock.minerals):
+                    key = (layer.layer_id, rock.rock_id, mineral.mineral_id)
+                    record = self.minerals.get(key)
+                    if record is not None:
+                        rock.minerals[index] = Mineral.from_dict(record)
+                        used.add(key)
+        unused = [key for key in self.minerals if key not in used]
+        if unused:
+            raise ValueError("手工修订没有匹配的矿物（源数据已变化，请更新 database_overrides.json）: " +
+                             ", ".join("/".join(key) for key in unused))
+        return len(used)
+
+    def layer_fossils(self, layer_id):
+        """地层的化石修订，没有时返回 None"""
+        fossils = self.fossils.get(layer_id)
+        if fossils is None:
+            return None
+        return [Fossil.from_dict(fossil) for fossil in fossils]
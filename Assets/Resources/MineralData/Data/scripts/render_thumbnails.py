@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型缩略图离线渲染工具
+纯 NumPy 软件光栅化（深度缓冲、透视校正纹理采样、Lambert 光照），
+相机方向、视场角和主光源方向与 SamplePreviewGenerator 一致，
+按图标尺寸输出透明背景 PNG 到 MineralData/Thumbnails/<尺寸>/<模型目录>/<模型名>.png
+（模型目录为 Models/ 下的子目录，不同目录的同名模型互不覆盖），
+并写入导入类型为 Sprite 的 .meta（已存在时不改动），
+运行时可直接 Resources.Load<Sprite>("MineralData/Thumbnails/128/Minerals/<模型名>")。
+按模型哈希和渲染参数缓存，模型未变化时跳过；多个模型并行渲染
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import posixpath
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from atomic_output import write_bytes_if_changed, write_json_if_changed, write_text_if_changed
+from glb_inspect import find_models
+from glb_mesh import accessor_array, mesh_instances, primitive_indices, transform_points
+from glb_utils import GlbFile
+from instrumentation import run_main
+from mineral_assets import CACHE_DIR, MINERAL_DATA_DIR, PROJECT_DIR, HashCache, split_stem
+from profiling import worker_initializer
+
+THUMBNAIL_DIR = os.path.join(MINERAL_DATA_DIR, "Thumbnails")
+THUMBNAIL_CACHE_PATH = os.path.join(CACHE_DIR, "thumbnails.json")
+
+DEFAULT_SIZES = (64, 128, 256)
+MODELS_PREFIX = "Models/"
+
+# 项目默认按 3D 模式导入（EditorSettings m_DefaultBehaviorMode: 0），PNG 默认是 Texture2D，
+# Resources.Load<Sprite> 需要导入类型为 Sprite（textureType: 8）；GUID 由路径生成，重新生成时不变
+SPRITE_META = """fileFormatVersion: 2
+guid: {guid}
+TextureImporter:
+  internalIDToNameTable: []
+  externalObjects: {{}}
+  serializedVersion: 13
+  mipmaps:
+    mipMapMode: 0
+    enableMipMap: 0
+    sRGBTexture: 1
+  isReadable: 0
+  textureSettings:
+    serializedVersion: 2
+    filterMode: 1
+    aniso: 1
+    mipBias: 0
+    wrapU: 1
+    wrapV: 1
+    wrapW: 0
+  nPOTScale: 0
+  spriteMode: 1
+  spriteExtrude: 1
+  spriteMeshType: 0
+  alignment: 0
+  spritePivot: {{x: 0.5, y: 0.5}}
+  spritePixelsToUnits: 100
+  spriteBorder: {{x: 0, y: 0, z: 0, w: 0}}
+  alphaUsage: 1
+  alphaIsTransparency: 1
+  textureType: 8
+  textureShape: 1
+  userData: 
+  assetBundleName: 
+  assetBundleVariant: 
+"""
+FOLDER_META = """fileFormatVersion: 2
+guid: {guid}
+folderAsset: yes
+DefaultImporter:
+  externalObjects: {{}}
+  userData: 
+  assetBundleName: 
+  assetBundleVariant: 
+"""
+
+# SamplePreviewGenerator: cameraOffset (1, 1, 1)、fieldOfView 45、
+# 平行光 Quaternion.Euler(45, -45, 0)；GLTFUtility 导入时翻转 X 轴，这里换算回 glTF 空间
+CAMERA_DIRECTION = (-1.0, 1.0, 1.0)
+FIELD_OF_VIEW = 45.0
+LIGHT_DIRECTION = (-0.5, 0.70710678, -0.5)
+
+AMBIENT = 0.35
+KEY_LIGHT = 0.75
+FILL_LIGHT = 0.25
+
+# 采样前把贴图缩小到的最大边长（缩略图不需要 4K 贴图）
+TEXTURE_LIMIT = 1024
+# 每批光栅化的候选像素数上限，控制内存
+CHUNK_PIXELS = 2_000_000
+
+
+def load_texture(glb, material):
+    """读取材质的 baseColor 贴图为 float 数组 (h, w, 4)，没有贴图时返回 None"""
+    info = material.get("pbrMetallicRoughness", {}).get("baseColorTexture")
+    if not info:
+        return None
+    texture = glb.gltf["textures"][info["index"]]
+    if "source" not in texture:
+        return None
+    data = glb.image_bytes(texture["source"])
+    if data is None:
+        return None
+
+    image = Image.open(io.BytesIO(data))
+    image.draft("RGB", (TEXTURE_LIMIT, TEXTURE_LIMIT))
+    image = image.convert("RGBA")
+    if max(image.size) > TEXTURE_LIMIT:
+        image.thumbnail((TEXTURE_LIMIT, TEXTURE_LIMIT), Image.LANCZOS)
+    return np.asarray(image, dtype=np.float32) / 255.0
+
+
+def smooth_normals(positions, triangles):
+    """按位置焊接后计算平滑法线（模型没有法线属性，UV 接缝处不应出现折痕）"""
+    keys = np.round(positions / (np.abs(positions).max() or 1.0) * 1e5).astype(np.int64)
+    _, welded = np.unique(keys, axis=0, return_inverse=True)
+    welded = welded.reshape(-1)
+
+    corners = positions[triangles]
+    face_normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    accumulated = np.zeros((welded.max() + 1, 3))
+    for corner in range(3):
+        np.add.at(accumulated, welded[triangles[:, corner]], face_normals)
+
+    normals = accumulated[welded]
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return normals / np.where(lengths > 0, lengths, 1.0)
+
+
+def collect_geometry(glb):
+    """收集所有网格实例（场景空间），返回 [(位置, 法线, UV, 三角形, 贴图, 颜色系数)]"""
+    gltf = glb.gltf
+    materials = gltf.get("materials", [])
+    textures = {}
+    parts = []
+
+    for mesh_index, world in mesh_instances(gltf):
+        for primitive in gltf["meshes"][mesh_index]["primitives"]:
+            attributes = primitive.get("attributes", {})
+            if "POSITION" not in attributes:
+                continue
+            triangles = primitive_indices(glb, primitive)
+            if not len(triangles):
+                continue
+
+            positions = transform_points(world, accessor_array(glb, attributes["POSITION"]))
+            if "NORMAL" in attributes:
+                normal_matrix = np.linalg.inv(world[:3, :3]).T
+                normals = accessor_array(glb, attributes["NORMAL"]).astype(np.float64) @ normal_matrix.T
+                normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+            else:
+                normals = smooth_normals(positions, triangles)
+
+            uvs = None
+            if "TEXCOORD_0" in attributes:
+                uvs = accessor_array(glb, attributes["TEXCOORD_0"]).astype(np.float64)
+
+            texture = None
+            factor = np.ones(4)
+            material_index = primitive.get("material")
+            if material_index is not None:
+                material = materials[material_index]
+                factor = np.array(material.get("pbrMetallicRoughness", {}).get("baseColorFactor", [1, 1, 1, 1]))
+                if material_index not in textures:
+                    textures[material_index] = load_texture(glb, material)
+                texture = textures[material_index]
+
+            parts.append((positions, normals, uvs, triangles, texture if uvs is not None else None, factor))
+    return parts
+
+
+def look_at(eye, target, up=(0.0, 1.0, 0.0)):
+    """视图矩阵（相机看向 -Z）"""
+    forward = target - eye
+    forward /= np.linalg.norm(forward)
+    right = np.cross(forward, up)
+    right /= np.linalg.norm(right)
+    true_up = np.cross(right, forward)
+
+    view = np.identity(4)
+    view[0, :3] = right
+    view[1, :3] = true_up
+    view[2, :3] = -forward
+    view[:3, 3] = -view[:3, :3] @ eye
+    return view
+
+
+def sample_bilinear(texture, uv):
+    """双线性采样（UV 重复寻址），返回 (n, 4)"""
+    height, width = texture.shape[:2]
+    x = (uv[:, 0] % 1.0) * width - 0.5
+    y = (uv[:, 1] % 1.0) * height - 0.5
+    x0 = np.floor(x).astype(np.int64)
+    y0 = np.floor(y).astype(np.int64)
+    fx = (x - x0)[:, None]
+    fy = (y - y0)[:, None]
+    x0 %= width
+    y0 %= height
+    x1 = (x0 + 1) % width
+    y1 = (y0 + 1) % height
+
+    top = texture[y0, x0] * (1 - fx) + texture[y0, x1] * fx
+    bottom = texture[y1, x0] * (1 - fx) + texture[y1, x1] * fx
+    return top * (1 - fy) + bottom * fy
+
+
+def rasterize(parts, size, margin=1.08):
+    """渲染为 RGBA float 图像 (size, size, 4)"""
+    all_points = np.concatenate([part[0] for part in parts])
+    low, high = all_points.min(axis=0), all_points.max(axis=0)
+    center = (low + high) / 2
+    radius = float(np.linalg.norm(all_points - center, axis=1).max()) or 1.0
+
+    half_fov = np.radians(FIELD_OF_VIEW) / 2
+    distance = radius / np.sin(half_fov) * margin
+    direction = np.array(CAMERA_DIRECTION) / np.linalg.norm(CAMERA_DIRECTION)
+    eye = center + direction * distance
+    view = look_at(eye, center)
+    focal = 1.0 / np.tan(half_fov)
+
+    key_light = np.array(LIGHT_DIRECTION) / np.linalg.norm(LIGHT_DIRECTION)
+
+    color = np.zeros((size * size, 4))
+    depth = np.full(size * size, np.inf)
+
+    for positions, normals, uvs, triangles, texture, factor in parts:
+        camera = transform_points(view, positions)
+        z = -camera[:, 2]
+        screen_x = (camera[:, 0] * focal / z + 1) * 0.5 * size
+        screen_y = (1 - camera[:, 1] * focal / z) * 0.5 * size
+
+        tx = screen_x[triangles]
+        ty = screen_y[triangles]
+        area = (tx[:, 1] - tx[:, 0]) * (ty[:, 2] - ty[:, 0]) - (tx[:, 2] - tx[:, 0]) * (ty[:, 1] - ty[:, 0])
+        x_min = np.clip(np.floor(tx.min(axis=1)), 0, size - 1).astype(np.int64)
+        x_max = np.clip(np.ceil(tx.max(axis=1)), 0, size - 1).astype(np.int64)
+        y_min = np.clip(np.floor(ty.min(axis=1)), 0, size - 1).astype(np.int64)
+        y_max = np.clip(np.ceil(ty.max(axis=1)), 0, size - 1).astype(np.int64)
+        valid = (np.abs(area) > 1e-12) & (z[triangles].min(axis=1) > 0)
+        widths = np.where(valid, x_max - x_min + 1, 0)
+        heights = np.where(valid, y_max - y_min + 1, 0)
+        counts = widths * heights
+
+        # 按候选像素数分批，每批把所有三角形的包围盒像素展开后统一计算重心坐标
+        order = np.flatnonzero(counts)
+        batch_ids = (np.cumsum(counts[order]) - 1) // CHUNK_PIXELS
+        for batch_id in np.unique(batch_ids):
+            batch = order[batch_ids == batch_id]
+            batch_counts = counts[batch]
+            face = np.repeat(batch, batch_counts)
+            offset = np.arange(batch_counts.sum()) - np.repeat(np.cumsum(batch_counts) - batch_counts, batch_counts)
+            px = x_min[face] + offset % widths[face]
+            py = y_min[face] + offset // widths[face]
+            cx = px + 0.5
+            cy = py + 0.5
+
+            fx, fy = tx[face], ty[face]
+            w0 = ((fx[:, 1] - cx) * (fy[:, 2] - cy) - (fx[:, 2] - cx) * (fy[:, 1] - cy)) / area[face]
+            w1 = ((fx[:, 2] - cx) * (fy[:, 0] - cy) - (fx[:, 0] - cx) * (fy[:, 2] - cy)) / area[face]
+            w2 = 1 - w0 - w1
+            inside = (w0 >= 0) & (w1 >= 0) & (w2 >= 0)
+            if not inside.any():
+                continue
+
+            face, px, py = face[inside], px[inside], py[inside]
+            bary = np.stack([w0[inside], w1[inside], w2[inside]], axis=1)
+
+            # 透视校正插值
+            corner_z = z[triangles[face]]
+            weights = bary / corner_z
+            inverse_depth = weights.sum(axis=1)
+            weights /= inverse_depth[:, None]
+            fragment_depth = 1.0 / inverse_depth
+
+            # 同一像素只保留最近的片元，再与已有深度比较
+            pixel = py * size + px
+            nearest = np.lexsort((fragment_depth, pixel))
+            pixel, face, weights, fragment_depth = pixel[nearest], face[nearest], weights[nearest], fragment_depth[nearest]
+            first = np.ones(len(pixel), dtype=bool)
+            first[1:] = pixel[1:] != pixel[:-1]
+            closer = first & (fragment_depth < depth[pixel])
+            pixel, face, weights, fragment_depth = pixel[closer], face[closer], weights[closer], fragment_depth[closer]
+            if not len(pixel):
+                continue
+
+            corners = triangles[face]
+            normal = (normals[corners] * weights[:, :, None]).sum(axis=1)
+            normal /= np.maximum(np.linalg.norm(normal, axis=1, keepdims=True), 1e-12)
+            world_point = (positions[corners] * weights[:, :, None]).sum(axis=1)
+            to_eye = eye - world_point
+            to_eye /= np.linalg.norm(to_eye, axis=1, keepdims=True)
+            # 双面材质：背面法线翻转朝向相机
+            facing = (normal * to_eye).sum(axis=1)
+            normal[facing < 0] *= -1
+
+            lighting = (AMBIENT
+                        + KEY_LIGHT * np.clip(normal @ key_light, 0, None)
+                        + FILL_LIGHT * np.clip((normal * to_eye).sum(axis=1), 0, None))
+
+            if texture is not None:
+                uv = (uvs[corners] * weights[:, :, None]).sum(axis=1)
+                albedo = sample_bilinear(texture, uv) * factor
+            else:
+                albedo = np.tile(factor, (len(pixel), 1))
+
+            shaded = np.empty((len(pixel), 4))
+            shaded[:, :3] = np.clip(albedo[:, :3] * lighting[:, None], 0, 1)
+            shaded[:, 3] = 1.0
+            color[pixel] = shaded
+            depth[pixel] = fragment_depth
+
+    return color.reshape(size, size, 4)
+
+
+def render_model(path, sizes, supersample=2):
+    """渲染模型，返回 {尺寸: PIL 图片}"""
+    parts = collect_geometry(GlbFile.load(path))
+    if not parts:
+        raise ValueError("模型没有可渲染的网格")
+
+    render_size = max(sizes) * supersample
+    pixels = rasterize(parts, render_size)
+    image = Image.fromarray(np.round(pixels * 255).astype(np.uint8), "RGBA")
+
+    # 预乘 alpha 后缩小，避免透明边缘出现黑边
+    premultiplied = image.convert("RGBa")
+    return {size: premultiplied.resize((size, size), Image.LANCZOS).convert("RGBA") for size in sizes}
+
+
+def render_job(path, outputs, supersample):
+    """子进程任务: 渲染并保存各尺寸 PNG"""
+    try:
+        images = render_model(path, sorted(outputs), supersample)
+    except Exception as e:
+        return str(e)
+    for size, target in outputs.items():
+        buffer = io.BytesIO()
+        images[size].save(buffer, "PNG", optimize=True)
+        write_bytes_if_changed(target, buffer.getvalue())
+    return None
+
+
+def thumbnail_name(rel_path):
+    """模型相对 MineralData 的路径 -> 缩略图相对路径（不含扩展名），如 Minerals/quartz_001"""
+    directory, filename = posixpath.split(rel_path)
+    stem, _ = split_stem(filename)
+    if directory.startswith(MODELS_PREFIX):
+        directory = directory[len(MODELS_PREFIX):]
+    elif directory.startswith("..") or directory == "Models":
+        directory = ""
+    return posixpath.join(directory, stem)
+
+
+def write_meta_if_missing(path, template):
+    """在 Assets 内的文件或目录旁写入 Unity .meta；已存在时保留（用户可能在 Unity 中改过导入设置）"""
+    relative = os.path.relpath(path, PROJECT_DIR).replace(os.sep, "/")
+    if not relative.startswith("Assets/") or os.path.exists(path + ".meta"):
+        return
+    guid = hashlib.md5(relative.encode("utf-8")).hexdigest()
+    write_text_if_changed(path + ".meta", template.format(guid=guid))
+
+
+def write_sprite_metas(output_dir, targets):
+    """缩略图 PNG 的 Sprite .meta，以及 output_dir 以下各级目录的 .meta"""
+    directories = {output_dir}
+    for target in targets:
+        write_meta_if_missing(target, SPRITE_META)
+        directory = os.path.dirname(target)
+        while len(directory) > len(output_dir):
+            directories.add(directory)
+            directory = os.path.dirname(directory)
+    for directory in sorted(directories):
+        write_meta_if_missing(directory, FOLDER_META)
+
+
+def load_cache(path):
+    """读取渲染缓存；不存在或损坏时返回空缓存（全部重新渲染）"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"渲染缓存无法读取，忽略: {e}")
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def settings_key(sizes, supersample):
+    """渲染参数指纹，参数变化时缓存失效"""
+    settings = [sorted(sizes), supersample, CAMERA_DIRECTION, FIELD_OF_VIEW, LIGHT_DIRECTION,
+                AMBIENT, KEY_LIGHT, FILL_LIGHT, TEXTURE_LIMIT]
+    return hashlib.sha256(json.dumps(settings).encode()).hexdigest()[:16]
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="离线渲染模型缩略图")
+    parser.add_argument("models", nargs="*", help="要渲染的 GLB 文件（默认 MineralData/Models 下全部）")
+    parser.add_argument("--root", default=MINERAL_DATA_DIR, help="MineralData 目录")
+    parser.add_argument("--output-dir", default=THUMBNAIL_DIR, help="缩略图输出目录")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="图标尺寸")
+    parser.add_argument("--supersample", type=int, default=2, help="超采样倍数（抗锯齿）")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数")
+    parser.add_argument("--force", action="store_true", help="忽略缓存重新渲染")
+    args = parser.parse_args()
+
+    if args.models:
+        models = [(os.path.relpath(path, args.root).replace(os.sep, "/"), path) for path in args.models]
+    else:
+        models = find_models(args.root)
+
+    output_dir = os.path.abspath(args.output_dir)
+    hash_cache = HashCache()
+    cache = {} if args.force else load_cache(THUMBNAIL_CACHE_PATH)
+
+    settings = settings_key(args.sizes, args.supersample)
+    jobs = {}
+    skipped = 0
+    # 已有的缩略图（包括此前没有 .meta 的）也补写 .meta
+    ready_targets = []
+    for rel_path, path in models:
+        name = thumbnail_name(rel_path)
+        outputs = {size: os.path.join(output_dir, str(size), *name.split("/")) + ".png" for size in args.sizes}
+        key = f"{hash_cache.hash_file(path)}:{settings}"
+        if cache.get(rel_path) == key and all(os.path.exists(target) for target in outputs.values()):
+            skipped += 1
+            ready_targets.extend(outputs.values())
+            continue
+        jobs[rel_path] = (path, outputs, key)
+    hash_cache.save()
+
+    print("=" * 80)
+    print(f"模型缩略图渲染 (尺寸 {', '.join(map(str, args.sizes))}，超采样 {args.supersample}x)")
+    print("=" * 80)
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=worker_initializer) as executor:
+        futures = {rel_path: executor.submit(render_job, path, outputs, args.supersample)
+                   for rel_path, (path, outputs, _) in jobs.items()}
+        for rel_path, future in futures.items():
+            error = future.result()
+            if error:
+                print(f"  ✗ {rel_path}: {error}")
+                cache.pop(rel_path, None)
+                failed += 1
+            else:
+                print(f"  ✓ {rel_path}")
+                cache[rel_path] = jobs[rel_path][2]
+                ready_targets.extend(jobs[rel_path][1].values())
+
+    write_json_if_changed(THUMBNAIL_CACHE_PATH, cache)
+    write_sprite_metas(output_dir, ready_targets)
+
+    print(f"\n渲染: {len(jobs) - failed} 个，缓存命中跳过: {skipped} 个，失败: {failed} 个")
+    print(f"输出目录: {output_dir}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+源数据监视
+轮询 Excel、矿物/化石 CSV、数据库手工修订和矿物图片目录，保存后按变化范围增量重建：
+- Excel：比较 zip 中央目录里各部件的 CRC32（不解压），只有文档属性或格式变化时不重建，
+  工作表数据变化时重建数据库和图片，只有内嵌图片/绘图变化时只重新提取图片
+- 化石 CSV：按行比较，只替换化石有变化的地层；未变化的化石条目原样保留，
+  有手工修订的地层使用修订；修改会丢失能加载的图片或模型引用时不写入
+- 其余情况交给 pipeline.py，按内容哈希跳过未变化的阶段
+
+只用 os.stat 轮询（几个文件，开销可忽略），不依赖平台相关的文件系统通知。
+"""
+
+import argparse
+import os
+import posixpath
+import sys
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+
+from add_fossils_to_database import get_layer_name_mapping, layer_fossils, read_fossils_data
+from atomic_output import write_json_if_changed
+from instrumentation import run_main
+from mineral_assets import AssetReferenceError, HashCache, check_database_replacement, scan_asset_tree
+from pipeline import (
+    STAGES,
+    add_path_arguments,
+    load_state,
+    path_digest,
+    paths_from_args,
+    record_stage,
+    resolve,
+    run_pipeline,
+    save_state,
+)
+from records import DatabaseOverrides, load_database_records
+
+POLL_INTERVAL = 0.2
+# 文件大小/修改时间保持不变这么久才认为保存完成（Excel 会分几步写入）
+SETTLE_TIME = 0.2
+
+# 监视的源 -> 变化时需要重建的目标阶段（pipeline 会补上上游并跳过未变化的阶段）
+WATCHED = ("excel", "minerals_csv", "fossils_csv", "overrides", "images_dir")
+EXCEL_DATA_TARGETS = ["add-fossils", "mapping-table"]
+EXCEL_IMAGE_TARGETS = ["mapping-table"]
+MINERALS_CSV_TARGETS = ["add-fossils", "mapping-table"]
+OVERRIDES_TARGETS = ["add-fossils"]
+IMAGES_DIR_TARGETS = ["mapping-table"]
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PACKAGE_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def stat_signature(path):
+    """文件或目录的 (大小, 修改时间) 快照；目录逐个文件记录（忽略 .meta 和隐藏文件）；不存在时返回 None"""
+    if os.path.isfile(path):
+        stat_result = os.stat(path)
+        return stat_result.st_size, stat_result.st_mtime_ns
+    if os.path.isdir(path):
+        signature = set()
+        for rel_dir, filename, entry in scan_asset_tree(path, path):
+            stat_result = entry.stat()
+            signature.add((f"{rel_dir}/{filename}", stat_result.st_size, stat_result.st_mtime_ns))
+        return frozenset(signature)
+    return None
+
+
+def workbook_members(path):
+    """xlsx 各部件 -> (CRC32, 解压后大小)；只读 zip 中央目录"""
+    with zipfile.ZipFile(path) as archive:
+        return {info.filename: (info.CRC, info.file_size) for info in archive.infolist()}
+
+
+def sheet_names(path):
+    """工作表部件路径 -> 工作表名（用于输出信息）"""
+    names = {}
+    try:
+        with zipfile.ZipFile(path) as archive:
+            workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+            relationships = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    except (KeyError, OSError, zipfile.BadZipFile, ET.ParseError):
+        return names
+
+    targets = {}
+    for relationship in relationships.iter(f"{NS_PACKAGE_REL}Relationship"):
+        target = relationship.get("Target", "")
+        target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+        targets[relationship.get("Id")] = target
+    for sheet in workbook.iter(f"{NS_MAIN}sheet"):
+        member = targets.get(sheet.get(f"{NS_REL}id"))
+        if member:
+            names[member] = sheet.get("name")
+    return names
+
+
+def classify_workbook_change(old_members, new_members):
+    """
+    比较两次保存的部件
+    返回 (数据变化的部件, 图片变化的部件, 不影响输出的部件)
+    """
+    data, images, ignored = [], [], []
+    for name in sorted(old_members.keys() | new_members.keys()):
+        if old_members.get(name) == new_members.get(name):
+            continue
+        if name.startswith(("xl/media/", "xl/drawings/", "xl/worksheets/_rels/")):
+            images.append(name)
+        elif (name.startswith("xl/worksheets/") or
+              name in ("xl/sharedStrings.xml", "xl/workbook.xml", "xl/_rels/workbook.xml.rels")):
+            data.append(name)
+        else:
+            # docProps（保存时间）、styles/theme（格式）、calcChain 等
+            ignored.append(name)
+    return data, images, ignored
+
+
+def diff_fossil_layers(old_layers, new_layers):
+    """化石 CSV 中化石列表有变化的地层名"""
+    def names(layers, layer_name):
+        return [fossil.name for fossil in layers.get(layer_name, [])]
+
+    return sorted(layer_name for layer_name in old_layers.keys() | new_layers.keys()
+                  if names(old_layers, layer_name) != names(new_layers, layer_name))
+
+
+def patch_fossil_layers(database, new_layers, changed_layer_names, overrides=None):
+    """
+    只替换变化地层的化石列表（与 add_fossils_to_database 的结果一致，有手工修订的地层使用修订）
+    行未变化的化石沿用数据库中的现有条目；返回实际修改的地层ID
+    """
+    layer_mapping = get_layer_name_mapping()
+    changed_layer_ids = {layer_mapping.get(layer_name) for layer_name in changed_layer_names}
+
+    patched = []
+    for layer in database.layers:
+        if layer.layer_id not in changed_layer_ids:
+            continue
+        fossils = layer_fossils(layer, new_layers, layer_mapping, overrides) or []
+        existing = {fossil.fossil_id: fossil for fossil in layer.fossils or ()}
+        layer.fossils = [existing.get(fossil.fossil_id, fossil) for fossil in fossils]
+        patched.append(layer.layer_id)
+    return patched
+
+
+def try_patch_fossils(paths, new_layers, changed_layer_names):
+    """
+    化石 CSV 是唯一变化时直接修改数据库中受影响的地层，并更新流水线记录
+    数据库在上次运行后被手工修改过、其他输入也变化、或修改会丢失能加载的资源引用时
+    返回 False，交给流水线处理（流水线同样检查资源引用，不会覆盖）
+    """
+    state = load_state()
+    record = state.get("add-fossils")
+    if record is None:
+        return False
+
+    hash_cache = HashCache()
+    try:
+        _, inputs, _ = STAGES["add-fossils"]
+        input_digests = {key: path_digest(resolve(key, paths), hash_cache) for key in inputs}
+        other_inputs_changed = any(record["inputs"].get(key) != digest
+                                   for key, digest in input_digests.items() if key != "fossils_csv")
+        if other_inputs_changed or record["outputs"].get("database") != path_digest(paths["database"], hash_cache):
+            return False
+
+        database = load_database_records(paths["database"])
+        overrides = DatabaseOverrides.load(paths["overrides"])
+        patched = patch_fossil_layers(database, new_layers, changed_layer_names, overrides)
+        result = database.to_dict()
+        try:
+            check_database_replacement(paths["database"], result)
+        except AssetReferenceError as e:
+            print(f"  [跳过] {e}")
+            return False
+        written = write_json_if_changed(paths["database"], result)
+
+        record_stage("add-fossils", paths, state, hash_cache, input_digests)
+        save_state(state)
+    finally:
+        hash_cache.save()
+
+    if written:
+        print(f"  [修改] 数据库地层: {', '.join(patched)}")
+    else:
+        print("  [最新] 数据库无变化")
+    return True
+
+
+class SourceWatcher:
+    """记录各源的上次状态，按变化范围选择重建方式"""
+
+    def __init__(self, paths, jobs=None, verbose=False):
+        self.paths = paths
+        self.jobs = jobs
+        self.verbose = verbose
+        self.signatures = {key: stat_signature(paths[key]) for key in WATCHED}
+        self.members = self.read_members()
+        self.fossil_layers = self.read_fossil_layers()
+
+    def read_members(self):
+        try:
+            return workbook_members(self.paths["excel"])
+        except (OSError, zipfile.BadZipFile):
+            return {}
+
+    def read_fossil_layers(self):
+        try:
+            return read_fossils_data(self.paths["fossils_csv"])
+        except (OSError, UnicodeDecodeError, StopIteration):
+            return {}
+
+    def poll(self):
+        """当前状态与上次重建时不同的源"""
+        current = {key: stat_signature(self.paths[key]) for key in WATCHED}
+        return current, [key for key in WATCHED if current[key] != self.signatures[key]]
+
+    def describe_excel_change(self, members):
+        data, images, ignored = classify_workbook_change(self.members, members)
+        sheets = sheet_names(self.paths["excel"])
+        for name in data:
+            label = f"工作表 {sheets[name]}" if name in sheets else name
+            print(f"  Excel 数据变化: {label}")
+        if images:
+            print(f"  Excel 图片/绘图变化: {len(images)} 个部件")
+        if ignored and not data and not images:
+            print(f"  Excel 只有属性或格式变化（{', '.join(ignored)}），无需重建")
+        return data, images
+
+    def rebuild(self, current, changed):
+        """处理一批变化，返回是否全部成功"""
+        targets = []
+        fossil_change = None
+
+        if "excel" in changed:
+            if current["excel"] is None:
+                print("  Excel 已删除，沿用现有输出")
+            else:
+                members = workbook_members(self.paths["excel"])
+                data, images = self.describe_excel_change(members)
+                self.members = members
+                if data:
+                    targets += EXCEL_DATA_TARGETS
+                elif images:
+                    targets += EXCEL_IMAGE_TARGETS
+
+        if "minerals_csv" in changed:
+            print(f"  矿物 CSV 变化: {os.path.basename(self.paths['minerals_csv'])}")
+            targets += MINERALS_CSV_TARGETS
+
+        if "overrides" in changed:
+            print(f"  数据库手工修订变化: {os.path.basename(self.paths['overrides'])}")
+            targets += OVERRIDES_TARGETS
+
+        if "images_dir" in changed:
+            print("  矿物图片目录变化")
+            targets += IMAGES_DIR_TARGETS
+
+        if "fossils_csv" in changed:
+            new_layers = self.read_fossil_layers()
+            changed_layer_names = diff_fossil_layers(self.fossil_layers, new_layers)
+            for layer_name in changed_layer_names:
+                print(f"  化石 CSV 变化: {layer_name}")
+            if not changed_layer_names:
+                print("  化石 CSV 内容无变化")
+            fossil_change = (new_layers, changed_layer_names)
+
+        success = True
+        if fossil_change is not None:
+            new_layers, changed_layer_names = fossil_change
+            self.fossil_layers = new_layers
+            if "add-fossils" not in targets and not try_patch_fossils(self.paths, new_layers, changed_layer_names):
+                targets.append("add-fossils")
+
+        if targets:
+            results = run_pipeline(self.paths, list(dict.fromkeys(targets)), jobs=self.jobs, verbose=self.verbose)
+            success = not any(status in ("fail", "blocked") for status, _, _ in results.values())
+        return success
+
+    def run(self, interval=POLL_INTERVAL, settle=SETTLE_TIME):
+        """轮询直到 Ctrl+C"""
+        latest = None
+        latest_at = 0.0
+        while True:
+            time.sleep(interval)
+            current, changed = self.poll()
+            if not changed:
+                latest = None
+                continue
+            # 等待保存完成：状态持续 settle 秒不变再处理
+            if current != latest:
+                latest, latest_at = current, time.time()
+                continue
+            if time.time() - latest_at < settle:
+                continue
+
+            started = time.time()
+            print(f"\n[{time.strftime('%H:%M:%S')}] 检测到变化: {', '.join(changed)}", flush=True)
+            try:
+                success = self.rebuild(current, changed)
+            except (OSError, zipfile.BadZipFile) as e:
+                # 文件仍在写入（例如 Excel 先截断再写入），下次轮询重试
+                print(f"  读取失败，稍后重试: {e}")
+                latest = None
+                continue
+
+            self.signatures = current
+            # 重建写入的输出（矿物 CSV、图片目录）不应再次触发重建
+            for key in ("minerals_csv", "images_dir"):
+                self.signatures[key] = stat_signature(self.paths[key])
+            mark = "✅" if success else "❌"
+            print(f"{mark} 用时 {time.time() - started:.2f}s，继续监视...", flush=True)
+            latest = None
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="监视源数据，保存后增量重建数据库和图片")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="轮询间隔（秒）")
+    parser.add_argument("--settle", type=float, default=SETTLE_TIME, help="文件保持不变多久后开始重建（秒）")
+    parser.add_argument("--jobs", type=int, default=None, help="流水线并行进程数")
+    parser.add_argument("--verbose", action="store_true", help="显示各阶段脚本的完整输出")
+    add_path_arguments(parser)
+    args = parser.parse_args()
+
+    paths = paths_from_args(args)
+
+    print("=" * 80)
+    print("源数据监视（Ctrl+C 退出）")
+    print("=" * 80)
+    for key in WATCHED:
+        mark = "✓" if os.path.exists(paths[key]) else "✗"
+        print(f"  {mark} {os.path.relpath(paths[key])}")
+
+    # 先把输出更新到与当前源一致，之后只处理新的变化
+    print("\n初始检查:")
+    watcher = SourceWatcher(paths, args.jobs, args.verbose)
+    run_pipeline(paths, jobs=args.jobs, verbose=args.verbose)
+    watcher.signatures = {key: stat_signature(paths[key]) for key in WATCHED}
+
+    try:
+        watcher.run(args.interval, args.settle)
+    except KeyboardInterrupt:
+        print("\n已停止监视")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_main(main))
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel 解析结果缓存
+xlsx 是 zip 包，中央目录里记录了每个部件的 CRC32 和大小。各部件的解析结果（共享字符串、
+工作表行、关系、图片锚点）按 (部件名, CRC32, 大小, 解析函数) 存为 pickle，
+工作簿未变化时只读中央目录，不解压、不解析 XML。不同副本里内容相同的部件共用缓存。
+缓存目录有总大小上限，超出时淘汰最久未使用的条目。
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import xml.etree.ElementTree as ET
+import zipfile
+
+from atomic_output import write_bytes_if_changed, write_text_if_changed
+from instrumentation import count
+from mineral_assets import CACHE_DIR
+
+# 解析函数的输出格式变化时递增，旧缓存自动失效
+CACHE_VERSION = 1
+WORKBOOK_CACHE_DIR = os.path.join(CACHE_DIR, "workbook")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+SHARED_STRINGS_MEMBER = "xl/sharedStrings.xml"
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_PACKAGE_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+NS_XDR = "{http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing}"
+NS_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+NS_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+
+def parse_shared_strings(data):
+    """sharedStrings.xml -> 字符串列表（每项取第一个文本节点，与 convert_excel_to_csv 一致）"""
+    strings = []
+    for si in ET.fromstring(data).iter(f"{NS_MAIN}si"):
+        t = si.find(f".//{NS_MAIN}t")
+        strings.append((t.text or "") if t is not None else "")
+    return strings
+
+
+def column_index(cell_ref):
+    """单元格引用 (如 AB12) -> 0 起的列号"""
+    index = 0
+    for char in cell_ref:
+        if char.isalpha():
+            index = index * 26 + (ord(char) - ord('A') + 1)
+    return index - 1
+
+
+def parse_sheet_rows(data):
+    """
+    工作表 XML -> 行列表（按单元格引用补齐空列，跳过没有单元格的行）
+    共享字符串单元格保存为 int 索引，由 sheet_rows 解析，使缓存只依赖这一个部件
+    """
+    rows = []
+    for row in ET.fromstring(data).iter(f"{NS_MAIN}row"):
+        values = []
+        for cell in row.iter(f"{NS_MAIN}c"):
+            cell_ref = cell.get('r')
+            if cell_ref:
+                target = column_index(cell_ref)
+                while len(values) < target:
+                    values.append("")
+
+            v = cell.find(f".//{NS_MAIN}v")
+            if v is None:
+                values.append("")
+            elif cell.get('t') == 's':
+                values.append(int(v.text))
+            else:
+                values.append(v.text or "")
+        if values:
+            rows.append(values)
+    return rows
+
+
+def parse_relationships(data):
+    """*.rels -> {关系ID: (类型, 目标)}"""
+    return {relationship.get('Id'): (relationship.get('Type'), relationship.get('Target'))
+            for relationship in ET.fromstring(data).iter(f"{NS_PACKAGE_REL}Relationship")}
+
+
+def parse_drawing_anchors(data):
+    """
+    drawingN.xml -> 图片锚点列表 [(起始行, 起始列, 图片关系ID)]，行列从 0 开始
+    只包含 twoCellAnchor 中带图片的锚点；blipFill 在 Excel 中属于 xdr 命名空间，直接查找其中的 a:blip
+    """
+    anchors = []
+    for anchor in ET.fromstring(data).iter(f"{NS_XDR}twoCellAnchor"):
+        from_cell = anchor.find(f"{NS_XDR}from")
+        if from_cell is None:
+            continue
+        col = from_cell.find(f"{NS_XDR}col")
+        row = from_cell.find(f"{NS_XDR}row")
+        blip = anchor.find(f".//{NS_XDR}pic//{NS_A}blip")
+        if col is None or row is None or blip is None:
+            continue
+        anchors.append((int(row.text), int(col.text), blip.get(f"{NS_R}embed")))
+    return anchors
+
+
+def parse_drawing_references(data):
+    """
+    工作表 -> (是否含图片引用, [(绘图元素标签, 属性)])
+    XML 解析失败时元素列表为 None
+    """
+    content = data.decode('utf-8')
+    if '<drawing' not in content and 'image' not in content.lower():
+        return False, []
+    try:
+        root = ET.fromstring(content)
+    except ET.ParseError:
+        return True, None
+    return True, [(elem.tag, dict(elem.attrib)) for elem in root.iter() if 'drawing' in elem.tag.lower()]
+
+
+class WorkbookCache:
+    """磁盘上的解析结果缓存；索引记录每个条目的大小和最近使用序号"""
+
+    def __init__(self, cache_dir=WORKBOOK_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.max_bytes = max_bytes
+        self.memory = {}
+        self.index = self.read_index()
+        self.clock = max((used for _, used in self.index.values()), default=0)
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def read_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def entry_key(member, info, parser):
+        parser_id = f"{parser.__module__}.{parser.__qualname__}"
+        raw = f"{CACHE_VERSION}\0{parser_id}\0{member}\0{info.CRC}\0{info.file_size}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key + ".pickle")
+
+    def touch(self, key, size):
+        self.clock += 1
+        self.index[key] = [size, self.clock]
+        self.dirty = True
+
+    def load(self, key):
+        """读取缓存条目，不存在或损坏时返回 (False, None)"""
+        if key in self.memory:
+            return True, self.memory[key]
+        if key not in self.index:
+            return False, None
+        try:
+            with open(self.entry_path(key), 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            del self.index[key]
+            self.dirty = True
+            return False, None
+        self.memory[key] = value
+        return True, value
+
+    def get_or_parse(self, member, info, parser, read):
+        """命中时返回缓存结果，否则调用 read() 读取部件并解析"""
+        key = self.entry_key(member, info, parser)
+        found, value = self.load(key)
+        if found:
+            self.hits += 1
+            count("workbook_cache_hits")
+            self.touch(key, self.index.get(key, [0])[0])
+            return value
+
+        self.misses += 1
+        count("workbook_cache_misses")
+        value = parser(read())
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        write_bytes_if_changed(self.entry_path(key), data)
+        self.memory[key] = value
+        self.touch(key, len(data))
+        return value
+
+    def evict(self):
+        """总大小超过上限时按最近使用顺序淘汰，返回淘汰的条目数"""
+        total = sum(size for size, _ in self.index.values())
+        evicted = 0
+        for key, (size, _) in sorted(self.index.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self.entry_path(key))
+            except OSError:
+                pass
+            del self.index[key]
+            self.memory.pop(key, None)
+            total -= size
+            evicted += 1
+        if evicted:
+            self.dirty = True
+        return evicted
+
+    def save(self):
+        """
+        淘汰超出上限的条目并写回索引
+        多个进程（batch_convert 的工作进程）共用缓存目录时，先合并其他进程在此期间写入的条目
+        """
+        if self.dirty:
+            for key, (size, used) in self.read_index().items():
+                if key in self.index:
+                    self.index[key][1] = max(self.index[key][1], used)
+                elif os.path.exists(self.entry_path(key)):
+                    self.index[key] = [size, used]
+        self.evict()
+        if not self.dirty:
+            return
+        write_text_if_changed(self.index_path, json.dumps(self.index, sort_keys=True))
+        self.dirty = False
+
+    def summary(self):
+        return f"工作簿缓存: 命中 {self.hits}，解析 {self.misses}"
+
+
+class Workbook:
+    """
+    带缓存的 xlsx 读取
+    with open_workbook(path) as book:
+        rows = book.sheet_rows("xl/worksheets/sheet1.xml")
+    """
+
+    def __init__(self, path, cache=None):
+        self.path = path
+        self.cache = cache if cache is not None else WorkbookCache()
+        self.archive = zipfile.ZipFile(path)
+        self.members = {info.filename: info for info in self.archive.infolist()}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        self.archive.close()
+        self.cache.save()
+
+    def read(self, member):
+        return self.archive.read(member)
+
+    def parse(self, member, parser):
+        """用 parser(部件内容) 解析部件，结果按部件 CRC 缓存；部件不存在时抛出 KeyError"""
+        info = self.members[member]
+        return self.cache.get_or_parse(member, info, parser, lambda: self.archive.read(member))
+
+    def shared_strings(self):
+        if SHARED_STRINGS_MEMBER not in self.members:
+            return []
+        return self.parse(SHARED_STRINGS_MEMBER, parse_shared_strings)
+
+    def sheet_rows(self, member):
+        """工作表行，共享字符串已解析为文本（索引越界时为空字符串）"""
+        strings = self.shared_strings()
+        rows = []
+        for raw in self.parse(member, parse_sheet_rows):
+            rows.append([(strings[value] if value < len(strings) else "") if isinstance(value, int) else value
+                         for value in raw])
+        return rows
+
+    def relationships(self, member):
+        return self.parse(member, parse_relationships)
+
+    def drawing_anchors(self, member):
+        return self.parse(member, parse_drawing_anchors)
+
+
+def open_workbook(path, cache=None):
+    """打开工作簿；退出 with 时写回缓存索引"""
+    return Workbook(path, cache)
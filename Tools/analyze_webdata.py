@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebGL 数据包（GeoBuild1.data）分析工具
+流式解压 .data/.data.gz/.data.br，解析 UnityWebData1.0 容器的文件表，
+列出每个内嵌文件的原始大小和在压缩包中所占的字节数，按来源分组汇总，
+并可与另一次构建（或之前保存的 JSON 报告）对比，找出下载体积变化的来源。
+
+各文件的压缩贡献都是估算值（合计等于实际压缩大小）：
+gzip 输入按解压过程分摊，每段压缩数据按它解出的字节落在哪些文件里按比例分配，
+跨文件边界的数据段和依赖前文的回溯引用使单个文件的值与单独压缩它的大小不同。
+Brotli 解码器按元块延迟输出，无法这样分摊，改为对每个文件的数据做 deflate 同步刷新
+得到相对占比，再按 .br 实际大小缩放；未压缩的 .data 直接给出 deflate-9 估算值。
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import zlib
+
+from precompress_build import BUILD_DIR, is_lfs_pointer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_DATA = os.path.join(BUILD_DIR, "GeoBuild1.data.gz")
+
+WEBDATA_MAGIC = b"UnityWebData1.0\0"
+HEADER_SEGMENT = "<文件表>"
+# 每次喂给解压器的压缩数据量和每次最多解出的数据量，越小分摊越精确
+COMPRESSED_CHUNK = 16 * 1024
+OUTPUT_CHUNK = 64 * 1024
+
+# (路径正则, 分组名)，按顺序匹配第一个
+ORIGIN_GROUPS = [
+    (r"^Resources/unity_", "引擎内置资源"),
+    (r"^resources\.assets\.resS$", "Resources 流式数据（纹理像素、网格顶点）"),
+    (r"^resources\.(assets|resource)$", "Resources 对象（矿物/化石模型、图片、数据库）"),
+    (r"^data\.unity3d$", "资源包 data.unity3d"),
+    (r"^(level\d+|sharedassets\d+\.)", "场景"),
+    (r"^globalgamemanagers", "全局设置"),
+    (r"^StreamingAssets/", "StreamingAssets"),
+    (r"^Il2CppData/", "IL2CPP 元数据"),
+    (r"(^boot\.config|\.json)$", "启动配置"),
+]
+OTHER_GROUP = "其他"
+
+
+class WebDataError(ValueError):
+    """不是 UnityWebData 容器或文件表损坏"""
+
+
+def detect_codec(path):
+    """按文件头判断压缩格式"""
+    with open(path, 'rb') as f:
+        head = f.read(len(WEBDATA_MAGIC))
+    if head.startswith(b"\x1f\x8b"):
+        return "gzip"
+    if head == WEBDATA_MAGIC:
+        return None
+    if brotli is None:
+        raise WebDataError("看起来是 Brotli 压缩，但未安装 brotli 模块（pip install brotli）")
+    return "brotli"
+
+
+def iter_stream(path, codec):
+    """
+    流式解压，逐块返回 (压缩字节数, 解压数据)
+    Brotli 和未压缩输入的压缩字节数为 None，由调用方估算
+    """
+    with open(path, 'rb') as f:
+        if codec == "gzip":
+            decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            for block in iter(lambda: f.read(COMPRESSED_CHUNK), b''):
+                # 限制每次解出的数据量，用 unconsumed_tail 得到这段输出实际消耗的压缩字节
+                while block:
+                    data = decompressor.decompress(block, OUTPUT_CHUNK)
+                    rest = decompressor.unconsumed_tail
+                    if decompressor.eof:
+                        # 多成员 gzip：上一个成员结束后继续解下一个
+                        rest = decompressor.unused_data
+                        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+                    yield len(block) - len(rest), data
+                    block = rest
+        elif codec == "brotli":
+            decompressor = brotli.Decompressor()
+            for block in iter(lambda: f.read(COMPRESSED_CHUNK), b''):
+                yield None, decompressor.process(block)
+        else:
+            for block in iter(lambda: f.read(COMPRESSED_CHUNK), b''):
+                yield None, block
+
+
+def parse_file_table(header):
+    """
+    解析容器头（与 GeoBuild1.loader.js 的解析规则一致）
+    返回 (头部大小, [(路径, 偏移, 大小)])；数据不足时返回 None
+    """
+    prefix = len(WEBDATA_MAGIC) + 4
+    if len(header) < prefix:
+        return None
+    magic = header[:len(WEBDATA_MAGIC)]
+    if magic != WEBDATA_MAGIC:
+        raise WebDataError(f"未知的数据格式: {magic!r}")
+    header_size, = struct.unpack_from("<I", header, len(WEBDATA_MAGIC))
+    if len(header) < header_size:
+        return None
+
+    entries = []
+    pos = prefix
+    while pos < header_size:
+        if pos + 12 > header_size:
+            raise WebDataError(f"文件表被截断 (pos={pos}, headerSize={header_size})")
+        offset, size, name_length = struct.unpack_from("<III", header, pos)
+        pos += 12
+        name = header[pos:pos + name_length].decode('utf-8')
+        pos += name_length
+        entries.append((name, offset, size))
+    return header_size, entries
+
+
+def safe_extract_path(root, name):
+    """解包目标路径，拒绝绝对路径和 .. 越界"""
+    target = os.path.normpath(os.path.join(root, name))
+    if os.path.isabs(name) or not target.startswith(os.path.normpath(root) + os.sep):
+        raise WebDataError(f"文件名越界: {name}")
+    return target
+
+
+class _Segment:
+    __slots__ = ("path", "offset", "size", "compressed", "hasher", "target")
+
+    def __init__(self, path, offset, size, target=None):
+        self.path = path
+        self.offset = offset
+        self.size = size
+        self.compressed = 0.0
+        self.hasher = hashlib.sha256()
+        self.target = target
+
+    @property
+    def end(self):
+        return self.offset + self.size
+
+
+def classify(path, rules):
+    """按规则给文件分组"""
+    for pattern, group in rules:
+        if re.search(pattern, path):
+            return group
+    return OTHER_GROUP
+
+
+def analyze(path, rules=ORIGIN_GROUPS, extract_dir=None, progress=True):
+    """分析数据包，返回报告字典"""
+    codec = detect_codec(path)
+
+    pending = []
+    header = b''
+    segments = None
+    cursor = 0
+    pos = 0
+    raw_size = 0
+    output = None
+    output_segment = None
+    last_percent = -1
+    # 没有可测量的压缩字节时，每段数据用 deflate 同步刷新估算
+    estimator = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+    def estimate(piece):
+        return len(estimator.compress(piece) + estimator.flush(zlib.Z_SYNC_FLUSH))
+
+    def distribute(compressed, data):
+        nonlocal cursor, pos, output, output_segment
+        start = pos
+        end = start + len(data)
+        if not data:
+            segment = segments[cursor] if cursor < len(segments) else segments[-1]
+            segment.compressed += compressed
+            return
+        while cursor < len(segments) and segments[cursor].end <= start:
+            cursor += 1
+        covered = 0
+        index = cursor
+        while index < len(segments) and segments[index].offset < end:
+            segment = segments[index]
+            low = max(segment.offset, start)
+            high = min(segment.end, end)
+            if high > low:
+                piece = data[low - start:high - start]
+                if compressed is None:
+                    segment.compressed += estimate(piece)
+                else:
+                    segment.compressed += compressed * (high - low) / len(data)
+                segment.hasher.update(piece)
+                covered += high - low
+                if segment.target:
+                    if output_segment is not segment:
+                        if output:
+                            output.close()
+                        os.makedirs(os.path.dirname(segment.target), exist_ok=True)
+                        output = open(segment.target, 'wb')
+                        output_segment = segment
+                    output.write(piece)
+            index += 1
+        # 文件之间的空隙和文件表记到头部
+        if covered < len(data) and compressed is not None:
+            segments[0].compressed += compressed * (len(data) - covered) / len(data)
+        pos = end
+
+    try:
+        for compressed, data in iter_stream(path, codec):
+            if segments is None:
+                header += data
+                pending.append((compressed, data))
+                table = parse_file_table(header)
+                if table is None:
+                    continue
+                header_size, entries = table
+                segments = [_Segment(HEADER_SEGMENT, 0, header_size)]
+                for name, offset, size in sorted(entries, key=lambda entry: entry[1]):
+                    target = safe_extract_path(extract_dir, name) if extract_dir else None
+                    segments.append(_Segment(name, offset, size, target))
+                raw_size = max(segment.end for segment in segments)
+                for item in pending:
+                    distribute(*item)
+                header = pending = None
+            else:
+                distribute(compressed, data)
+
+            if progress and raw_size:
+                percent = pos * 100 // raw_size
+                if percent != last_percent and percent % 5 == 0:
+                    print(f"\r  解压中... {percent}%", end="", flush=True)
+                    last_percent = percent
+    finally:
+        if output:
+            output.close()
+    if progress:
+        print("\r" + " " * 40 + "\r", end="")
+
+    if segments is None:
+        raise WebDataError("文件过短，没有完整的容器头")
+    if pos < raw_size:
+        raise WebDataError(f"数据被截断: 解压得到 {pos} 字节，文件表需要 {raw_size} 字节")
+
+    # 空文件没有数据经过 distribute，解包时单独创建
+    for segment in segments:
+        if segment.target and segment.size == 0:
+            os.makedirs(os.path.dirname(segment.target), exist_ok=True)
+            open(segment.target, 'wb').close()
+
+    if codec != "gzip":
+        segments[-1].compressed += len(estimator.flush())
+    compressed_total = sum(segment.compressed for segment in segments)
+    if codec == "brotli" and compressed_total:
+        # deflate 估算只给出相对占比，按 .br 实际大小缩放
+        scale = os.path.getsize(path) / compressed_total
+        for segment in segments:
+            segment.compressed *= scale
+        compressed_total = os.path.getsize(path)
+
+    files = []
+    for segment in segments:
+        files.append({
+            "path": segment.path,
+            "group": HEADER_SEGMENT if segment.path == HEADER_SEGMENT else classify(segment.path, rules),
+            "offset": segment.offset,
+            "size": segment.size,
+            "compressed": int(round(segment.compressed)),
+            "sha256": segment.hasher.hexdigest(),
+        })
+
+    return {
+        "source": os.path.basename(path),
+        "codec": {"gzip": "gzip（按解压输出比例分摊）", "brotli": "brotli（占比按 deflate 估算）"}.get(codec, "未压缩（deflate-9 估算）"),
+        "compressedBytes": int(round(compressed_total)),
+        "rawBytes": raw_size,
+        "files": files,
+        "groups": summarize_groups(files),
+    }
+
+
+def summarize_groups(files):
+    """按分组汇总文件数、原始大小和压缩贡献"""
+    groups = {}
+    for entry in files:
+        group = groups.setdefault(entry["group"], {"files": 0, "size": 0, "compressed": 0})
+        group["files"] += 1
+        group["size"] += entry["size"]
+        group["compressed"] += entry["compressed"]
+    return dict(sorted(groups.items(), key=lambda item: -item[1]["compressed"]))
+
+
+def load_report(path, rules, progress=True):
+    """读取构建数据包或之前保存的 JSON 报告"""
+    if path.lower().endswith(".json"):
+        with open(path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        # 旧报告按当前规则重新分组，两边口径一致
+        for entry in report["files"]:
+            if entry["path"] != HEADER_SEGMENT:
+                entry["group"] = classify(entry["path"], rules)
+        report["groups"] = summarize_groups(report["files"])
+        return report
+    if is_lfs_pointer(path):
+        raise WebDataError(f"{path} 是未拉取的 Git LFS 指针（先执行 git lfs pull）")
+    return analyze(path, rules, progress=progress)
+
+
+def format_size(value, signed=False):
+    """KB/MB 显示"""
+    sign = "+" if signed and value > 0 else ""
+    if abs(value) >= 1024 * 1024:
+        return f"{sign}{value / 1024 / 1024:.2f} MB"
+    return f"{sign}{value / 1024:.1f} KB"
+
+
+def print_report(report, top):
+    """打印文件和分组列表"""
+    compressed_total = report["compressedBytes"] or 1
+    print(f"数据包: {report['source']} ({report['codec']})")
+    print(f"文件数: {len(report['files']) - 1}，原始 {format_size(report['rawBytes'])}，"
+          f"压缩 {format_size(report['compressedBytes'])}")
+    print("压缩贡献为估算值，只用于比较各文件的相对占比")
+
+    files = sorted(report["files"], key=lambda entry: -entry["compressed"])
+    print(f"\n{'文件':56} {'原始':>12} {'压缩贡献':>12} {'压缩率':>7} {'占比':>7}")
+    print("-" * 98)
+    for entry in files[:top]:
+        ratio = entry["compressed"] / entry["size"] * 100 if entry["size"] else 0
+        share = entry["compressed"] / compressed_total * 100
+        print(f"{entry['path'][:56]:56} {format_size(entry['size']):>12} {format_size(entry['compressed']):>12} "
+              f"{ratio:6.1f}% {share:6.1f}%")
+    if len(files) > top:
+        print(f"... 另有 {len(files) - top} 个文件（--top 调整）")
+
+    print(f"\n{'分组':56} {'文件数':>6} {'原始':>12} {'压缩贡献':>12} {'占比':>7}")
+    print("-" * 98)
+    for name, group in report["groups"].items():
+        share = group["compressed"] / compressed_total * 100
+        print(f"{name[:56]:56} {group['files']:6d} {format_size(group['size']):>12} "
+              f"{format_size(group['compressed']):>12} {share:6.1f}%")
+
+
+def diff_reports(old, new):
+    """按文件路径对比两次构建，返回变化列表（按压缩贡献变化量排序）"""
+    old_files = {entry["path"]: entry for entry in old["files"]}
+    new_files = {entry["path"]: entry for entry in new["files"]}
+    changes = []
+    for path in sorted(old_files.keys() | new_files.keys()):
+        before = old_files.get(path)
+        after = new_files.get(path)
+        if before and after and before["sha256"] == after["sha256"]:
+            continue
+        status = "新增" if before is None else "删除" if after is None else "修改"
+        changes.append({
+            "path": path,
+            "status": status,
+            "group": (after or before)["group"],
+            "sizeDelta": (after["size"] if after else 0) - (before["size"] if before else 0),
+            "compressedDelta": (after["compressed"] if after else 0) - (before["compressed"] if before else 0),
+        })
+    changes.sort(key=lambda change: -abs(change["compressedDelta"]))
+    return changes
+
+
+def print_diff(old, new, changes, top):
+    """打印对比结果"""
+    delta = new["compressedBytes"] - old["compressedBytes"]
+    print(f"旧: {old['source']}  压缩 {format_size(old['compressedBytes'])}，原始 {format_size(old['rawBytes'])}")
+    print(f"新: {new['source']}  压缩 {format_size(new['compressedBytes'])}，原始 {format_size(new['rawBytes'])}")
+    print(f"下载体积变化: {format_size(delta, signed=True)}")
+
+    if not changes:
+        print("\n内嵌文件内容没有变化")
+        return
+
+    print(f"\n{'文件':56} {'状态':4} {'原始变化':>12} {'压缩变化':>12}")
+    print("-" * 90)
+    for change in changes[:top]:
+        print(f"{change['path'][:56]:56} {change['status']:4} {format_size(change['sizeDelta'], True):>12} "
+              f"{format_size(change['compressedDelta'], True):>12}")
+    if len(changes) > top:
+        print(f"... 另有 {len(changes) - top} 个文件变化（--top 调整）")
+
+    print(f"\n{'分组':56} {'原始变化':>12} {'压缩变化':>12}")
+    print("-" * 82)
+    for name in sorted(old["groups"].keys() | new["groups"].keys()):
+        before = old["groups"].get(name, {"size": 0, "compressed": 0})
+        after = new["groups"].get(name, {"size": 0, "compressed": 0})
+        size_delta = after["size"] - before["size"]
+        compressed_delta = after["compressed"] - before["compressed"]
+        if size_delta or compressed_delta:
+            print(f"{name[:56]:56} {format_size(size_delta, True):>12} {format_size(compressed_delta, True):>12}")
+
+
+def parse_group_rule(text):
+    """--group 参数: 正则=分组名"""
+    pattern, separator, name = text.partition("=")
+    if not separator or not name:
+        raise argparse.ArgumentTypeError(f"格式应为 正则=分组名: {text}")
+    try:
+        re.compile(pattern)
+    except re.error as e:
+        raise argparse.ArgumentTypeError(f"无效的正则 {pattern}: {e}")
+    return pattern, name
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="分析 WebGL 数据包中各内嵌文件对下载体积的贡献")
+    parser.add_argument("data", nargs="?", default=DEFAULT_DATA, help="数据包路径（.data/.data.gz/.data.br 或 JSON 报告）")
+    parser.add_argument("--diff", metavar="OLD", help="与旧构建（数据包或 JSON 报告）对比")
+    parser.add_argument("--json", metavar="PATH", help="保存 JSON 报告，供以后 --diff 使用")
+    parser.add_argument("--extract", metavar="DIR", help="把内嵌文件解包到目录")
+    parser.add_argument("--group", action="append", type=parse_group_rule, default=[],
+                        metavar="REGEX=NAME", help="追加分组规则（优先于内置规则，可重复）")
+    parser.add_argument("--top", type=int, default=30, help="列出的文件数")
+    args = parser.parse_args()
+
+    rules = args.group + ORIGIN_GROUPS
+
+    print("=" * 98)
+    print("WebGL 数据包分析")
+    print("=" * 98)
+
+    try:
+        if args.extract:
+            if args.data.lower().endswith(".json"):
+                print("--extract 需要数据包而不是 JSON 报告", file=sys.stderr)
+                return 2
+            if is_lfs_pointer(args.data):
+                raise WebDataError(f"{args.data} 是未拉取的 Git LFS 指针（先执行 git lfs pull）")
+            report = analyze(args.data, rules, extract_dir=os.path.abspath(args.extract))
+        else:
+            report = load_report(args.data, rules)
+        old = load_report(args.diff, rules) if args.diff else None
+    except (OSError, WebDataError, zlib.error) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    if old:
+        print_diff(old, report, diff_reports(old, report), args.top)
+    else:
+        print_report(report, args.top)
+
+    if args.extract:
+        print(f"\n✅ 已解包到: {args.extract}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"✅ 报告已保存: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebGL 构建产物预压缩工具
+把 Build/ 下的 .data/.wasm/.framework.js（原始文件或 Unity 输出的 .gz/.br）解压后
+重新编码为最高等级的 Brotli 和 gzip-9，流式处理（.data 很大，不整体读入内存），
+解压回原数据校验一致后才替换输出，并打印各产物的大小对比表。
+gzip 输出带 Unity 加载器识别的 "UnityWeb Compressed Content (gzip)" 注释标记。
+Brotli 为可选依赖: pip install brotli
+"""
+
+import argparse
+import gzip
+import hashlib
+import os
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUILD_DIR = os.path.join(PROJECT_DIR, "Build")
+
+ARTIFACT_SUFFIXES = (".data", ".wasm", ".framework.js", ".symbols.json")
+CODEC_EXTENSIONS = {"gzip": ".gz", "brotli": ".br"}
+CHUNK_SIZE = 4 * 1024 * 1024
+
+GZIP_MARKER = b"UnityWeb Compressed Content (gzip)"
+LFS_POINTER_PREFIX = b"version https://git-lfs.github.com/spec/v1"
+
+
+class SourceError(ValueError):
+    """来源文件被截断或不是有效的压缩数据"""
+
+
+def is_lfs_pointer(path):
+    """文件是否是未拉取的 Git LFS 指针"""
+    if os.path.getsize(path) > 1024:
+        return False
+    with open(path, 'rb') as f:
+        return f.read(len(LFS_POINTER_PREFIX)) == LFS_POINTER_PREFIX
+
+
+def find_artifacts(build_dir):
+    """
+    按产物名分组可用的来源文件
+    返回 {产物名: (来源路径, 来源编码)}，优先原始文件，其次 .br、.gz
+    """
+    candidates = {}
+    for filename in sorted(os.listdir(build_dir)):
+        path = os.path.join(build_dir, filename)
+        if not os.path.isfile(path):
+            continue
+        codec = None
+        name = filename
+        for candidate, extension in CODEC_EXTENSIONS.items():
+            if filename.endswith(extension):
+                codec = candidate
+                name = filename[:-len(extension)]
+        if not name.endswith(ARTIFACT_SUFFIXES):
+            continue
+        candidates.setdefault(name, []).append((path, codec))
+
+    preference = {None: 0, "brotli": 1, "gzip": 2}
+    artifacts = {}
+    for name, sources in candidates.items():
+        sources.sort(key=lambda source: preference[source[1]])
+        artifacts[name] = sources
+    return artifacts
+
+
+def read_source(path, codec):
+    """流式读取来源文件的原始数据"""
+    if codec == "gzip":
+        with gzip.open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                yield chunk
+    elif codec == "brotli":
+        decompressor = brotli.Decompressor()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                data = decompressor.process(chunk)
+                if data:
+                    yield data
+        # 截断的 .br 前面部分照样能解出数据，只有流没有结束标记
+        if not decompressor.is_finished():
+            raise SourceError(f"Brotli 数据不完整: {path}")
+    else:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                yield chunk
+
+
+class GzipWriter:
+    """带 FCOMMENT 标记的 gzip 流（标准库 gzip 不支持写注释）"""
+
+    def __init__(self, f, level=9):
+        self.f = f
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, 9)
+        self.crc = 0
+        self.size = 0
+        # 魔数、deflate、FCOMMENT 标志、mtime=0、XFL=2（最高压缩）、OS=255（未知）
+        f.write(b"\x1f\x8b\x08\x10" + struct.pack("<I", 0) + b"\x02\xff" + GZIP_MARKER + b"\0")
+
+    def write(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        self.f.write(self.compressor.compress(data))
+
+    def close(self):
+        self.f.write(self.compressor.flush())
+        self.f.write(struct.pack("<II", self.crc & 0xFFFFFFFF, self.size & 0xFFFFFFFF))
+
+
+class BrotliWriter:
+    """Brotli 流"""
+
+    def __init__(self, f, quality=11, text=False):
+        self.f = f
+        mode = brotli.MODE_TEXT if text else brotli.MODE_GENERIC
+        self.compressor = brotli.Compressor(mode=mode, quality=quality, lgwin=24)
+
+    def write(self, data):
+        self.f.write(self.compressor.process(data))
+
+    def close(self):
+        self.f.write(self.compressor.finish())
+
+
+def encode_artifact(name, source, codec, output_path, level):
+    """
+    编码单个产物（在子进程中运行）
+    先写临时文件，解压校验与原始数据哈希一致后再替换目标文件；出错时删除临时文件
+    """
+    source_path, source_codec = source
+    started = time.time()
+    raw_hash = hashlib.sha256()
+    raw_size = 0
+    temp_path = output_path + ".tmp"
+
+    try:
+        with open(temp_path, 'wb') as f:
+            if codec == "gzip":
+                writer = GzipWriter(f, level)
+            else:
+                writer = BrotliWriter(f, level, text=name.endswith(".js"))
+            for chunk in read_source(source_path, source_codec):
+                raw_hash.update(chunk)
+                raw_size += len(chunk)
+                writer.write(chunk)
+            writer.close()
+
+        check_hash = hashlib.sha256()
+        for chunk in read_source(temp_path, codec):
+            check_hash.update(chunk)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if check_hash.digest() != raw_hash.digest():
+        os.remove(temp_path)
+        return {"error": "解压校验失败"}
+
+    return {
+        "rawSize": raw_size,
+        "sha256": raw_hash.hexdigest(),
+        "size": os.path.getsize(temp_path),
+        "tempPath": temp_path,
+        "seconds": time.time() - started,
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="把 WebGL 构建产物重新压缩为 Brotli 和 gzip-9")
+    parser.add_argument("--build-dir", default=BUILD_DIR, help="构建输出目录")
+    parser.add_argument("--output-dir", default=None, help="输出目录（默认与构建目录相同）")
+    parser.add_argument("--brotli-quality", type=int, default=11, help="Brotli 质量 (0-11)")
+    parser.add_argument("--gzip-level", type=int, default=9, help="gzip 压缩等级 (1-9)")
+    parser.add_argument("--dry-run", action="store_true", help="只统计大小，不替换输出文件")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数")
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or args.build_dir
+    os.makedirs(output_dir, exist_ok=True)
+
+    codecs = ["gzip"]
+    if brotli is not None:
+        codecs.append("brotli")
+    else:
+        print("⚠️  未安装 brotli 模块，只生成 gzip（pip install brotli）")
+
+    print("=" * 96)
+    print("WebGL 构建产物预压缩")
+    print("=" * 96)
+
+    tasks = {}
+    existing = {}
+    for name, sources in find_artifacts(args.build_dir).items():
+        usable = [source for source in sources if not is_lfs_pointer(source[0])
+                  and (source[1] != "brotli" or brotli is not None)]
+        for path, codec in sources:
+            if codec and not is_lfs_pointer(path):
+                existing[(name, codec)] = os.path.getsize(path)
+        if not usable:
+            print(f"  - {name}: 来源文件是未拉取的 Git LFS 指针或无法解码，跳过（先执行 git lfs pull）")
+            continue
+        for codec in codecs:
+            level = args.gzip_level if codec == "gzip" else args.brotli_quality
+            output_path = os.path.join(output_dir, name + CODEC_EXTENSIONS[codec])
+            tasks[(name, codec)] = (usable[0], output_path, level)
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {key: executor.submit(encode_artifact, key[0], source, key[1], output_path, level)
+                   for key, (source, output_path, level) in tasks.items()}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                # 来源文件损坏（截断的 .gz 抛 EOFError、无效的 .br 抛 brotli.error 等），其他产物照常处理
+                results[key] = {"error": f"无法解码 {os.path.basename(tasks[key][0][0])}: {type(e).__name__}: {e}"}
+
+    failed = 0
+    for (name, codec), result in results.items():
+        if "error" in result:
+            print(f"  ✗ {name} ({codec}): {result['error']}")
+            failed += 1
+            continue
+        output_path = tasks[(name, codec)][1]
+        if args.dry_run:
+            os.remove(result["tempPath"])
+        else:
+            os.replace(result["tempPath"], output_path)
+
+    names = sorted({name for name, _ in results})
+    if names:
+        print(f"\n{'产物':32} {'原始':>12} {'现有.gz':>12} {'gzip-9':>12} {'brotli':>12} {'节省':>7} {'耗时s':>7}")
+    total_raw = total_old = total_best = 0
+    for name in names:
+        gzip_result = results.get((name, "gzip"), {})
+        brotli_result = results.get((name, "brotli"), {})
+        raw_size = gzip_result.get("rawSize") or brotli_result.get("rawSize") or 0
+        old_size = existing.get((name, "gzip"), 0)
+        sizes = [r["size"] for r in (gzip_result, brotli_result) if "size" in r]
+        best = min(sizes) if sizes else 0
+        reference = old_size or raw_size
+        saving = (1 - best / reference) * 100 if reference and best else 0
+        seconds = max((r.get("seconds", 0) for r in (gzip_result, brotli_result)), default=0)
+
+        def fmt(value):
+            return f"{value / 1024:10.1f}KB" if value else f"{'-':>12}"
+
+        print(f"{name:32} {fmt(raw_size)} {fmt(old_size)} {fmt(gzip_result.get('size', 0))} "
+              f"{fmt(brotli_result.get('size', 0))} {saving:6.1f}% {seconds:7.1f}")
+        if best:
+            # 失败的产物没有新大小，不计入合计
+            total_raw += raw_size
+            total_old += reference
+            total_best += best
+
+    if total_raw:
+        print(f"\n下载体积: {total_old / 1024 / 1024:.1f} MB -> {total_best / 1024 / 1024:.1f} MB "
+              f"(原始 {total_raw / 1024 / 1024:.1f} MB)")
+    if "brotli" in codecs and not args.dry_run and names:
+        print("使用 Brotli 版本时，把 index.html 中的 dataUrl/frameworkUrl/codeUrl 改为 .br 后缀")
+    if failed:
+        print(f"失败: {failed} 个")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
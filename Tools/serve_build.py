@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebGL 构建本地静态服务器
+按 vercel.json 的 headers 规则给响应加上 COOP/COEP、Content-Encoding、Content-Type，
+支持 Range 请求、ETag/If-None-Match（304）和可选的带宽限速/延迟模拟，
+每个请求记录首字节时间和传输时间，用于在本机对比冷加载和热加载。
+"""
+
+import argparse
+import email.utils
+import json
+import mimetypes
+import os
+import re
+import sys
+import threading
+import time
+import urllib.parse
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from precompress_build import BUILD_DIR, PROJECT_DIR, is_lfs_pointer
+
+VERCEL_CONFIG = os.path.join(PROJECT_DIR, "vercel.json")
+# Vercel 静态文件的默认缓存策略：每次都向服务器验证
+DEFAULT_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+CHUNK_SIZE = 64 * 1024
+
+# path-to-regexp 的命名参数 :name、:name*、:name+、:name?
+NAMED_PARAMETER = re.compile(r":(\w+)([*+?]?)")
+
+
+def source_to_regex(source):
+    """
+    把 vercel.json 的 source（path-to-regexp 语法）转换为正则
+    括号分组按正则原样保留，其余字符按字面匹配
+    """
+    parts = []
+    pos = 0
+    while pos < len(source):
+        char = source[pos]
+        if char == "(":
+            depth = 0
+            end = pos
+            while end < len(source):
+                if source[end] == "\\":
+                    end += 2
+                    continue
+                if source[end] == "(":
+                    depth += 1
+                elif source[end] == ")":
+                    depth -= 1
+                    if depth == 0:
+                        break
+                end += 1
+            if depth:
+                raise ValueError(f"括号不匹配: {source}")
+            parts.append(source[pos:end + 1])
+            pos = end + 1
+            continue
+        match = NAMED_PARAMETER.match(source, pos)
+        if match:
+            modifier = match.group(2)
+            if modifier == "*":
+                parts.append(r"(.*)")
+            elif modifier == "+":
+                parts.append(r"(.+)")
+            elif modifier == "?":
+                parts.append(r"([^/]*)")
+            else:
+                parts.append(r"([^/]+)")
+            pos = match.end()
+            continue
+        parts.append(re.escape(char))
+        pos += 1
+    return re.compile("^" + "".join(parts) + "$")
+
+
+def load_header_rules(path):
+    """读取 vercel.json 的 headers 规则，返回 [(正则, source, [(键, 值)])]"""
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    rules = []
+    for rule in config.get("headers", []):
+        headers = [(header["key"], header["value"]) for header in rule.get("headers", [])]
+        rules.append((source_to_regex(rule["source"]), rule["source"], headers))
+    return rules
+
+
+def match_headers(rules, path):
+    """所有匹配的规则按顺序合并，同名头以后面的规则为准"""
+    headers = {}
+    for regex, _, rule_headers in rules:
+        if regex.match(path):
+            for key, value in rule_headers:
+                headers[key.lower()] = (key, value)
+    return list(headers.values())
+
+
+def parse_bandwidth(text):
+    """带宽参数，如 10mbit、500kbit、2MB（每秒），返回字节/秒"""
+    match = re.fullmatch(r"\s*([\d.]+)\s*(kbit|mbit|gbit|kb|mb|gb|b)?\s*", text, re.IGNORECASE)
+    if not match:
+        raise argparse.ArgumentTypeError(f"无法识别的带宽: {text}（例: 10mbit、500kbit、2MB）")
+    value = float(match.group(1))
+    unit = (match.group(2) or "mbit").lower()
+    factors = {"b": 1, "kb": 1024, "mb": 1024 ** 2, "gb": 1024 ** 3,
+               "kbit": 1000 / 8, "mbit": 1000 ** 2 / 8, "gbit": 1000 ** 3 / 8}
+    if value <= 0:
+        raise argparse.ArgumentTypeError("带宽必须大于 0")
+    return value * factors[unit]
+
+
+class Throttle:
+    """所有连接共享的限速链路（令牌桶，按字节排队）"""
+
+    def __init__(self, bytes_per_second):
+        self.rate = bytes_per_second
+        self.lock = threading.Lock()
+        self.available_at = time.monotonic()
+
+    def wait(self, size):
+        with self.lock:
+            now = time.monotonic()
+            self.available_at = max(now, self.available_at) + size / self.rate
+            delay = self.available_at - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def parse_range(header, size):
+    """
+    解析单个 bytes 范围，返回 (起点, 终点含) ；
+    不支持的格式（多段范围等）返回 None 表示整体返回，无法满足时返回 False
+    """
+    match = re.fullmatch(r"\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*", header)
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    if match.group(1):
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else size - 1
+    else:
+        length = int(match.group(2))
+        if length == 0:
+            return False
+        start = max(size - length, 0)
+        end = size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def file_etag(stat):
+    """按大小和修改时间生成强 ETag"""
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def etag_matches(header, etag):
+    """If-None-Match 比较（弱比较，支持 * 和列表）"""
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class RequestLog:
+    """请求计时记录，可追加写入 JSON Lines 文件"""
+
+    def __init__(self, path=None, label=None):
+        self.path = path
+        self.label = label
+        self.lock = threading.Lock()
+        self.records = []
+
+    def add(self, record):
+        if self.label:
+            record["label"] = self.label
+        with self.lock:
+            self.records.append(record)
+            if self.path:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def print_summary(self):
+        """按路径汇总（Ctrl+C 退出时打印）"""
+        if not self.records:
+            return
+        summary = {}
+        for record in self.records:
+            entry = summary.setdefault(record["path"], {"count": 0, "bytes": 0, "ttfb": 0.0, "total": 0.0,
+                                                       "statuses": set()})
+            entry["count"] += 1
+            entry["bytes"] += record["bytes"]
+            entry["ttfb"] += record["ttfbMs"]
+            entry["total"] += record["totalMs"]
+            entry["statuses"].add(record["status"])
+
+        print(f"\n{'路径':48} {'次数':>4} {'状态':>8} {'传输':>12} {'平均TTFB':>10} {'平均总耗时':>10}")
+        print("-" * 100)
+        for path, entry in sorted(summary.items(), key=lambda item: -item[1]["total"]):
+            statuses = "/".join(str(status) for status in sorted(entry["statuses"]))
+            print(f"{path[:48]:48} {entry['count']:4d} {statuses:>8} {entry['bytes'] / 1024:10.1f}KB "
+                  f"{entry['ttfb'] / entry['count']:8.1f}ms {entry['total'] / entry['count']:8.1f}ms")
+
+
+class BuildRequestHandler(SimpleHTTPRequestHandler):
+    """按 vercel.json 规则返回静态文件"""
+
+    protocol_version = "HTTP/1.1"
+    rules = []
+    throttle = None
+    latency = 0.0
+    request_log = None
+    quiet = False
+
+    def parse_request(self):
+        # 请求行已读入，从这里开始计时
+        self.started = time.perf_counter()
+        self.first_byte = None
+        self.sent_bytes = 0
+        return super().parse_request()
+
+    def log_message(self, format, *args):
+        # 计时日志由 log_timing 输出，这里只保留错误
+        pass
+
+    def log_error(self, format, *args):
+        sys.stderr.write(f"⚠️  {self.address_string()} {format % args}\n")
+
+    def do_GET(self):
+        self.serve(send_body=True)
+
+    def do_HEAD(self):
+        self.serve(send_body=False)
+
+    def write_body(self, data):
+        if self.throttle:
+            self.throttle.wait(len(data))
+        if self.first_byte is None:
+            self.first_byte = time.perf_counter()
+        self.wfile.write(data)
+        self.sent_bytes += len(data)
+
+    def end_headers(self):
+        super().end_headers()
+        self.wfile.flush()
+        if self.first_byte is None:
+            self.first_byte = time.perf_counter()
+
+    def send_rule_headers(self, url_path):
+        for key, value in match_headers(self.rules, url_path):
+            self.send_header(key, value)
+
+    def serve(self, send_body):
+        if self.latency:
+            time.sleep(self.latency)
+
+        # 按解码后的路径匹配 _headers 规则（与 translate_path 查找文件时的解码方式一致），
+        # translate_path 自己解码，传原始路径避免 %25 被解两次
+        url_path = urllib.parse.unquote(self.path.split("?", 1)[0].split("#", 1)[0], errors="surrogatepass")
+        file_path = self.translate_path(self.path)
+        if os.path.isdir(file_path):
+            file_path = os.path.join(file_path, "index.html")
+        if not os.path.isfile(file_path):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            self.log_timing(url_path, HTTPStatus.NOT_FOUND)
+            return
+
+        try:
+            f = open(file_path, 'rb')
+        except OSError:
+            self.send_error(HTTPStatus.FORBIDDEN, "Permission denied")
+            self.log_timing(url_path, HTTPStatus.FORBIDDEN)
+            return
+
+        with f:
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
+            etag = file_etag(stat)
+            rule_headers = {key.lower() for key, _ in match_headers(self.rules, url_path)}
+
+            def common_headers():
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", email.utils.formatdate(stat.st_mtime, usegmt=True))
+                self.send_header("Accept-Ranges", "bytes")
+                if "cache-control" not in rule_headers:
+                    self.send_header("Cache-Control", DEFAULT_CACHE_CONTROL)
+                self.send_rule_headers(url_path)
+
+            if_none_match = self.headers.get("If-None-Match")
+            if if_none_match and etag_matches(if_none_match, etag):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                common_headers()
+                self.end_headers()
+                self.log_timing(url_path, HTTPStatus.NOT_MODIFIED)
+                return
+
+            byte_range = None
+            range_header = self.headers.get("Range")
+            if_range = self.headers.get("If-Range")
+            if range_header and (not if_range or if_range.strip() == etag):
+                byte_range = parse_range(range_header, size)
+
+            if byte_range is False:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                common_headers()
+                self.end_headers()
+                self.log_timing(url_path, HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                return
+
+            if byte_range:
+                start, end = byte_range
+                status = HTTPStatus.PARTIAL_CONTENT
+            else:
+                start, end = 0, size - 1
+                status = HTTPStatus.OK
+            length = end - start + 1
+
+            self.send_response(status)
+            if "content-type" not in rule_headers:
+                self.send_header("Content-Type", mimetypes.guess_type(file_path)[0] or "application/octet-stream")
+            self.send_header("Content-Length", str(length))
+            if byte_range:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            common_headers()
+            self.end_headers()
+
+            if send_body:
+                self.first_byte = None
+                f.seek(start)
+                remaining = length
+                try:
+                    while remaining > 0:
+                        data = f.read(min(CHUNK_SIZE, remaining))
+                        if not data:
+                            break
+                        self.write_body(data)
+                        remaining -= len(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+                    self.log_timing(url_path, status, aborted=True)
+                    return
+            self.log_timing(url_path, status)
+
+    def log_timing(self, url_path, status, aborted=False):
+        finished = time.perf_counter()
+        first_byte = self.first_byte or finished
+        record = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "method": self.command,
+            "path": url_path,
+            "status": int(status),
+            "bytes": self.sent_bytes,
+            "ttfbMs": round((first_byte - self.started) * 1000, 2),
+            "totalMs": round((finished - self.started) * 1000, 2),
+        }
+        if aborted:
+            record["aborted"] = True
+        self.request_log.add(record)
+
+        if self.quiet and not url_path.startswith("/Build/"):
+            return
+        seconds = finished - self.started
+        speed = self.sent_bytes / 1024 / 1024 / seconds if seconds > 0 and self.sent_bytes else 0
+        flag = " (中断)" if aborted else ""
+        print(f"{record['method']:4} {int(status)} {url_path[:56]:56} {self.sent_bytes / 1024:10.1f}KB "
+              f"TTFB {record['ttfbMs']:8.1f}ms  总计 {record['totalMs']:9.1f}ms  {speed:7.2f}MB/s{flag}",
+              flush=True)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="按 vercel.json 规则在本地提供 WebGL 构建，记录加载耗时")
+    parser.add_argument("--root", default=PROJECT_DIR, help="站点根目录（index.html 所在目录）")
+    parser.add_argument("--config", default=VERCEL_CONFIG, help="vercel.json 路径")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8000, help="监听端口")
+    parser.add_argument("--bandwidth", type=parse_bandwidth, default=None,
+                        help="限速（所有连接共享），如 10mbit、500kbit、2MB，默认不限速")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求额外延迟（毫秒），模拟往返时间")
+    parser.add_argument("--log-json", metavar="PATH", help="把每个请求的计时追加写入 JSON Lines 文件")
+    parser.add_argument("--label", help="写入计时记录的标签，如 cold/warm")
+    parser.add_argument("--quiet", action="store_true", help="只打印 Build/ 下产物的请求")
+    args = parser.parse_args()
+
+    try:
+        rules = load_header_rules(args.config)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ 无法读取 {args.config}: {e}", file=sys.stderr)
+        return 2
+
+    print("=" * 100)
+    print("WebGL 构建本地服务器")
+    print("=" * 100)
+    for regex, source, headers in rules:
+        print(f"  {source:24} -> " + ", ".join(f"{key}: {value}" for key, value in headers))
+
+    build_dir = os.path.join(args.root, os.path.relpath(BUILD_DIR, PROJECT_DIR))
+    if os.path.isdir(build_dir):
+        pointers = [name for name in sorted(os.listdir(build_dir))
+                    if os.path.isfile(os.path.join(build_dir, name)) and is_lfs_pointer(os.path.join(build_dir, name))]
+        if pointers:
+            print(f"⚠️  Build/ 中有未拉取的 Git LFS 指针（先执行 git lfs pull）: {', '.join(pointers)}")
+
+    handler = BuildRequestHandler
+    handler.rules = rules
+    handler.throttle = Throttle(args.bandwidth) if args.bandwidth else None
+    handler.latency = args.latency / 1000
+    handler.request_log = RequestLog(args.log_json, args.label)
+    handler.quiet = args.quiet
+
+    def factory(*handler_args, **handler_kwargs):
+        return handler(*handler_args, directory=args.root, **handler_kwargs)
+
+    server = ThreadingHTTPServer((args.host, args.port), factory)
+    server.daemon_threads = True
+    limit = f"，限速 {args.bandwidth * 8 / 1000 / 1000:.1f} Mbit/s" if args.bandwidth else ""
+    delay = f"，延迟 {args.latency:.0f}ms" if args.latency else ""
+    print(f"\n根目录: {args.root}{limit}{delay}")
+    print(f"访问 http://{args.host}:{args.port}/ （Ctrl+C 退出并打印汇总）\n")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        handler.request_log.print_summary()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())